@@ -0,0 +1,63 @@
+"""
+Python package for interfacing with the Cass data logger.
+
+Submodules are imported on first access, so ``import cass_logger_dev``
+stays cheap and scripts only pay for the subsystems they use, e.g.
+``cass_logger_dev.parsing`` without pandas, pyserial or fitdecode.
+
+Exports
+-------
+CassCommands
+    Device interface (from ``cass_commands``).
+"""
+
+import importlib
+
+_SUBMODULES = (
+    "aggregate",
+    "alignment",
+    "archive",
+    "cass_commands",
+    "catalog",
+    "device_catalog",
+    "dock",
+    "download_planner",
+    "events",
+    "firmware_structs",
+    "fit",
+    "frame_cache",
+    "cli",
+    "import_bench",
+    "live",
+    "lod",
+    "manifest",
+    "parsing",
+    "plotting",
+    "port_cache",
+    "scan",
+    "scheduler",
+    "session",
+    "signal_utils",
+    "spectral",
+    "suspension",
+    "tracing",
+    "transfer",
+)
+
+_ATTRIBUTES = {
+    "CassCommands": "cass_commands",
+}
+
+__all__ = ["CassCommands", *_SUBMODULES]
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _ATTRIBUTES:
+        return getattr(importlib.import_module(f".{_ATTRIBUTES[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
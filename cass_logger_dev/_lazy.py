@@ -0,0 +1,62 @@
+"""
+Deferred imports of heavy optional-at-runtime dependencies.
+
+``pandas``, ``pyserial`` and ``fitdecode`` together dominate the import
+time of the package, yet many scripts only need one of them (or none, e.g.
+to parse a ``.bin`` file into a structured array). Modules bind them with
+``lazy_import`` instead of ``import``, and the real import happens on first
+attribute access.
+
+Exports
+-------
+lazy_import : function
+    Return a module proxy that imports the module on first use.
+"""
+
+import importlib
+import sys
+from types import ModuleType
+
+
+class _LazyModule(ModuleType):
+    """Module placeholder that imports the real module on attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return a proxy for module ``name`` that imports it on first use.
+
+    If the module is already imported, it is returned directly.
+
+    Parameters
+    ----------
+    name : str
+        Absolute module name, e.g. "pandas" or "serial.tools.list_ports".
+
+    Returns
+    -------
+    module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
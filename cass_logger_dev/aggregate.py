@@ -0,0 +1,480 @@
+"""
+Out-of-core map-reduce aggregation across many recordings.
+
+Files (or whole download directories) are split into chunks of
+memory-mapped records. Each chunk is mapped to small partial results in a
+process pool, and partials are merged as they complete, so memory stays
+bounded by the chunk size times the number of workers, and throughput
+scales with core count. Results can be grouped per file, directory,
+device or calendar month.
+
+Reducers must be picklable (module-level classes and functions) because
+they are sent to worker processes.
+
+Exports
+-------
+Reducer
+    Base class: ``empty``, ``map``, ``merge`` and ``finalize``.
+Count
+    Number of records and recorded seconds.
+Histogram
+    Fixed-bin histogram of one channel.
+MeanVar
+    Mean, variance, standard deviation and RMS per channel.
+QuantileSketch
+    Mergeable relative-error quantile sketch of one channel.
+MapReduce
+    Reducer built from user map/merge functions.
+aggregate : function
+    Run reducers over files and directories in a process pool.
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+import numpy as np
+from .manifest import read_manifest
+from .parsing import TimeBase, elapsed_micros, load_records, time_base
+from .session import Session
+
+GROUP_BY = (None, "file", "dir", "device", "month")
+"""Accepted values of ``aggregate(group_by=...)``."""
+
+
+class Reducer:
+    """Base class of mergeable aggregations.
+
+    Subclasses implement ``map`` (records of one chunk to a partial result)
+    and ``merge`` (two partials to one); ``finalize`` turns the merged
+    partial into the reported result.
+    """
+
+    def empty(self):
+        """Partial result of no records."""
+        return None
+
+    def map(self, records: np.ndarray, elapsed_us: np.ndarray):
+        """Partial result of one chunk of records."""
+        raise NotImplementedError
+
+    def merge(self, a, b):
+        """Combine two partial results."""
+        raise NotImplementedError
+
+    def finalize(self, state):
+        """Turn a merged partial result into the reported value."""
+        return state
+
+
+class Count(Reducer):
+    """Number of records and recorded seconds."""
+
+    def empty(self):
+        return {"records": 0, "seconds": 0.0}
+
+    def map(self, records, elapsed_us):
+        n = len(records)
+        if n < 2:
+            return {"records": n, "seconds": 0.0}
+        # span of the chunk plus one sample period, so chunks add up exactly
+        seconds = (elapsed_us[-1] - elapsed_us[0] + (elapsed_us[1] - elapsed_us[0])) * 1e-6
+        return {"records": n, "seconds": float(seconds)}
+
+    def merge(self, a, b):
+        return {"records": a["records"] + b["records"], "seconds": a["seconds"] + b["seconds"]}
+
+
+class Histogram(Reducer):
+    """Fixed-bin histogram of one channel.
+
+    Parameters
+    ----------
+    channel : str
+        Channel name.
+    bins : array-like
+        Bin edges, in the units after scaling.
+    scale : float, optional
+        Factor applied to raw values, e.g. a CHANNEL_GAINS entry (default 1).
+    """
+
+    def __init__(self, channel: str, bins, scale: float = 1.0):
+        self.channel = channel
+        self.bins = np.asarray(bins, dtype=np.float64)
+        self.scale = scale
+
+    def empty(self):
+        return np.zeros(len(self.bins) - 1, dtype=np.int64)
+
+    def map(self, records, elapsed_us):
+        x = np.asarray(records[self.channel], dtype=np.float64) * self.scale
+        return np.histogram(x, self.bins)[0]
+
+    def merge(self, a, b):
+        return a + b
+
+    def finalize(self, state):
+        """Return ``(counts, bin_edges)``."""
+        return state, self.bins
+
+
+class MeanVar(Reducer):
+    """Mean, variance, standard deviation and RMS of channels.
+
+    Partials are merged with Chan et al.'s pairwise update, which stays
+    accurate for long recordings where naive sums of squares would not.
+
+    Parameters
+    ----------
+    channels : sequence of str
+        Channel names.
+    """
+
+    def __init__(self, channels: Sequence[str]):
+        self.channels = list(channels)
+
+    def empty(self):
+        k = len(self.channels)
+        return (0, np.zeros(k), np.zeros(k))
+
+    def map(self, records, elapsed_us):
+        n = len(records)
+        if not n:
+            return self.empty()
+        x = np.column_stack([np.asarray(records[c], dtype=np.float64) for c in self.channels])
+        mean = x.mean(axis=0)
+        m2 = ((x - mean) ** 2).sum(axis=0)
+        return (n, mean, m2)
+
+    def merge(self, a, b):
+        n_a, mean_a, m2_a = a
+        n_b, mean_b, m2_b = b
+        n = n_a + n_b
+        if not n:
+            return a
+        delta = mean_b - mean_a
+        mean = mean_a + delta * (n_b / n)
+        m2 = m2_a + m2_b + delta**2 * (n_a * n_b / n)
+        return (n, mean, m2)
+
+    def finalize(self, state):
+        """Return {channel: {n, mean, var, std, rms}} (population variance)."""
+        n, mean, m2 = state
+        var = m2 / n if n else np.full(len(self.channels), np.nan)
+        return {
+            c: {
+                "n": n,
+                "mean": float(mean[i]) if n else float("nan"),
+                "var": float(var[i]),
+                "std": float(np.sqrt(var[i])),
+                "rms": float(np.sqrt(var[i] + mean[i] ** 2)) if n else float("nan"),
+            }
+            for i, c in enumerate(self.channels)
+        }
+
+
+class QuantileSketch(Reducer):
+    """Mergeable quantile sketch of one channel with bounded relative error.
+
+    Values are counted in logarithmic buckets (as in DDSketch), so any
+    quantile is returned within ``relative_accuracy`` of the true value
+    while the state stays at a few hundred buckets regardless of the number
+    of samples.
+
+    Parameters
+    ----------
+    channel : str
+        Channel name.
+    relative_accuracy : float, optional
+        Relative error bound of reported quantiles (default 0.01).
+    scale : float, optional
+        Factor applied to raw values (default 1).
+    min_value : float, optional
+        Magnitudes below this are counted as zero (default 1e-9).
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        relative_accuracy: float = 0.01,
+        scale: float = 1.0,
+        min_value: float = 1e-9,
+    ):
+        self.channel = channel
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.scale = scale
+        self.min_value = min_value
+
+    def empty(self):
+        none = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        return {"pos": none, "neg": none, "zero": 0}
+
+    def map(self, records, elapsed_us):
+        x = np.asarray(records[self.channel], dtype=np.float64) * self.scale
+        small = np.abs(x) < self.min_value
+        return {
+            "pos": self._buckets(x[(x > 0) & ~small]),
+            "neg": self._buckets(-x[(x < 0) & ~small]),
+            "zero": int(small.sum()),
+        }
+
+    def merge(self, a, b):
+        return {
+            "pos": _merge_buckets(a["pos"], b["pos"]),
+            "neg": _merge_buckets(a["neg"], b["neg"]),
+            "zero": a["zero"] + b["zero"],
+        }
+
+    def finalize(self, state) -> Callable[[Union[float, Sequence[float]]], np.ndarray]:
+        """Return a function mapping quantiles in [0, 1] to values."""
+        neg_keys, neg_counts = state["neg"]
+        pos_keys, pos_counts = state["pos"]
+        # ascending value order: large negatives, zero, small to large positives
+        values = np.concatenate([-self._value(neg_keys[::-1]), [0.0], self._value(pos_keys)])
+        counts = np.concatenate([neg_counts[::-1], [state["zero"]], pos_counts])
+        cum = np.cumsum(counts)
+        total = cum[-1] if len(cum) else 0
+
+        def quantile(q):
+            q = np.asarray(q, dtype=np.float64)
+            if not total:
+                return np.full(q.shape, np.nan)
+            rank = q * (total - 1)
+            return values[np.searchsorted(cum, rank, side="right")]
+
+        return quantile
+
+    def _buckets(self, magnitudes):
+        keys = np.ceil(np.log(magnitudes) / np.log(self.gamma)).astype(np.int64)
+        return np.unique(keys, return_counts=True)
+
+    def _value(self, keys):
+        return 2 * self.gamma ** keys.astype(np.float64) / (self.gamma + 1)
+
+
+def _merge_buckets(a, b):
+    keys, inverse = np.unique(np.concatenate([a[0], b[0]]), return_inverse=True)
+    return keys, np.bincount(inverse, weights=np.concatenate([a[1], b[1]])).astype(np.int64)
+
+
+class MapReduce(Reducer):
+    """Reducer built from user functions.
+
+    Parameters
+    ----------
+    map_fn : callable
+        ``map_fn(records, elapsed_us) -> partial`` for one chunk; records is
+        a read-only structured array.
+    merge_fn : callable
+        ``merge_fn(a, b) -> partial``.
+    finalize_fn : callable, optional
+        ``finalize_fn(partial) -> result`` (default: identity).
+    empty : object, optional
+        Partial result of no records (default None; merge_fn is then never
+        called with None).
+    """
+
+    def __init__(
+        self,
+        map_fn: Callable,
+        merge_fn: Callable,
+        finalize_fn: Optional[Callable] = None,
+        empty=None,
+    ):
+        self.map_fn = map_fn
+        self.merge_fn = merge_fn
+        self.finalize_fn = finalize_fn
+        self._empty = empty
+
+    def empty(self):
+        return self._empty
+
+    def map(self, records, elapsed_us):
+        return self.map_fn(records, elapsed_us)
+
+    def merge(self, a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return self.merge_fn(a, b)
+
+    def finalize(self, state):
+        return self.finalize_fn(state) if self.finalize_fn else state
+
+
+class _Source:
+    """One recording to aggregate, with its time base and group keys."""
+
+    def __init__(self, path: Path, fw_key: str, base: TimeBase, n_records: int, keys: dict):
+        self.path = path
+        self.fw_key = fw_key
+        self.base = base
+        self.n_records = n_records
+        self.keys = keys
+
+
+def aggregate(
+    paths: Union[str, Path, Sequence[Union[str, Path]]],
+    reducers: Dict[str, Reducer],
+    group_by: Optional[str] = None,
+    fw_ver: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_records: int = 1 << 22,
+    anchors: Optional[Dict[Union[str, Path], object]] = None,
+    estimate_start: bool = False,
+) -> Dict:
+    """Run reducers over recordings, chunk by chunk, in a process pool.
+
+    Parameters
+    ----------
+    paths : path or sequence of paths
+        ``.bin`` files and/or directories (searched recursively).
+    reducers : dict
+        Maps result names to Reducer instances.
+    group_by : {None, "file", "dir", "device", "month"}, optional
+        Report results per recording, per download directory, per device
+        ID, or per calendar month ("YYYY-MM", UTC) of each file's start.
+        Files without a time anchor (see anchors) fall under "unknown"
+        (default None: one result for everything).
+    fw_ver : str, optional
+        Firmware version string. Defaults to each directory's manifest or
+        metadata.txt, else "std".
+    workers : int, optional
+        Worker processes (default os.cpu_count()). 0 or 1 runs in this
+        process.
+    chunk_records : int, optional
+        Records per task (default 2**22).
+    anchors : dict, optional
+        Maps a download directory to the UTC time (datetime or Unix
+        seconds) of its first sample, or to a dict of per-file start times;
+        used for month grouping (see ``session.Session``).
+    estimate_start : bool, optional
+        Anchor directories without an entry in anchors at their download
+        RTC time (default False); files recorded shortly before a month
+        boundary may then land in the next month.
+
+    Returns
+    -------
+    dict
+        ``{name: result}``, or ``{group: {name: result}}`` when grouped.
+
+    Raises
+    ------
+    ValueError
+        If group_by is not one of GROUP_BY, or is "month" and no recording
+        has a time anchor.
+
+    Examples
+    --------
+    >>> aggregate(["data"], {"a0": Histogram("a0", np.arange(0, 4097, 16)),
+    ...                      "rms": MeanVar(["gx", "gy", "gz"])}, group_by="device")
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {GROUP_BY}")
+    sources = _resolve_sources(paths, fw_ver, anchors, estimate_start)
+    if group_by == "month" and sources:
+        unknown = sum(source.keys["month"] == "unknown" for source in sources)
+        if unknown == len(sources):
+            raise ValueError(
+                "No recording has a time anchor; pass anchors= or estimate_start=True "
+                "to group by month"
+            )
+        if unknown:
+            warnings.warn(f"{unknown} recording(s) without a time anchor are grouped as 'unknown'")
+    tasks, task_groups = [], []
+    for source in sources:
+        for start in range(0, source.n_records, chunk_records):
+            stop = min(start + chunk_records, source.n_records)
+            tasks.append((source.path, source.fw_key, source.base, start, stop, reducers))
+            task_groups.append(source.keys[group_by] if group_by else None)
+
+    states: Dict = {}
+    for group in dict.fromkeys(task_groups):
+        states[group] = {name: r.empty() for name, r in reducers.items()}
+
+    def _merge(group, partials):
+        for name, partial in partials.items():
+            states[group][name] = reducers[name].merge(states[group][name], partial)
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1 or len(tasks) <= 1:
+        for group, task in zip(task_groups, tasks):
+            _merge(group, _map_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_map_chunk, task): group for group, task in zip(task_groups, tasks)
+            }
+            for future in as_completed(futures):
+                _merge(futures[future], future.result())
+
+    results = {
+        group: {name: reducers[name].finalize(state) for name, state in group_states.items()}
+        for group, group_states in states.items()
+    }
+    if group_by is None:
+        return results.get(None, {name: r.finalize(r.empty()) for name, r in reducers.items()})
+    return results
+
+
+def _map_chunk(task) -> Dict:
+    """Worker: map every reducer over one chunk of one recording."""
+    path, fw_key, base, start, stop, reducers = task
+    records = load_records(path, fw_key, mmap=True)[start:stop]
+    elapsed = elapsed_micros(records["tmicros"], start, base)
+    return {name: reducer.map(records, elapsed) for name, reducer in reducers.items()}
+
+
+def _resolve_sources(
+    paths, fw_ver: Optional[str], anchors=None, estimate_start: bool = False
+) -> List[_Source]:
+    """Expand paths into recordings with time bases and group keys."""
+    anchors = {Path(k).resolve(): v for k, v in (anchors or {}).items()}
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    by_dir: Dict[Path, List[str]] = {}
+    for path in map(Path, paths):
+        if path.is_dir():
+            for f in sorted(path.rglob("*.bin")):
+                by_dir.setdefault(f.parent.resolve(), []).append(f.name)
+        else:
+            by_dir.setdefault(path.parent.resolve(), []).append(path.name)
+
+    sources = []
+    for dir_path, names in by_dir.items():
+        names = list(dict.fromkeys(names))
+        anchor = anchors.get(dir_path)
+        if isinstance(anchor, dict):
+            session = Session(dir_path, fw_ver=fw_ver, files=names, file_start_times=anchor,
+                              estimate_start=estimate_start)
+        else:
+            session = Session(dir_path, fw_ver=fw_ver, files=names, start_time=anchor,
+                              estimate_start=estimate_start)
+        index = session.index
+        manifest = read_manifest(dir_path) or {}
+        summaries = {f["name"]: f for f in manifest.get("files", [])}
+        for i, name in enumerate(session.files):
+            path = dir_path / name
+            summary = summaries.get(name)
+            if summary is not None and summary["size"] == path.stat().st_size:
+                tmicros0, step = summary["first_tmicros"] or 0, 0
+                if summary["sample_rate_hz"]:
+                    step = int(round(1e6 / summary["sample_rate_hz"]))
+                base = TimeBase(tmicros0, step, summary["rolled"])
+            else:
+                base = time_base(session._entries[i].records["tmicros"])
+            month = "unknown"
+            if "start_time" in index:
+                month = index["start_time"].iloc[i].strftime("%Y-%m")
+            keys = {
+                "file": str(path),
+                "dir": str(dir_path),
+                "device": session.device_id or "unknown",
+                "month": month,
+            }
+            sources.append(
+                _Source(path, session.dtype_key, base, session._entries[i].n_records, keys)
+            )
+    return sources
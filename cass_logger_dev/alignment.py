@@ -0,0 +1,300 @@
+"""
+Time alignment of FIT records (about 1 Hz, absolute timestamps) with
+high-rate logger data (kHz, elapsed time).
+
+Logger time is anchored to UTC with a start time (given, or from
+``logger_start_time``), then FIT columns are attached to every logger sample
+by vectorized interpolation on the sorted time axes, or logger channels are
+aggregated per FIT record interval. Neither direction copies the high-rate
+frame: attached columns are added in place, and aggregation can stream a
+``.bin`` file in chunks without building a DataFrame at all.
+
+Exports
+-------
+FIT_COLUMNS : tuple of str
+    FIT record fields attached by default when present.
+fit_times : function
+    FIT record timestamps as float64 Unix seconds.
+logger_start_time : function
+    UTC time of the first sample of a downloaded recording.
+attach_fit : function
+    Add interpolated FIT columns to a logger DataFrame in place.
+aggregate_per_record : function
+    Per-FIT-record statistics of logger channels.
+"""
+
+import datetime
+import warnings
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from .parsing import iter_chunks, record_dtype
+from .session import Session, _to_datetime
+
+FIT_COLUMNS = (
+    "enhanced_speed",
+    "speed",
+    "position_lat",
+    "position_long",
+    "enhanced_altitude",
+    "altitude",
+    "distance",
+    "heart_rate",
+    "cadence",
+)
+"""FIT record fields attached by ``attach_fit`` when no columns are given."""
+
+_SEMICIRCLE_TO_DEG = 180.0 / 2**31
+
+
+def fit_times(df_record: pd.DataFrame) -> np.ndarray:
+    """Return the FIT record timestamps as float64 Unix seconds.
+
+    Naive timestamps are taken as UTC, as FIT stores them.
+    """
+    ts = pd.to_datetime(df_record["timestamp"], utc=True)
+    return (ts - pd.Timestamp(0, tz="UTC")).dt.total_seconds().to_numpy(np.float64)
+
+
+def logger_start_time(
+    full_filename: Union[str, Path],
+    fw_ver: Optional[str] = None,
+    session_start: Optional[Union[datetime.datetime, float]] = None,
+    file_start_times: Optional[Dict[str, Union[datetime.datetime, float]]] = None,
+    estimate_start: bool = False,
+) -> datetime.datetime:
+    """Return the UTC time of the first sample of a downloaded recording.
+
+    The file is placed on its download's timeline with ``session.Session``,
+    anchored by session_start or file_start_times. The download RTC time
+    in ``metadata.txt`` is not a recording time (it is read when the logger
+    is docked), so it is only used with estimate_start, and the result is
+    then late by the time the logger sat idle; correct it with a negative
+    ``offset_s`` in ``attach_fit``/``aggregate_per_record``.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Raw ``.bin`` recording inside a download directory.
+    fw_ver : str, optional
+        Firmware version string (default: from the download metadata).
+    session_start : datetime or float, optional
+        UTC time (or Unix seconds) of the first sample of the download.
+    file_start_times : dict, optional
+        Maps filenames of the download to their UTC start times.
+    estimate_start : bool, optional
+        Without an anchor, estimate one from the download RTC time, with a
+        warning (default False).
+
+    Raises
+    ------
+    ValueError
+        If no anchor is given and estimate_start is False (or the download
+        has no RTC time).
+    """
+    full_filename = Path(full_filename)
+    session = Session(
+        full_filename.parent,
+        fw_ver=fw_ver,
+        start_time=session_start,
+        file_start_times=file_start_times,
+        estimate_start=estimate_start,
+    )
+    index = session.index
+    if not session.anchored:
+        raise ValueError(
+            f"No time anchor for {full_filename.parent}; pass session_start or "
+            "file_start_times (or estimate_start=True to estimate from the download RTC time)"
+        )
+    if session.anchor_source == "rtc_download":
+        warnings.warn(
+            f"Start time of {full_filename.name} is estimated from the download RTC time "
+            "and is late by the idle time before download; pass a negative offset_s to correct it"
+        )
+    row = index.index[index["file"] == full_filename.name]
+    if not len(row):
+        raise ValueError(f"{full_filename.name} is not part of its download session")
+    return index.loc[row[0], "start_time"].to_pydatetime()
+
+
+def attach_fit(
+    frame: pd.DataFrame,
+    df_record: pd.DataFrame,
+    start_time: Union[datetime.datetime, float],
+    columns: Optional[Sequence[str]] = None,
+    method: str = "linear",
+    max_gap_s: float = 5.0,
+    offset_s: float = 0.0,
+    time_col: str = "t",
+) -> pd.DataFrame:
+    """Attach FIT record columns to every logger sample, in place.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Logger data with elapsed seconds in time_col, sorted by time (as
+        returned by ``process_data_file``).
+    df_record : pd.DataFrame
+        FIT records with a "timestamp" column (from ``process_fit_file``).
+    start_time : datetime or float
+        UTC time (or Unix seconds) of ``frame[time_col] == 0``.
+    columns : sequence of str, optional
+        FIT columns to attach (default: FIT_COLUMNS present in df_record).
+        position_lat/position_long are converted from semicircles to degrees.
+    method : {"linear", "previous"}, optional
+        Linear interpolation between records, or the last record at or
+        before each sample (default "linear").
+    max_gap_s : float, optional
+        Samples between records further apart than this, or outside the FIT
+        time range, get NaN (default 5.0).
+    offset_s : float, optional
+        Correction added to logger time, e.g. a measured clock offset.
+    time_col : str, optional
+        Elapsed-seconds column of frame (default "t").
+
+    Returns
+    -------
+    pd.DataFrame
+        frame itself, with one added column per FIT column ("fit_" prefix).
+
+    Raises
+    ------
+    ValueError
+        If method is unknown.
+    """
+    if method not in ("linear", "previous"):
+        raise ValueError(f"Unknown method: {method}")
+    if columns is None:
+        columns = [c for c in FIT_COLUMNS if c in df_record.columns]
+
+    fit_t = fit_times(df_record)
+    order = np.argsort(fit_t, kind="stable")
+    fit_t = fit_t[order]
+    t = frame[time_col].to_numpy(np.float64) + (_to_datetime(start_time).timestamp() + offset_s)
+
+    # bracketing records of every sample; shared by all columns
+    last = max(len(fit_t) - 1, 0)
+    right = np.searchsorted(fit_t, t, side="right")
+    left = np.clip(right - 1, 0, last)
+    np.clip(right, 0, last, out=right)
+    valid = np.zeros(len(t), dtype=bool)
+    if len(fit_t):
+        valid = (t >= fit_t[0]) & (t <= fit_t[-1]) & (fit_t[right] - fit_t[left] <= max_gap_s)
+
+    for column in columns:
+        values = _fit_column(df_record, column)[order]
+        if method == "previous" or len(fit_t) < 2:
+            out = values[left] if len(fit_t) else np.full(len(t), np.nan)
+        else:
+            known = ~np.isnan(values)
+            out = np.interp(t, fit_t[known], values[known]) if known.any() else np.nan
+        frame[f"fit_{column}"] = np.where(valid, out, np.nan)
+    return frame
+
+
+def aggregate_per_record(
+    source: Union[pd.DataFrame, str, Path],
+    df_record: pd.DataFrame,
+    start_time: Union[datetime.datetime, float],
+    channels: Optional[Sequence[str]] = None,
+    fw_ver: str = "std",
+    offset_s: float = 0.0,
+    time_col: str = "t",
+    chunk_records: int = 1 << 20,
+) -> pd.DataFrame:
+    """Aggregate logger channels over each FIT record interval.
+
+    Record i covers logger samples with absolute time in
+    ``[timestamp[i], timestamp[i + 1])``; the last record covers one median
+    record period.
+
+    Parameters
+    ----------
+    source : pd.DataFrame or str or Path
+        A logger DataFrame, or a raw ``.bin`` file, which is streamed in
+        chunks without building a DataFrame.
+    df_record : pd.DataFrame
+        FIT records with a "timestamp" column.
+    start_time : datetime or float
+        UTC time (or Unix seconds) of the logger's first sample.
+    channels : sequence of str, optional
+        Logger channels to aggregate (default: every channel except time).
+    fw_ver : str, optional
+        Firmware version string for ``.bin`` sources (default "std").
+    offset_s : float, optional
+        Correction added to logger time.
+    time_col : str, optional
+        Elapsed-seconds column of a DataFrame source (default "t").
+    chunk_records : int, optional
+        Records per chunk for ``.bin`` sources (default 2**20).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per FIT record (sorted by time): "timestamp", "n_samples",
+        and ``<channel>_mean``, ``<channel>_min``, ``<channel>_max``. Records
+        without logger samples get NaN statistics.
+    """
+    fit_t = np.sort(fit_times(df_record))
+    edges = fit_t
+    if len(fit_t):
+        period = np.median(np.diff(fit_t)) if len(fit_t) > 1 else 1.0
+        edges = np.append(fit_t, fit_t[-1] + period)
+    origin = _to_datetime(start_time).timestamp() + offset_s
+
+    if isinstance(source, pd.DataFrame):
+        if channels is None:
+            channels = [c for c in source.columns if c not in (time_col, "tmicros")]
+        chunks = [
+            (source[time_col].to_numpy(np.float64), {c: source[c].to_numpy() for c in channels})
+        ]
+    else:
+        if channels is None:
+            channels = [c for c in record_dtype(fw_ver).names if c != "tmicros"]
+        chunks = (
+            (elapsed * 1e-6, {c: block[c] for c in channels})
+            for _, elapsed, block in iter_chunks(source, fw_ver, chunk_records)
+        )
+
+    n = len(fit_t)
+    count = np.zeros(n, dtype=np.int64)
+    sums = {c: np.zeros(n) for c in channels}
+    mins = {c: np.full(n, np.inf) for c in channels}
+    maxs = {c: np.full(n, -np.inf) for c in channels}
+    for t, block in chunks:
+        rec = np.searchsorted(edges, t + origin, side="right") - 1
+        # logger time is sorted, so in-range samples and each record's
+        # samples are contiguous
+        lo, hi = np.searchsorted(rec, [0, n])
+        if lo == hi:
+            continue
+        rec = rec[lo:hi]
+        starts = np.flatnonzero(np.r_[True, rec[1:] != rec[:-1]])
+        ids = rec[starts]
+        count[ids] += np.diff(np.r_[starts, len(rec)])
+        for c in channels:
+            x = np.asarray(block[c][lo:hi], dtype=np.float64)
+            sums[c][ids] += np.add.reduceat(x, starts)
+            mins[c][ids] = np.minimum(mins[c][ids], np.minimum.reduceat(x, starts))
+            maxs[c][ids] = np.maximum(maxs[c][ids], np.maximum.reduceat(x, starts))
+
+    empty = count == 0
+    out = {
+        "timestamp": pd.to_datetime(fit_t, unit="s", utc=True),
+        "n_samples": count,
+    }
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for c in channels:
+            out[f"{c}_mean"] = sums[c] / count
+            out[f"{c}_min"] = np.where(empty, np.nan, mins[c])
+            out[f"{c}_max"] = np.where(empty, np.nan, maxs[c])
+    return pd.DataFrame(out)
+
+
+def _fit_column(df_record: pd.DataFrame, column: str) -> np.ndarray:
+    """Return a FIT column as float64, with positions converted to degrees."""
+    values = pd.to_numeric(df_record[column], errors="coerce").to_numpy(np.float64)
+    if column in ("position_lat", "position_long"):
+        values = values * _SEMICIRCLE_TO_DEG
+    return values
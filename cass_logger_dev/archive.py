@@ -0,0 +1,268 @@
+"""
+Compressed, block-indexed archive format for raw Cass Logger recordings.
+
+A ``.cassz`` archive stores the records of one ``.bin`` file in fixed-size
+blocks. Within a block every field is stored column-wise: integer fields
+(tmicros and the i2 ADC channels) are delta-encoded with wrap-around
+arithmetic, float fields are byte-shuffled, and the block is compressed
+with a stdlib codec. A JSON index at the end of the file records each
+block's offset and time span, so reads decompress only the blocks they
+touch. The encoding is lossless.
+
+Layout
+------
+    MAGIC | block 0 | block 1 | ... | index (JSON) | index length (u64 LE) | MAGIC
+
+Exports
+-------
+ARCHIVE_SUFFIX : str
+    File suffix used for archives (".cassz").
+compress_file : function
+    Write a ``.bin`` recording as an archive.
+ArchiveReader
+    Random-access reader returning records or processed DataFrames.
+"""
+
+from __future__ import annotations
+
+import json
+import lzma
+import struct
+import zlib
+from pathlib import Path
+from typing import Optional, Union
+import numpy as np
+from ._lazy import lazy_import
+from .parsing import (
+    TimeBase,
+    elapsed_micros,
+    load_records,
+    record_dtype,
+    records_to_table,
+    resolve_fw_key,
+    time_base,
+)
+from .tracing import span
+
+pd = lazy_import("pandas")
+
+ARCHIVE_SUFFIX = ".cassz"
+"""File suffix used for compressed archives."""
+
+MAGIC = b"CASSZ\x01\x00\x00"
+FORMAT_VERSION = 1
+
+_CODECS = {
+    "zlib": (lambda b, level: zlib.compress(b, level), zlib.decompress),
+    "lzma": (lambda b, level: lzma.compress(b, preset=level), lzma.decompress),
+}
+
+
+def _encode_column(col: np.ndarray) -> bytes:
+    """Delta-encode an integer column or byte-shuffle any other column."""
+    if col.dtype.kind == "i":
+        delta = np.empty_like(col)
+        delta[:1] = col[:1]
+        np.subtract(col[1:], col[:-1], out=delta[1:])  # wraps, reversible by cumsum
+        return delta.tobytes()
+    raw = np.ascontiguousarray(col).view(np.uint8).reshape(len(col), col.dtype.itemsize)
+    return raw.T.tobytes()
+
+
+def _decode_column(buf: bytes, dtype: np.dtype, n: int) -> np.ndarray:
+    """Invert _encode_column."""
+    if dtype.kind == "i":
+        return np.cumsum(np.frombuffer(buf, dtype=dtype, count=n), dtype=dtype)
+    shuffled = np.frombuffer(buf, dtype=np.uint8).reshape(dtype.itemsize, n)
+    return shuffled.T.copy().view(dtype).reshape(n)
+
+
+def compress_file(
+    src: Union[str, Path],
+    dst: Optional[Union[str, Path]] = None,
+    fw_ver: str = "std",
+    block_records: int = 16384,
+    codec: str = "zlib",
+    level: int = 6,
+) -> Path:
+    """Compress a raw ``.bin`` recording into a ``.cassz`` archive.
+
+    Parameters
+    ----------
+    src : str or Path
+        Raw binary file.
+    dst : str or Path, optional
+        Output path. Defaults to src with the ARCHIVE_SUFFIX suffix.
+    fw_ver : str, optional
+        Firmware version string of the recording (default "std").
+    block_records : int, optional
+        Records per compressed block (default 16384).
+    codec : str, optional
+        "zlib" (default) or "lzma".
+    level : int, optional
+        Compression level passed to the codec (default 6).
+
+    Returns
+    -------
+    Path
+        Path to the written archive.
+
+    Raises
+    ------
+    ValueError
+        If codec is not supported.
+    """
+    if codec not in _CODECS:
+        raise ValueError(f"Unsupported codec: {codec}")
+    compress = _CODECS[codec][0]
+    src = Path(src)
+    dst = Path(dst) if dst is not None else src.with_suffix(ARCHIVE_SUFFIX)
+
+    records = load_records(src, fw_ver, mmap=True)
+    base = time_base(records["tmicros"])
+    fields = records.dtype.names
+
+    blocks = []
+    with open(dst, "wb") as f:
+        f.write(MAGIC)
+        for start in range(0, len(records), block_records):
+            block = records[start:start + block_records]
+            payload = b"".join(_encode_column(np.asarray(block[name])) for name in fields)
+            data = compress(payload, level)
+            elapsed = elapsed_micros(block["tmicros"], start, base)
+            blocks.append([f.tell(), len(data), start, len(block), int(elapsed[0]), int(elapsed[-1])])
+            f.write(data)
+
+        index = {
+            "version": FORMAT_VERSION,
+            "fw_key": resolve_fw_key(fw_ver),
+            "codec": codec,
+            "n_records": len(records),
+            "time_base": list(base),
+            "source_name": src.name,
+            "blocks": blocks,
+        }
+        index_bytes = json.dumps(index).encode("utf-8")
+        f.write(index_bytes)
+        f.write(struct.pack("<Q", len(index_bytes)))
+        f.write(MAGIC)
+    return dst
+
+
+class ArchiveReader:
+    """Random-access reader for ``.cassz`` archives.
+
+    Parameters
+    ----------
+    path : str or Path
+        Archive written by ``compress_file``.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a Cass archive.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a Cass archive: {self.path}")
+            f.seek(-(len(MAGIC) + 8), 2)
+            (index_len,) = struct.unpack("<Q", f.read(8))
+            f.seek(-(len(MAGIC) + 8 + index_len), 2)
+            index = json.loads(f.read(index_len))
+
+        self.fw_key = index["fw_key"]
+        self.codec = index["codec"]
+        self.n_records = index["n_records"]
+        self.time_base = TimeBase(*index["time_base"])
+        self.source_name = index["source_name"]
+        self.dtype = record_dtype(self.fw_key)
+        self._decompress = _CODECS[self.codec][1]
+        # columns: offset, length, first record, n records, t start [us], t end [us]
+        self._blocks = np.array(index["blocks"], dtype=np.int64).reshape(-1, 6)
+
+    @property
+    def n_blocks(self) -> int:
+        """Number of compressed blocks."""
+        return len(self._blocks)
+
+    @property
+    def duration(self) -> float:
+        """Elapsed time of the last record in seconds."""
+        return self._blocks[-1, 5] * 1e-6 if self.n_blocks else 0.0
+
+    def read_records(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Return records ``start:stop`` as a structured array.
+
+        Only the blocks overlapping the range are decompressed.
+        """
+        stop = self.n_records if stop is None else min(stop, self.n_records)
+        if stop <= start:
+            return np.empty(0, dtype=self.dtype)
+        first = np.searchsorted(self._blocks[:, 2], start, side="right") - 1
+        last = np.searchsorted(self._blocks[:, 2], stop, side="left")
+        with span("archive.decode", path=str(self.path), blocks=int(last - first)) as s:
+            parts = [self._read_block(i) for i in range(first, last)]
+            records = np.concatenate(parts) if len(parts) > 1 else parts[0]
+            s.set(bytes=records.nbytes, records=len(records),
+                  compressed_bytes=int(self._blocks[first:last, 1].sum()))
+        offset = int(self._blocks[first, 2])
+        return records[start - offset:stop - offset]
+
+    def read_window(self, t0: float, t1: float) -> np.ndarray:
+        """Return the records with elapsed time in ``[t0, t1]`` seconds.
+
+        Only blocks whose time span overlaps the window are decompressed.
+        """
+        return self._window(t0, t1)[1]
+
+    def to_frame(self, backend: str = "pandas") -> pd.DataFrame:
+        """Return the whole recording as ``process_data_file`` would.
+
+        ``backend`` selects the output type; see ``parsing.records_to_table``.
+        """
+        return records_to_table(self.read_records(), self.fw_key, backend=backend)
+
+    def window_frame(self, t0: float, t1: float, backend: str = "pandas") -> pd.DataFrame:
+        """Return a processed DataFrame of the records in ``[t0, t1]`` seconds.
+
+        The ``tmicros`` and ``t`` columns keep the time axis of the whole
+        recording rather than restarting at zero. ``backend`` selects the
+        output type; see ``parsing.records_to_table``.
+        """
+        start, records = self._window(t0, t1)
+        elapsed = elapsed_micros(records["tmicros"], start, self.time_base)
+        return records_to_table(records, self.fw_key, elapsed=elapsed, backend=backend)
+
+    # --- Private Methods ---
+
+    def _read_block(self, i: int) -> np.ndarray:
+        offset, length, _, n, _, _ = (int(v) for v in self._blocks[i])
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            payload = self._decompress(f.read(length))
+        out = np.empty(n, dtype=self.dtype)
+        pos = 0
+        for name in self.dtype.names:
+            field_dtype = self.dtype.fields[name][0]
+            nbytes = field_dtype.itemsize * n
+            out[name] = _decode_column(payload[pos:pos + nbytes], field_dtype, n)
+            pos += nbytes
+        return out
+
+    def _window(self, t0: float, t1: float):
+        """Return ``(first record index, records)`` for the window [t0, t1] s."""
+        t0_us, t1_us = t0 * 1e6, t1 * 1e6
+        hits = np.flatnonzero((self._blocks[:, 5] >= t0_us) & (self._blocks[:, 4] <= t1_us))
+        if not len(hits):
+            return 0, np.empty(0, dtype=self.dtype)
+        start = int(self._blocks[hits[0], 2])
+        stop = int(self._blocks[hits[-1], 2] + self._blocks[hits[-1], 3])
+        records = self.read_records(start, stop)
+        elapsed = elapsed_micros(records["tmicros"], start, self.time_base)
+        mask = np.flatnonzero((elapsed >= t0_us) & (elapsed <= t1_us))
+        if not len(mask):
+            return 0, np.empty(0, dtype=self.dtype)
+        return start + int(mask[0]), records[mask[0]:mask[-1] + 1]
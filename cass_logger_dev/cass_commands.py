@@ -13,23 +13,40 @@ Notes
 - Requires two USB serial ports (data + command). Main testing done on macOS/Linux, limited testing on Windows.
 """
 
+from __future__ import annotations
+
 import os
 import time
-import serial
-import fitdecode
-import numpy as np
 from pathlib import Path
-import pandas as pd
-import serial.tools.list_ports
 import datetime
 import warnings
-from .firmware_structs import (
-    FIRMWARE_DTYPES,
-    COLUMN_ORDERS,
+from ._lazy import lazy_import
+from .firmware_structs import SD_BUFF_SIZE
+from .parsing import (
+    columns_to_table,
+    handle_tmicros_rollover,
+    load_records,
+    records_to_columns,
+    records_to_table,
+    resolve_fw_key,
 )
-from typing import Optional, Union, Dict, List
+from .archive import ARCHIVE_SUFFIX, ArchiveReader
+from .device_catalog import DeviceCatalog
+from .download_planner import DownloadPlan, DownloadPlanner
+from .fit import read_fit_file
+from .frame_cache import active_cache, cache_key
+from .port_cache import confirm_roles, default_role_cache, handshake
+from .tracing import span
+from .transfer import CAPABILITY, parse_capabilities, read_frame
+from .manifest import FileSummarizer, read_manifest, summarize_file, write_manifest
+from typing import Callable, Generator, Optional, Union, Dict, List
 import re
 import platform
+import numpy as np
+
+# heavy dependencies are imported on first use (see _lazy)
+serial = lazy_import("serial")
+list_ports = lazy_import("serial.tools.list_ports")
 
 
 class CassCommands:
@@ -56,11 +73,22 @@ class CassCommands:
     Note: On Windows, make sure the device drivers are installed and the device
     appears in Device Manager under "Ports (COM & LPT)".
     """
+    SD_BUFF_SIZE = SD_BUFF_SIZE
+    """Size in bytes of one SD buffer transferred by the 't' command."""
+
+    _MAX_FRAME_FAILURES = 3  # bad compressed frames in a row before falling back to 't'
+
     def __init__(self):
         self._ser_data = None
         self._ser_command = None
         self.reset_buff_used = False
         self._manual_ports = None           # For manual port specification
+        self._catalog = None
+        self.link_throughput_bps = None     # measured by read_file, or the device's cached value
+        self.port_cache = None              # PortRoleCache; None uses default_role_cache()
+        self._device_key = None             # port role cache key of the connected device
+        self.compressed_transfer = True     # use compressed buffers if the firmware offers them
+        self._transfer_caps = None          # capability tokens, once negotiated
 
     # --- Properties ---
 
@@ -116,40 +144,35 @@ class CassCommands:
         ser.flush()
         self._ser_command = ser
 
+    @property
+    def catalog(self):
+        """Cached DeviceCatalog of the files on the SD card."""
+        if self._catalog is None:
+            self._catalog = DeviceCatalog(self)
+        return self._catalog
+
     # --- Public Instance Methods ---
 
-    def get_serial_ports(self):
+    def get_serial_ports(self, ports=None):
         """Cross-platform method to find the two logger serial ports.
-        
+
+        Parameters
+        ----------
+        ports : list, optional
+            ``list_ports.comports()`` entries (default: enumerate now).
+
         Returns
         -------
         list of str or None
             Two device paths (e.g. ['/dev/cu.usbmodem1', '/dev/cu.usbmodem2']),
             or None if exactly two USB modem ports are not found.
         """
-        ports = serial.tools.list_ports.comports()
-        logger_ports = []
-        
+        if ports is None:
+            ports = list_ports.comports()
+        logger_ports = [port.device for port in ports if self.is_logger_port(port)]
+
         system = platform.system().lower()
-        
-        if system == "windows":
-            # look for COM ports with specific characteristics
-            for port in ports:
-                if port.vid is not None:  # USB device
-                    # add common USB-to-serial converter VIDs or device descriptions
-                    if (
-                        port.vid == 0x16C0
-                        or "teensy" in port.description.lower()
-                        or "usb serial" in port.description.lower()
-                        or "ch340" in port.description.lower()
-                        or "cp210" in port.description.lower()
-                        or "ftdi" in port.description.lower()
-                    ):
-                        logger_ports.append(port.device)
-        else:
-            # macOS/Linux
-            logger_ports = [port.device for port in ports if "usbmodem" in port.device]
-        
+
         if len(logger_ports) != 2:
             print(f"Expected 2 serial ports, found {len(logger_ports)}: {logger_ports}")
             print("Available ports:")
@@ -170,13 +193,42 @@ class CassCommands:
         else:
             return logger_ports
 
-    def set_manual_serial_ports(self, data_port: str, command_port: str):
+    @staticmethod
+    def is_logger_port(port) -> bool:
+        """Return True if a ``list_ports.comports()`` entry looks like a logger port.
+
+        On Windows, USB ports with the Teensy vendor ID or a common USB
+        serial description match; on macOS/Linux, "usbmodem" devices do.
+        """
+        if platform.system().lower() == "windows":
+            # look for COM ports with specific characteristics
+            if port.vid is None:  # not a USB device
+                return False
+            # add common USB-to-serial converter VIDs or device descriptions
+            description = (port.description or "").lower()
+            return port.vid == 0x16C0 or any(
+                name in description for name in ("teensy", "usb serial", "ch340", "cp210", "ftdi")
+            )
+        # macOS/Linux
+        return "usbmodem" in port.device
+
+    def set_manual_serial_ports(self, data_port: str, command_port: str, verify: bool = True):
         """Manually specify the serial ports if auto-detection fails.
         
         Args:
             data_port: Port name for data communication (e.g., 'COM3' on Windows, '/dev/ttyACM0' on Linux)
             command_port: Port name for command communication (e.g., 'COM4' on Windows, '/dev/ttyACM1' on Linux)
+            verify: Open and close both ports now to check they are accessible (default True).
+                If False, the ports are only recorded; roles that are not in the port role
+                cache yet are cached as unverified and checked by the handshake on first use.
         """
+        if not verify:
+            self._manual_ports = [data_port, command_port]
+            cache = self.port_cache or default_role_cache()
+            key, cached, _ = cache.lookup(self._manual_ports)
+            if key is not None and cached is None:
+                cache.store(key, data_port, command_port, verified=False)
+            return True
         try:
             # Test that both ports can be opened
             test_data = serial.Serial(data_port, 9600, timeout=1)
@@ -194,7 +246,7 @@ class CassCommands:
 
     def list_available_ports(self):
         """List all available serial ports for manual selection."""
-        ports = serial.tools.list_ports.comports()
+        ports = list_ports.comports()
         print("Available serial ports:")
         for i, port in enumerate(ports):
             print(f"  [{i}] {port.device}: {port.description}")
@@ -208,7 +260,7 @@ class CassCommands:
             print("This diagnostic is only for Windows systems.")
             return
             
-        ports = serial.tools.list_ports.comports()
+        ports = list_ports.comports()
         print("=== Windows Serial Port Diagnostics ===")
         print(f"Found {len(ports)} total ports:")
         
@@ -280,6 +332,7 @@ class CassCommands:
                 break
             unix_time += char
 
+        self.catalog.invalidate()
         self._close_serial()
 
         if unix_time:
@@ -308,53 +361,39 @@ class CassCommands:
             unix_time += char
         return unix_time
 
-    def list_files(self):
+    def list_files(self, refresh=False):
         """List all files stored on the device SD card.
 
+        Parameters
+        ----------
+        refresh : bool, optional
+            Refetch the listing even if the catalog is cached (default False).
+
         Returns
         -------
         list of str
             Filenames on the device (one per entry).
         """
-        self._open_serial()
-        self._flush_all()
-
-        self.ser_command.write(b"l")  # list files
+        if refresh:
+            self.catalog.invalidate()
+        return self.catalog.names
 
-        result = b""
-        while b"xxx" not in result:
-            if self.ser_data.in_waiting > 0:
-                result += self.ser_data.read(self.ser_data.in_waiting)
-        result = result.decode("utf-8")
-
-        # self._close_serial()
-        return result.splitlines()[:-1]
-
-    def list_file_sizes(self):
+    def list_file_sizes(self, refresh=False):
         """Return the binary size (in bytes) of each file on the device.
 
+        Parameters
+        ----------
+        refresh : bool, optional
+            Refetch the listing even if the catalog is cached (default False).
+
         Returns
         -------
         list of int
             File sizes in the same order as list_files().
         """
-        self._open_serial()
-        self._flush_all()
-
-        files = self.list_files()  # list files
-        num_files = len(files)
-
-        self.ser_command.write(b"z")  # list file sizes
-
-        my_file_sizes = []
-        my_file_sizes = [
-            int(self.ser_data.read_until(b"\n").decode("utf-8").strip(), 2)
-            for i in range(num_files)
-        ]
-
-        # self._close_serial()
-
-        return my_file_sizes
+        if refresh:
+            self.catalog.invalidate()
+        return self.catalog.sizes
 
     def delete_all_files(self, prompt_user=False):
         """Delete all files from the device SD card.
@@ -375,17 +414,95 @@ class CassCommands:
             if user_input.lower() != "y":
                 print("Operation cancelled by user.")
                 return 0
-        [self._delete_file(filename) for filename in self.list_files()]
+        return self.delete_files()
+
+    def delete_files(
+        self,
+        filenames: Optional[List[str]] = None,
+        predicate: Optional[Callable[[str, int], bool]] = None,
+        verified_dir: Optional[Union[str, Path]] = None,
+        prompt_user: bool = False,
+        window: int = 16,
+    ):
+        """Delete a selection of files from the device SD card.
 
-        self._close_serial()
+        Delete commands are pipelined: up to ``window`` commands are sent
+        before their acknowledgements are read back, and the result is
+        verified with a single listing at the end.
+
+        Parameters
+        ----------
+        filenames : list of str, optional
+            Files to delete. Defaults to every file on the device.
+        predicate : callable, optional
+            ``predicate(filename, file_size) -> bool``; only files for which
+            it returns True are deleted.
+        verified_dir : str or Path, optional
+            Only delete files whose local copy in this directory is as
+            large as the device file. ``read_file`` does not transfer a
+            final partial SD buffer, so files whose size is not a multiple
+            of SD_BUFF_SIZE are never deleted this way (a warning lists
+            them).
+        prompt_user : bool, optional
+            If True, ask for confirmation before deleting (default False).
+        window : int, optional
+            Maximum number of unacknowledged delete commands (default 16).
+
+        Returns
+        -------
+        bool or int
+            True on success, False if selected files remain after deletion,
+            0 if the user cancelled.
+        """
+        device_files = self.list_files()
+        sizes = dict(self.catalog.items())
+
+        wanted = set(device_files if filenames is None else filenames)
+        selected = [f for f in device_files if f in wanted]
+        if predicate is not None:
+            selected = [f for f in selected if predicate(f, sizes[f])]
+        if verified_dir is not None:
+            unverified = [
+                f for f in selected
+                if not self._is_verified_locally(verified_dir, f, sizes[f])
+            ]
+            if unverified:
+                warnings.warn(
+                    f"Not deleting {len(unverified)} file(s) without a complete local copy "
+                    f"in {verified_dir}: {', '.join(unverified)}"
+                )
+            selected = [f for f in selected if f not in unverified]
+        if not selected:
+            return True
+
+        if prompt_user:
+            user_input = input(f"Delete {len(selected)} file(s) from the device? (y/n): ")
+            if user_input.lower() != "y":
+                print("Operation cancelled by user.")
+                return 0
 
-        if len(self.list_files()) == 0:
+        self.ser_command.reset_input_buffer()
+        self.catalog.invalidate()
+        pending = 0
+        for filename in selected:
+            self._send_delete(filename)
+            pending += 1
+            if pending >= window:
+                self.ser_command.flush()
+                self._read_delete_ack()
+                pending -= 1
+        self.ser_command.flush()
+        for _ in range(pending):
+            self._read_delete_ack()
+
+        remaining = set(self.list_files(refresh=True)) & set(selected)
+        if not remaining:
             return True
         else:
-            warnings.warn("Warning: error deleting files.")
+            warnings.warn(f"Warning: error deleting files: {sorted(remaining)}")
             return False
 
-    def read_file(self, filename, file_size):
+    def read_file(self, filename, file_size, progress: Optional[Callable[[int], None]] = None):
         """Download a single file from the device as raw bytes.
 
         Reads the file in 5120-byte SD buffer chunks. Uses _reset_buff to
@@ -397,16 +514,37 @@ class CassCommands:
             Name of the file on the device.
         file_size : int
             Size of the file in bytes (as returned by list_file_sizes).
+        progress : callable, optional
+            Called with the number of bytes received so far after each
+            buffer.
 
         Returns
         -------
         list of int
             Raw byte values of the file contents.
         """
+        steps = self.read_file_steps(filename, file_size, progress)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as done:
+                return done.value
+
+    def read_file_steps(
+        self, filename, file_size, progress: Optional[Callable[[int], None]] = None
+    ) -> Generator[int, None, list]:
+        """Generator form of read_file that pauses after every SD buffer.
+
+        Yields the number of bytes received so far after each buffer; the
+        generator's return value is the file contents as read_file returns
+        them. Between buffers no transfer is in flight, so other commands
+        may use the ports (see ``scheduler.CommandScheduler``). Closing
+        the generator early closes the file on the device.
+        """
         filename_term = filename + "x"
         filename_term = bytes(filename_term, "utf-8")
 
-        sd_buff_size = 5120
+        sd_buff_size = self.SD_BUFF_SIZE
         num_buffs = file_size / sd_buff_size
         fractional_buffs = num_buffs - int(num_buffs)
         # TODO: add fractional buffer transfer at end
@@ -415,62 +553,92 @@ class CassCommands:
         num_buffs = int(num_buffs)
         bytes_received = []
 
+        time_start = time.monotonic()
+        compressed = self.compressed_transfer and self._negotiate_transfer()
         self.ser_command.write(b"o")  # open target file
         self.ser_data.write(filename_term)
 
         sd_buff = bytes()  # empty byte array for current buffer
         sd_byte_idx = 0  # byte index in current buffer
         retry_loop = False
+        frame_failures = 0  # consecutive bad compressed frames
         i = 0  # current buffer index
-        while i < num_buffs:
-            # read each buffer
-            self.ser_command.write(b"t")  # send command for Teensy to send buffer
-            self.ser_command.flush()  # wait until command is sent
-            time_in_buffer = time.monotonic()
-
-            sd_byte_idx = 0
-            retry_loop = False
-            while sd_byte_idx < sd_buff_size:
-                # read each byte in buffer
-                num_read = min(  # number of bytes to read
-                    int(self.ser_data.in_waiting),  # number of bytes in serial buffer
-                    sd_buff_size - sd_byte_idx,  # number of bytes remaining in buffer
-                )
-                if num_read > 0:
-                    bytesIn = self.ser_data.read(num_read)  # incoming buffer
-                    sd_byte_idx += num_read
-                    sd_buff += bytesIn
+        try:
+            while i < num_buffs:
+                # read each buffer
+                if compressed:
+                    self.ser_command.write(b"b")  # send buffer as a compressed frame
+                    self.ser_command.flush()
+                    try:
+                        sd_buff = read_frame(self.ser_data, sd_buff_size)
+                        frame_failures = 0
+                    except (TimeoutError, ValueError) as exc:
+                        print(f"Bad compressed buffer {i} ({exc}), requesting it again")
+                        self.ser_data.reset_input_buffer()
+                        self._reset_buff(i * sd_buff_size, filename)
+                        self.reset_buff_used = True
+                        sd_buff = bytes()
+                        frame_failures += 1
+                        if frame_failures >= self._MAX_FRAME_FAILURES:
+                            warnings.warn(
+                                "Repeated compressed transfer errors; using 't' transfers"
+                            )
+                            compressed = False
+                            self._transfer_caps = set()
+                        continue
+                else:
+                    self.ser_command.write(b"t")  # send command for Teensy to send buffer
+                    self.ser_command.flush()  # wait until command is sent
                     time_in_buffer = time.monotonic()
-                elif num_read == 0 and (time.monotonic() - time_in_buffer > 0.1):
-                    # NOTE: why does this condition represent a data corruption?
-                    # reset the position in the file to (curr_position - sd_byte_idx)
-                    # while (self.ser_data.in_waiting) > 0:
-                    #     self.ser_data.read(self.ser_data.in_waiting)  # clear serial buffer
-                    #     print("Clearing serial buffer...")              # doesn't seem to be doing anything
-                    self.ser_data.reset_input_buffer()  # clear serial buffer before initiating reset
-                    # self.ser_data.reset_output_buffer()
-                    buff_success = self._reset_buff((i) * sd_buff_size, filename)
-                    sd_buff = []
-                    retry_loop = True
-                    self.reset_buff_used = True
-
-                    break
-
-            if retry_loop:
-                i -= 1
-
-            i += 1
-            bytes_received.extend(sd_buff)
-            sd_buff = bytes()
-            sd_byte_idx = 0
+
+                    sd_byte_idx = 0
+                    retry_loop = False
+                    while sd_byte_idx < sd_buff_size:
+                        # read each byte in buffer
+                        num_read = min(  # number of bytes to read
+                            int(self.ser_data.in_waiting),  # number of bytes in serial buffer
+                            sd_buff_size - sd_byte_idx,  # number of bytes remaining in buffer
+                        )
+                        if num_read > 0:
+                            bytesIn = self.ser_data.read(num_read)  # incoming buffer
+                            sd_byte_idx += num_read
+                            sd_buff += bytesIn
+                            time_in_buffer = time.monotonic()
+                        elif num_read == 0 and (time.monotonic() - time_in_buffer > 0.1):
+                            # NOTE: why does this condition represent a data corruption?
+                            # reset the position in the file to (curr_position - sd_byte_idx)
+                            # while (self.ser_data.in_waiting) > 0:
+                            #     self.ser_data.read(self.ser_data.in_waiting)  # clear serial buffer
+                            #     print("Clearing serial buffer...")              # doesn't seem to be doing anything
+                            self.ser_data.reset_input_buffer()  # clear serial buffer before initiating reset
+                            # self.ser_data.reset_output_buffer()
+                            buff_success = self._reset_buff((i) * sd_buff_size, filename)
+                            sd_buff = []
+                            retry_loop = True
+                            self.reset_buff_used = True
+
+                            break
+
+                if retry_loop:
+                    i -= 1
+
+                i += 1
+                bytes_received.extend(sd_buff)
+                sd_buff = bytes()
+                sd_byte_idx = 0
+                if progress is not None:
+                    progress(len(bytes_received))
+                yield len(bytes_received)
+        finally:
+            self.ser_command.write(b"c")  # close target file
+            self._close_serial()
 
         # DEBUG
         expected_byte_number = num_buffs * sd_buff_size
         number_buffs_off = expected_byte_number - len(bytes_received)
         print(f"Number of bytes short = {number_buffs_off} ({filename})")
 
-        self.ser_command.write(b"c")  # close target file
-        self._close_serial()
+        self._record_throughput(len(bytes_received), time.monotonic() - time_start)
         return bytes_received
 
     def bytes_to_file(
@@ -500,12 +668,21 @@ class CassCommands:
             f.write(bytes(my_bytes))
         return filepath
 
-    def download_all(self):
+    def download_all(self, delete_after=False):
         """Download all files from the device and write a metadata file.
 
         Files are saved to a timestamped directory (tmp_<unix>). A
-        metadata.txt file containing the firmware version and device ID
-        is written alongside them.
+        metadata.txt file containing the firmware version, device ID,
+        device RTC time at download and the file order is written
+        alongside them, plus a manifest.json with per-file summaries.
+
+        Parameters
+        ----------
+        delete_after : bool, optional
+            If True, delete each file from the device whose local copy is
+            as large as the device file (default False). ``read_file`` does
+            not transfer a final partial SD buffer, so files whose size is
+            not a multiple of SD_BUFF_SIZE stay on the device.
 
         Returns
         -------
@@ -513,27 +690,148 @@ class CassCommands:
             Path to the directory containing the downloaded files,
             or an empty list if no files were found on the device.
         """
-        my_filenames = self.list_files()
-        my_file_sizes = self.list_file_sizes()
-        if not len(my_filenames):
+        return self.download_plan(self.plan_download(), delete_after=delete_after)
+
+    def plan_download(self, dir_name=None, **filters):
+        """Build a DownloadPlan for the files currently on the device.
+
+        Keyword arguments are passed to ``DownloadPlanner.plan`` (``include``,
+        ``exclude``, ``min_size``, ``max_size``, ``newest``, ``policy``,
+        ``max_bytes``, ``max_seconds``). The ETA uses the throughput measured
+        by the most recent transfer, which is kept per device in the port
+        role cache; the plan is marked ``throughput_assumed`` if the device
+        has never been measured.
+
+        Parameters
+        ----------
+        dir_name : str or Path, optional
+            Download directory; files it already holds complete copies of
+            are left out of the plan before budgets are applied.
+
+        Returns
+        -------
+        DownloadPlan
+        """
+        items = self.catalog.items()
+        if dir_name is not None:
+            filters["skip"] = {
+                name for name, size in items if self._is_downloaded_locally(dir_name, name, size)
+            }
+        planner = DownloadPlanner(items, self.link_throughput_bps)
+        return planner.plan(**filters)
+
+    def download_plan(
+        self,
+        plan: DownloadPlan,
+        dir_name=None,
+        delete_after=False,
+        skip_existing=False,
+        progress: Optional[Callable[[int, int, str], None]] = None,
+    ):
+        """Download the files of a DownloadPlan in plan order.
+
+        If the plan has a time budget, no new file is started once it has
+        been used up. A metadata.txt file is written as in download_all,
+        together with a manifest.json of per-file summaries (see
+        ``manifest``) computed from the bytes as each file lands.
+
+        Parameters
+        ----------
+        plan : DownloadPlan
+            Plan returned by plan_download.
+        dir_name : str, optional
+            Output directory. Defaults to a timestamped tmp_<unix> directory.
+        delete_after : bool, optional
+            If True, delete downloaded files from the device whose local
+            copies are as large as the device files (default False); see
+            download_all.
+        skip_existing : bool, optional
+            If True, files that dir_name already holds a complete copy of
+            are not transferred again, and files listed by an earlier
+            download into dir_name stay in metadata.txt and the manifest
+            (default False).
+        progress : callable, optional
+            Called as ``progress(bytes_done, bytes_total, filename)`` while
+            files are transferred; totals count transferred bytes only.
+
+        Returns
+        -------
+        str
+            Path to the directory containing the downloaded files,
+            or an empty list if the plan is empty.
+        """
+        if not len(plan):
+            existing = [name for name, reason in plan.skipped if reason == "exists"]
+            if delete_after and dir_name is not None and existing:
+                self.delete_files(existing, verified_dir=dir_name)
             return []
-        dir_name = "tmp_{}".format(int(time.time()))
+        if dir_name is None:
+            dir_name = "tmp_{}".format(int(time.time()))
+
+        fw_ver = self.get_fw_ver()
+        my_filenames = []
+        summaries = {}
+        if skip_existing:
+            my_filenames, summaries = self._previous_download(dir_name)
+        skipped = {
+            planned.filename
+            for planned in plan.files
+            if skip_existing and self._is_downloaded_locally(dir_name, planned.filename, planned.size)
+        }
+        pending = [planned for planned in plan.files if planned.filename not in skipped]
+        if skipped:
+            print(f"Skipping {len(skipped)} file(s) already in {dir_name}")
+        # files plan_download(dir_name=...) left out as already downloaded
+        skipped.update(
+            name for name, reason in plan.skipped
+            if reason == "exists" and Path(dir_name, name).is_file()
+        )
 
-        filepaths = [
-            self.bytes_to_file(self.read_file(filename, file_size), filename, dir_name)
-            for filename, file_size in zip(my_filenames, my_file_sizes)
-        ]
+        total = sum(self._expected_download_size(planned.size) for planned in pending)
+        done = 0
+        time_start = time.monotonic()
+        for planned in pending:
+            if plan.max_seconds is not None and time.monotonic() - time_start > plan.max_seconds:
+                print(f"Time budget used up, stopping before {planned.filename}")
+                break
+            file_progress = None
+            if progress is not None:
+
+                def file_progress(n, base=done, name=planned.filename):
+                    progress(base + n, total, name)
+
+            data = bytes(self.read_file(planned.filename, planned.size, file_progress))
+            done += len(data)
+            self.bytes_to_file(data, planned.filename, dir_name)
+            summarizer = FileSummarizer(planned.filename, fw_ver)
+            summarizer.update(data)
+            summaries[planned.filename] = summarizer.result()
+        listed = [planned.filename for planned in plan.files]
+        listed += [name for name, reason in plan.skipped if reason == "exists"]
+        for filename in listed:
+            if filename in summaries or filename in skipped:
+                if filename not in my_filenames:
+                    my_filenames.append(filename)
+        for filename in my_filenames:
+            if filename not in summaries:
+                summaries[filename] = summarize_file(Path(dir_name, filename), fw_ver)
 
         self._flush_all()
         # write metadata
-        fw_ver = self.get_fw_ver()
         device_id = self.get_device_ID()
+        rtc_time = self.get_RTC_time()
         md_path = Path(dir_name, "metadata.txt")
         with open(md_path, "w") as meta_file:
             meta_file.write(f"Firmware Ver: {fw_ver}\n")
             meta_file.write(f"Device ID: {device_id}\n")
+            meta_file.write(f"RTC Time: {rtc_time}\n")
+            meta_file.write(f"Files: {', '.join(my_filenames)}\n")
+        write_manifest(dir_name, [summaries[f] for f in my_filenames], fw_ver, device_id, rtc_time)
 
-        return filepaths[-1]
+        if delete_after:
+            self.delete_files(my_filenames, verified_dir=dir_name)
+
+        return dir_name
 
     def put_device_ID(self, device_ID):
         """Write a device identifier string to EEPROM.
@@ -650,6 +948,27 @@ class CassCommands:
 
         return rtc_install
 
+    def supports_compressed_transfer(self, timeout: float = 0.3) -> bool:
+        """Return whether the firmware offers compressed buffer transfers.
+
+        Queries the device with 'k' the first time (see ``transfer``);
+        firmware that does not answer within timeout seconds is assumed to
+        support only 't' transfers. The answer is kept for this instance.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait for the capability reply (default 0.3).
+
+        Returns
+        -------
+        bool
+            True if downloads will use compressed frames.
+        """
+        supported = self._negotiate_transfer(timeout)
+        self._close_serial()
+        return supported
+
     def get_fw_ver(self):
         """Read the firmware version string from the device.
 
@@ -672,61 +991,121 @@ class CassCommands:
     # --- Static and Class Methods
 
     @classmethod
-    def process_data_file(cls, full_filename: Union[str, Path], fw_ver="std"):
+    def process_data_file(
+        cls,
+        full_filename: Union[str, Path],
+        fw_ver="std",
+        backend: str = "pandas",
+        columns: Optional[List[str]] = None,
+    ):
         """Parse a binary sensor data file into a pandas DataFrame.
 
         The firmware version string determines which NumPy dtype is used for
         parsing. The tmicros column is zero-referenced and a 't' column
-        (seconds, float64) is inserted.
+        (seconds, float64) is inserted. Compressed ``.cassz`` archives are
+        read transparently; their firmware version is stored in the archive.
 
         Parameters
         ----------
         full_filename : str
-            Path to the binary file.
+            Path to the binary file or archive.
         fw_ver : str, optional
             Firmware version string. Must contain "i2c_2", "i2c_1", or
             default to "std" (default "std").
+        backend : str, optional
+            Output type, one of ``parsing.BACKENDS``: "pandas" (default),
+            "arrow" (pyarrow Table), "polars" (polars DataFrame) or "numpy"
+            (dict of column arrays). Arrow and Polars columns are built
+            directly over NumPy buffers; if their package is missing a
+            pandas DataFrame is returned with a warning.
+        columns : list of str, optional
+            Return only these columns (including "tmicros" and "t"), in
+            this order. For ``.bin`` files only the selected channels are
+            gathered from a memory map.
 
         Returns
         -------
         pd.DataFrame
-            Parsed sensor data with columns ordered per COLUMN_ORDERS.
+            Parsed sensor data with columns ordered per COLUMN_ORDERS (or
+            the equivalent table of the selected backend).
 
         Raises
         ------
         ValueError
-            If fw_ver does not map to a known firmware dtype.
+            If fw_ver does not map to a known firmware dtype, backend is
+            unknown, or columns names a column the firmware does not log.
+
+        Notes
+        -----
+        With ``frame_cache.enable_cache()`` the parsed columns are kept in
+        an in-memory LRU cache keyed by path, size, modification time,
+        firmware and columns; repeated calls wrap the cached read-only
+        arrays without parsing or copying.
         """
         full_filename = Path(full_filename)
+        with span("process_data_file", path=str(full_filename), backend=backend):
+            return cls._process_data_file(full_filename, fw_ver, backend, columns)
 
-        # Match firmware type based on substrings
-        if "i2c_2" in fw_ver:
-            dtype_key = "i2c_2"
-        elif "i2c_1" in fw_ver:
-            dtype_key = "i2c_1"
-        else:
-            dtype_key = "std"
-
-        try:
-            dt = FIRMWARE_DTYPES[dtype_key]()
-            column_order = COLUMN_ORDERS[dtype_key]
-        except KeyError:
-            raise ValueError(f"Unsupported firmware version: {fw_ver}")
-
-        data = np.fromfile(full_filename, dtype=dt)
-        df = pd.DataFrame(data)
-
-        if (df["tmicros"] < 0).any():
-            df["tmicros"] = df["tmicros"].astype(np.float64)
-            df["tmicros"] = cls.handle_tmicros_rollover(df["tmicros"])
-
-        df["tmicros"] -= df["tmicros"].iloc[0]
-        df.insert(1, "t", df["tmicros"] * 1e-6)
+    @classmethod
+    def _process_data_file(
+        cls, full_filename: Path, fw_ver: str, backend: str, columns: Optional[List[str]]
+    ):
+        cache = active_cache()
+        if cache is None and columns is None:
+            if full_filename.suffix == ARCHIVE_SUFFIX:
+                return ArchiveReader(full_filename).to_frame(backend)
+            return cls._parse_bin(full_filename, fw_ver, backend)
+
+        is_archive = full_filename.suffix == ARCHIVE_SUFFIX
+        dtype_key = None if is_archive else resolve_fw_key(fw_ver)
+        if cache is None:
+            cols = cls._load_columns(full_filename, dtype_key, columns)
+            return columns_to_table(cols, backend, copy=False)
+
+        pandas_out = backend == "pandas"
+        with span("cache.lookup") as s:
+            key = cache_key(full_filename, dtype_key, columns)
+            hit = cache.get_frame(key) if pandas_out else cache.get(key)
+            s.set(hit=hit is not None)
+        if hit is not None:
+            return hit if pandas_out else columns_to_table(hit, backend)
+        cols = cache.put(key, cls._load_columns(full_filename, dtype_key, columns))
+        if not pandas_out:
+            return columns_to_table(cols, backend)
+        frame = cache.get_frame(key, count=False)
+        # entries larger than the whole budget are not cached
+        return frame if frame is not None else columns_to_table(cols)
 
-        # Only reorder columns that exist in this firmware's dtype
-        df = df[[col for col in column_order if col in df.columns]]
+    @staticmethod
+    def _parse_bin(full_filename: Path, fw_ver: str, backend: str):
+        """Parse a whole ``.bin`` file into the table of an output backend."""
+        # Match firmware type based on substrings
+        dtype_key = resolve_fw_key(fw_ver)
+        # arrow/polars gather each column into its own buffer anyway, so
+        # they read straight from a memory map instead of a copy of the file
+        data = load_records(full_filename, dtype_key, mmap=backend in ("arrow", "polars"))
+        return records_to_table(data, dtype_key, backend=backend)
 
-        return df
+    @staticmethod
+    def _load_columns(
+        full_filename: Path, dtype_key: Optional[str], columns: Optional[List[str]]
+    ) -> Dict[str, np.ndarray]:
+        """Processed columns of a file as NumPy arrays, optionally projected."""
+        if dtype_key is None:
+            all_columns = ArchiveReader(full_filename).to_frame("numpy")
+        else:
+            data = load_records(full_filename, dtype_key, mmap=True)
+            all_columns = records_to_columns(data, dtype_key)
+        if columns is None:
+            columns = list(all_columns)
+        unknown = [c for c in columns if c not in all_columns]
+        if unknown:
+            raise ValueError(f"Unknown columns {unknown}; available: {list(all_columns)}")
+        # gather each selected channel out of the memory map into its own array
+        with span("columns.gather", columns=len(columns)) as s:
+            gathered = {c: np.array(all_columns[c]) for c in columns}
+            s.set(bytes=sum(col.nbytes for col in gathered.values()))
+        return gathered
 
     @staticmethod
     def find_and_parse_metadata(
@@ -753,21 +1132,24 @@ class CassCommands:
         dict, list of dict, or None
             Single parsed dict if first_only=True, list of dicts if False,
             or None if no matching file was found. Each dict contains
-            "firmware_version" and "device_id" keys.
+            "firmware_version", "device_id", "rtc_time" and "files" keys.
         """
-        files = CassCommands._find_metadata_files(
-            dir_path, filename=filename, recursive=recursive
-        )
+        with span("metadata.discover", path=str(dir_path), recursive=recursive) as s:
+            files = CassCommands._find_metadata_files(
+                dir_path, filename=filename, recursive=recursive
+            )
+            s.set(files=len(files))
         if not files:
             return None
 
         parsed = []
-        for f in files:
-            try:
-                parsed.append(CassCommands._parse_metadata_file(str(f)))
-            except Exception as exc:
-                # skip files that fail to read/parse; optionally log the error
-                parsed.append({"error": f"failed to parse {f}: {exc}"})
+        with span("metadata.parse", files=len(files)):
+            for f in files:
+                try:
+                    parsed.append(CassCommands._parse_metadata_file(str(f)))
+                except Exception as exc:
+                    # skip files that fail to read/parse; optionally log the error
+                    parsed.append({"error": f"failed to parse {f}: {exc}"})
 
         if first_only:
             return parsed[0]
@@ -789,9 +1171,7 @@ class CassCommands:
         np.ndarray
             Monotonically increasing int64 timestamp array starting from 0.
         """
-        step_size = col[1] - col[0]
-        new_col = np.arange(0, len(col) * step_size, step_size, dtype=np.int64)
-        return new_col
+        return handle_tmicros_rollover(col)
 
     @staticmethod
     def process_fit_file(filepath, filename):
@@ -809,31 +1189,19 @@ class CassCommands:
         tuple of (pd.DataFrame, pd.DataFrame)
             (df_session, df_record) — one row per session/record frame.
         """
-        my_path = str(Path(filepath, filename))
-        df_record = pd.DataFrame()
-        df_session = pd.DataFrame()
-        with fitdecode.FitReader(my_path) as fit:
-            for frame in fit:
-                if frame.frame_type == fitdecode.FIT_FRAME_DATA:
-                    if frame.name == "record":
-                        frame_data = {field.name: field.value for field in frame.fields}
-                        frame_df = pd.DataFrame([frame_data])
-                        df_record = pd.concat([df_record, frame_df], ignore_index=True)
-                    elif frame.name == "session":
-                        frame_data = {field.name: field.value for field in frame.fields}
-                        frame_df = pd.DataFrame([frame_data])
-                        df_session = pd.concat(
-                            [df_session, frame_df], ignore_index=True
-                        )
-        return df_session, df_record
+        return read_fit_file(Path(filepath, filename))
 
     # --- Private Methods ---
 
     def _establish_serial(self, baud_rate=9600):
         """Open both serial ports and identify which is data vs. command.
 
-        Sends a handshake byte to each port and uses the device response
-        to determine the correct assignment. Raises on timeout or no response.
+        Roles of known devices come from the port role cache (see
+        ``port_cache``) and are confirmed with a single probe; if the
+        device does not answer it, the entry is forgotten. Otherwise a
+        handshake byte is sent to each port and the device response
+        determines the correct assignment, which is then cached. Raises on
+        timeout or no response.
 
         Parameters
         ----------
@@ -849,12 +1217,13 @@ class CassCommands:
         RuntimeError
             If neither port returns the expected handshake response.
         """
+        ports = list_ports.comports()
         # Use manual ports if set, otherwise auto-detect
         if self._manual_ports:
             serial_ports = self._manual_ports
             print(f"Using manual ports: {serial_ports}")
         else:
-            serial_ports = self.get_serial_ports()
+            serial_ports = self.get_serial_ports(ports)
             
         if serial_ports is None:
             raise ValueError(
@@ -862,6 +1231,11 @@ class CassCommands:
                 "On Windows, you may need to use set_manual_serial_ports() or list_available_ports() "
                 "to manually specify the correct COM ports."
             )
+
+        cache = self.port_cache or default_role_cache()
+        key, cached_roles, verified = cache.lookup(serial_ports, ports)
+        if cached_roles is not None:
+            serial_ports = list(cached_roles)  # data port first
         
         # Create serial connections with platform-appropriate settings
         try:
@@ -900,29 +1274,26 @@ class CassCommands:
         self._flush_ser_port(ser_data)
         self._flush_ser_port(ser_command)
 
-        ser_command.write(b"u")
-        ser_data.write(b"u")
+        if verified and not confirm_roles(ser_data, ser_command):
+            print(f"Cached port roles of {key} did not answer; repeating the handshake")
+            cache.forget(key)
+            verified = False
+            self._flush_ser_port(ser_data)
+            self._flush_ser_port(ser_command)
 
-        timer = time.monotonic()
-        while ser_data.in_waiting < 1 and ser_command.in_waiting < 1:
-            if time.monotonic() - timer > 3:
-                raise TimeoutError("Timeout waiting for serial response from device.")
+        if not verified:
+            ser_data, ser_command = handshake(ser_data, ser_command)
+            if key is not None:
+                cache.store(key, ser_data.port, ser_command.port, verified=True, ports=ports)
 
-        data_response = ser_data.read(ser_data.in_waiting).decode("utf-8")
-        command_response = ser_command.read(ser_command.in_waiting).decode("utf-8")
-
-        if command_response == "x":
-            ser_data, ser_command = ser_command, ser_data
-        elif data_response == "x":
-            pass
-        else:
-            raise RuntimeError("ERROR! No response from teensy!")
-
-        self._flush_ser_port(ser_data)
-        self._flush_ser_port(ser_command)
+            self._flush_ser_port(ser_data)
+            self._flush_ser_port(ser_command)
 
         self._ser_data = ser_data
         self._ser_command = ser_command
+        self._device_key = key
+        if key is not None and self.link_throughput_bps is None:
+            self.link_throughput_bps = cache.throughput(key)
 
     def _flush_ser_port(self, ser_obj):
         """Flush the output buffer and clear the input buffer of a serial port.
@@ -935,6 +1306,21 @@ class CassCommands:
         ser_obj.reset_input_buffer()
         ser_obj.flush()
 
+    def _negotiate_transfer(self, timeout: float = 0.3) -> bool:
+        """Query the transfer capabilities once; True if CAPABILITY is offered."""
+        if self._transfer_caps is None:
+            self._flush_all()
+            self.ser_command.write(b"k")  # list transfer capabilities
+            reply = b""
+            time_start = time.monotonic()
+            while b"x" not in reply and time.monotonic() - time_start < timeout:
+                if self.ser_data.in_waiting > 0:
+                    reply += self.ser_data.read(self.ser_data.in_waiting)
+                else:
+                    time.sleep(0.001)
+            self._transfer_caps = parse_capabilities(reply) if b"x" in reply else set()
+        return CAPABILITY in self._transfer_caps
+
     def _flush_all(self):
         self._flush_ser_port(self.ser_data)
         self._flush_ser_port(self.ser_command)
@@ -988,12 +1374,73 @@ class CassCommands:
             True if the device confirmed deletion, False otherwise.
         """
         self.ser_command.reset_input_buffer()  # TODO: should this be a normal flush?
+        self.catalog.invalidate()
+        self._send_delete(filename)
+        self.ser_command.flush()  # ensure bytes are transmitted before reading response
+        return self._read_delete_ack()
+
+    def _record_throughput(self, num_bytes, elapsed):
+        """Update the measured link throughput with one completed transfer."""
+        if num_bytes <= 0 or elapsed <= 0:
+            return
+        measured = num_bytes / elapsed
+        if self.link_throughput_bps is None:
+            self.link_throughput_bps = measured
+        else:
+            self.link_throughput_bps = 0.5 * (self.link_throughput_bps + measured)
+        if self._device_key is not None:
+            cache = self.port_cache or default_role_cache()
+            cache.store_throughput(self._device_key, self.link_throughput_bps)
+
+    def _fetch_listing(self):
+        """Fetch file names and sizes from the device in one session.
+
+        Sends 'l' followed by 'z' without closing the ports and parses the
+        base-2 size lines in a single pass once they have all arrived.
+
+        Returns
+        -------
+        tuple of (list of str, list of int)
+            Filenames and their sizes in bytes, in device listing order.
+        """
+        self._open_serial()
+        self._flush_all()
+
+        self.ser_command.write(b"l")  # list files
+        result = b""
+        while b"xxx" not in result:
+            if self.ser_data.in_waiting > 0:
+                result += self.ser_data.read(self.ser_data.in_waiting)
+        names = result.decode("utf-8").splitlines()[:-1]
+        if not names:
+            return [], []
+
+        self.ser_command.write(b"z")  # list file sizes
+        raw = b""
+        num_lines = 0
+        while num_lines < len(names):
+            chunk = self.ser_data.read(max(1, self.ser_data.in_waiting))
+            num_lines += chunk.count(b"\n")
+            raw += chunk
+        sizes = [int(tok, 2) for tok in raw.split()[: len(names)]]
+
+        return names, sizes
+
+    def _send_delete(self, filename):
+        """Write a delete command for filename without waiting for the reply."""
         self.ser_command.write(b"x")  # delete file
 
         filename_term = filename + "x"  # append terminator so firmware knows filename is complete
         self.ser_command.write(bytes(filename_term, "utf-8"))
-        self.ser_command.flush()  # ensure bytes are transmitted before reading response
 
+    def _read_delete_ack(self):
+        """Read one delete acknowledgement from the data port.
+
+        Returns
+        -------
+        bool
+            True if the device confirmed deletion, False otherwise.
+        """
         b_success = self.ser_data.read_until(b"x")  # check for success
         b_success = int(b_success.decode("ascii").strip().strip("x"))
         if b_success:
@@ -1002,6 +1449,49 @@ class CassCommands:
             warnings.warn("Warning: error deleting file.")
             return False
 
+    @classmethod
+    def _expected_download_size(cls, file_size):
+        """Number of bytes read_file transfers for a device file of file_size bytes."""
+        return (file_size // cls.SD_BUFF_SIZE) * cls.SD_BUFF_SIZE
+
+    @classmethod
+    def _is_downloaded_locally(cls, dir_path, filename, file_size):
+        """Return True if dir_path holds everything read_file would transfer of filename."""
+        local = Path(dir_path, filename)
+        return (
+            local.is_file()
+            and local.stat().st_size == cls._expected_download_size(file_size)
+        )
+
+    @staticmethod
+    def _is_verified_locally(dir_path, filename, file_size):
+        """Return True if dir_path holds a copy of filename as large as the device file.
+
+        Only such files may be deleted from the device: a copy missing the
+        final partial SD buffer would lose those bytes for good.
+        """
+        local = Path(dir_path, filename)
+        return local.is_file() and local.stat().st_size == file_size
+
+    @classmethod
+    def _previous_download(cls, dir_path):
+        """File list and manifest summaries of an earlier download into dir_path.
+
+        Only files still present locally are kept; summaries are returned
+        for the files whose manifest entry matches their current size.
+        """
+        if not Path(dir_path).is_dir():
+            return [], {}
+        metadata = cls.find_and_parse_metadata(dir_path, recursive=False) or {}
+        names = [f for f in (metadata.get("files") or []) if Path(dir_path, f).is_file()]
+        manifest = read_manifest(dir_path) or {}
+        summaries = {
+            entry["name"]: entry
+            for entry in manifest.get("files", [])
+            if entry["name"] in names and Path(dir_path, entry["name"]).stat().st_size == entry["size"]
+        }
+        return names, summaries
+
     def _close_serial(self):
         """Close both serial port connections."""
         self.ser_data.close()
@@ -1075,14 +1565,17 @@ class CassCommands:
         Returns
         -------
         dict
-            Keys: "firmware_version" and "device_id" (either may be None if
-            not found in the file).
+            Keys: "firmware_version", "device_id", "rtc_time" (Unix seconds
+            as int) and "files" (list of str). Any may be None if not found
+            in the file.
         """
         txt = Path(path).read_text(encoding="utf-8")
         fw_match = re.search(
             r"Firmware\s*(?:Ver(?:\.|sion)?)\s*[:=]\s*([^\r\n]+)", txt, re.I
         )
         id_match = re.search(r"Device\s*ID\s*[:=]\s*([^\r\n]+)", txt, re.I)
+        rtc_match = re.search(r"RTC\s*Time\s*[:=]\s*(\d+)", txt, re.I)
+        files_match = re.search(r"Files\s*[:=][ \t]*([^\r\n]*)", txt, re.I)
 
         def _clean(s: Optional[str]) -> Optional[str]:
             if s is None:
@@ -1098,4 +1591,10 @@ class CassCommands:
         return {
             "firmware_version": _clean(fw_match.group(1)) if fw_match else None,
             "device_id": _clean(id_match.group(1)) if id_match else None,
+            "rtc_time": int(rtc_match.group(1)) if rtc_match else None,
+            "files": (
+                [f.strip() for f in files_match.group(1).split(",") if f.strip()]
+                if files_match
+                else None
+            ),
         }
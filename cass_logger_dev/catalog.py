@@ -0,0 +1,453 @@
+"""
+Persistent SQLite catalog of downloaded recordings.
+
+``CassCommands.find_and_parse_metadata`` walks the whole tree and re-reads
+every metadata.txt on each call. The catalog indexes each download
+directory once (device ID, firmware, RTC time, and per-file size, record
+count, time span, sample rate and channel statistics) and afterwards only
+rescans directories whose recordings, manifest.json or metadata.txt have
+changed. Queries such as "which files from device X between two dates" are
+then answered by SQLite without touching the data directories.
+
+Exports
+-------
+DEFAULT_CATALOG_NAME : str
+    Default database filename, created in the scanned root.
+RecordingCatalog
+    The catalog: ``update`` to (re)index a tree, ``files``/``dirs`` to query.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import warnings
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+import pandas as pd
+from .cass_commands import CassCommands
+from .manifest import MANIFEST_NAME, read_manifest, summarize_file
+from .session import Session, _to_datetime
+
+DEFAULT_CATALOG_NAME = "cass_catalog.sqlite"
+"""Database filename used when RecordingCatalog is given a directory."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    metadata_mtime REAL,
+    device_id TEXT,
+    firmware_version TEXT,
+    rtc_time INTEGER,
+    anchor_source TEXT,
+    start_time REAL,
+    end_time REAL,
+    n_files INTEGER NOT NULL,
+    total_bytes INTEGER NOT NULL,
+    scanned_at REAL NOT NULL,
+    signature TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    dir TEXT NOT NULL REFERENCES dirs(path) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    fw_key TEXT NOT NULL,
+    n_records INTEGER NOT NULL,
+    sample_rate_hz REAL,
+    offset_s REAL,
+    duration_s REAL,
+    start_time REAL,
+    end_time REAL,
+    stats TEXT,
+    PRIMARY KEY (dir, name)
+);
+CREATE INDEX IF NOT EXISTS files_time ON files (start_time, end_time);
+CREATE INDEX IF NOT EXISTS dirs_device ON dirs (device_id);
+"""
+
+_METADATA_NAME = "metadata.txt"
+
+
+class RecordingCatalog:
+    """SQLite index of download directories and their recordings.
+
+    Parameters
+    ----------
+    db_path : str or Path
+        Database file, or a directory to hold DEFAULT_CATALOG_NAME. Created
+        if missing.
+    compute_stats : bool, optional
+        Store per-channel min/max/mean of each file. Taken from the
+        directory's manifest.json when present; otherwise each new file is
+        read once (default True).
+
+    Examples
+    --------
+    >>> catalog = RecordingCatalog("data")
+    >>> catalog.update("data", estimate_start=True)
+    >>> catalog.files(device_id="7", since="2026-05-01", until="2026-06-01")
+    """
+
+    def __init__(self, db_path: Union[str, Path], compute_stats: bool = True):
+        db_path = Path(db_path)
+        if db_path.is_dir():
+            db_path = db_path / DEFAULT_CATALOG_NAME
+        self.db_path = db_path
+        self.compute_stats = compute_stats
+        self._conn = sqlite3.connect(str(db_path))
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(dirs)")}
+        if "signature" not in columns:  # catalogs created before signatures
+            with self._conn:
+                self._conn.execute("ALTER TABLE dirs ADD COLUMN signature TEXT")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+    # --- Public Methods ---
+
+    def update(
+        self,
+        root: Union[str, Path],
+        recursive: bool = True,
+        anchors: Optional[Dict[Union[str, Path], object]] = None,
+        estimate_start: bool = False,
+    ) -> Dict[str, int]:
+        """Index new or changed download directories under root.
+
+        A directory is a download directory if it holds a metadata.txt or
+        ``.bin`` files. It is rescanned only if the number, total size or
+        newest mtime of its ``.bin`` files and manifest.json, or the mtime
+        of its metadata.txt, differ from the stored values, or if its time
+        anchor changes. Other files (the catalog database itself, event
+        indexes, pyramids) do not trigger rescans. Directories under root that no longer exist are
+        removed.
+
+        Files only get UTC start/end times (and can be found by ``files``
+        with a time range) if their directory is anchored; see
+        ``session.Session``. Unanchored directories are reported with a
+        warning.
+
+        Parameters
+        ----------
+        root : str or Path
+            Directory tree to index.
+        recursive : bool, optional
+            Descend into subdirectories (default True).
+        anchors : dict, optional
+            Maps a download directory to the UTC time (datetime or Unix
+            seconds) of its first sample, or to a dict of per-file start
+            times (``file_start_times``). Listed directories are rescanned
+            on every call.
+        estimate_start : bool, optional
+            Anchor directories without an entry in anchors at their
+            download RTC time (default False). Such rows have
+            anchor_source "rtc_download"; their times are late by however
+            long the logger sat idle before it was downloaded.
+
+        Returns
+        -------
+        dict
+            Counts of "scanned", "unchanged" and "removed" directories.
+        """
+        root = Path(root).resolve()
+        if not root.is_dir():
+            raise NotADirectoryError(f"Not a directory: {root}")
+        anchors = {str(Path(k).resolve()): v for k, v in (anchors or {}).items()}
+        stored = {
+            path: (signature, metadata_mtime, rtc_time, anchor_source)
+            for path, signature, metadata_mtime, rtc_time, anchor_source in self._conn.execute(
+                "SELECT path, signature, metadata_mtime, rtc_time, anchor_source FROM dirs"
+            )
+        }
+        counts = {"scanned": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        unanchored = []
+        for dir_path, signature, mtime, metadata_mtime in _walk_download_dirs(root, recursive):
+            key = str(dir_path)
+            seen.add(key)
+            old = stored.get(key)
+            if (
+                old is not None
+                and old[:2] == (signature, metadata_mtime)
+                and key not in anchors
+                and _estimate_matches(old[2], old[3], estimate_start)
+            ):
+                counts["unchanged"] += 1
+                continue
+            anchor = anchors.get(key)
+            if not self._scan_dir(
+                dir_path, signature, mtime, metadata_mtime, anchor, estimate_start
+            ):
+                unanchored.append(key)
+            counts["scanned"] += 1
+        if unanchored:
+            warnings.warn(
+                f"{len(unanchored)} download director{'y has' if len(unanchored) == 1 else 'ies have'} "
+                "no time anchor and cannot be queried by date; pass anchors= or "
+                f"estimate_start=True: {', '.join(unanchored)}"
+            )
+
+        prefix = str(root) + os.sep
+        gone = [
+            p for p in stored
+            if p not in seen and (p == str(root) or recursive and p.startswith(prefix))
+        ]
+        with self._conn:
+            self._conn.executemany("DELETE FROM dirs WHERE path = ?", [(p,) for p in gone])
+        counts["removed"] = len(gone)
+        return counts
+
+    def files(
+        self,
+        device_id: Optional[str] = None,
+        since: Optional[Union[datetime.datetime, float, str]] = None,
+        until: Optional[Union[datetime.datetime, float, str]] = None,
+        fw_key: Optional[str] = None,
+        dir_path: Optional[Union[str, Path]] = None,
+        min_duration_s: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """Return the catalogued files matching all given conditions.
+
+        Parameters
+        ----------
+        device_id : str, optional
+            Device ID as written in metadata.txt.
+        since, until : datetime, float or str, optional
+            UTC range (datetime, Unix seconds or ISO string); files whose
+            time span overlaps it are returned. Files without an absolute
+            anchor are excluded when a range is given.
+        fw_key : str, optional
+            FIRMWARE_DTYPES key ("std", "i2c_1", "i2c_2").
+        dir_path : str or Path, optional
+            Restrict to one download directory.
+        min_duration_s : float, optional
+            Shortest recording duration to return.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per file, with "path", "device_id", "firmware_version",
+            UTC "start_time"/"end_time", the directory's "anchor_source"
+            ("rtc_download" marks estimated times) and per-channel "stats"
+            (dict).
+        """
+        where, params = [], []
+        if device_id is not None:
+            where.append("d.device_id = ?")
+            params.append(str(device_id))
+        if since is not None:
+            where.append("f.end_time >= ?")
+            params.append(_timestamp(since))
+        if until is not None:
+            where.append("f.start_time <= ?")
+            params.append(_timestamp(until))
+        if fw_key is not None:
+            where.append("f.fw_key = ?")
+            params.append(fw_key)
+        if dir_path is not None:
+            where.append("f.dir = ?")
+            params.append(str(Path(dir_path).resolve()))
+        if min_duration_s is not None:
+            where.append("f.duration_s >= ?")
+            params.append(min_duration_s)
+        sql = (
+            "SELECT f.dir, f.name, d.device_id, d.firmware_version, f.fw_key, f.size,"
+            " f.n_records, f.sample_rate_hz, f.offset_s, f.duration_s, f.start_time,"
+            " f.end_time, d.anchor_source, f.stats FROM files f JOIN dirs d ON f.dir = d.path"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY f.start_time, f.dir, f.offset_s"
+        df = pd.read_sql_query(sql, self._conn, params=params)
+        df.insert(0, "path", [str(Path(d, n)) for d, n in zip(df["dir"], df["name"])])
+        for col in ("start_time", "end_time"):
+            df[col] = pd.to_datetime(df[col], unit="s", utc=True)
+        df["stats"] = [json.loads(s) if s else None for s in df["stats"]]
+        return df
+
+    def dirs(self, device_id: Optional[str] = None) -> pd.DataFrame:
+        """Return the catalogued download directories, optionally for one device."""
+        sql = "SELECT * FROM dirs"
+        params = []
+        if device_id is not None:
+            sql += " WHERE device_id = ?"
+            params.append(str(device_id))
+        df = pd.read_sql_query(sql + " ORDER BY start_time, path", self._conn, params=params)
+        for col in ("start_time", "end_time", "rtc_time", "scanned_at"):
+            df[col] = pd.to_datetime(df[col], unit="s", utc=True)
+        return df
+
+    def metadata(self) -> List[Dict[str, object]]:
+        """Return parsed metadata of every catalogued directory.
+
+        Same keys as ``CassCommands.find_and_parse_metadata`` plus "dir",
+        without reading any metadata.txt.
+        """
+        rows = self._conn.execute(
+            "SELECT path, firmware_version, device_id, rtc_time FROM dirs ORDER BY path"
+        ).fetchall()
+        out = []
+        for path, fw, dev, rtc in rows:
+            names = [
+                n for (n,) in self._conn.execute(
+                    "SELECT name FROM files WHERE dir = ? ORDER BY offset_s", (path,)
+                )
+            ]
+            out.append(
+                {
+                    "dir": path,
+                    "firmware_version": fw,
+                    "device_id": dev,
+                    "rtc_time": rtc,
+                    "files": names,
+                }
+            )
+        return out
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        """Run a read-only SQL query against the catalog tables."""
+        return pd.read_sql_query(sql, self._conn, params=params)
+
+    # --- Private Methods ---
+
+    def _scan_dir(
+        self,
+        dir_path: Path,
+        signature: str,
+        mtime: float,
+        metadata_mtime: Optional[float],
+        anchor=None,
+        estimate_start: bool = False,
+    ) -> bool:
+        """(Re)index one download directory; return True if it is anchored."""
+        if isinstance(anchor, dict):
+            session = Session(dir_path, file_start_times=anchor, estimate_start=estimate_start)
+        else:
+            session = Session(dir_path, start_time=anchor, estimate_start=estimate_start)
+        manifest = read_manifest(dir_path)
+        summaries = {}
+        if manifest is not None:
+            metadata = manifest
+            summaries = {f["name"]: f for f in manifest["files"]}
+        elif metadata_mtime is not None:
+            metadata = CassCommands._parse_metadata_file(str(dir_path / _METADATA_NAME))
+        else:
+            metadata = {}
+        index = session.index
+        anchored = "start_time" in index
+        origin = session.start_time.timestamp() if session.start_time else None
+
+        file_rows = []
+        for i, name in enumerate(session.files):
+            entry = session._entries[i]
+            stat = entry.path.stat()
+            step = entry.base.step
+            offset_s = float(index["start_s"].iloc[i])
+            duration_s = entry.duration_us * 1e-6
+            summary = summaries.get(name)
+            if summary is not None and summary["size"] == stat.st_size:
+                stats = summary["stats"]
+            elif self.compute_stats:
+                stats = summarize_file(entry.path, session.dtype_key)["stats"]
+            else:
+                stats = None
+            file_rows.append(
+                (
+                    str(dir_path),
+                    name,
+                    stat.st_size,
+                    stat.st_mtime,
+                    session.dtype_key,
+                    entry.n_records,
+                    1e6 / step if step > 0 else None,
+                    offset_s,
+                    duration_s,
+                    origin + offset_s if anchored else None,
+                    origin + offset_s + duration_s if anchored else None,
+                    json.dumps(stats) if stats is not None else None,
+                )
+            )
+
+        dir_row = (
+            str(dir_path),
+            mtime,
+            metadata_mtime,
+            metadata.get("device_id"),
+            metadata.get("firmware_version"),
+            metadata.get("rtc_time"),
+            session.anchor_source,
+            origin,
+            origin + session.duration if anchored else None,
+            len(file_rows),
+            sum(row[2] for row in file_rows),
+            datetime.datetime.now(datetime.timezone.utc).timestamp(),
+            signature,
+        )
+        with self._conn:
+            self._conn.execute("DELETE FROM dirs WHERE path = ?", (str(dir_path),))
+            self._conn.execute(f"INSERT INTO dirs VALUES ({', '.join('?' * 13)})", dir_row)
+            self._conn.executemany(
+                f"INSERT INTO files VALUES ({', '.join('?' * 12)})", file_rows
+            )
+        return session.anchored
+
+
+def _estimate_matches(rtc_time, anchor_source: Optional[str], estimate_start: bool) -> bool:
+    """True if a stored directory's anchor agrees with the estimate_start setting."""
+    if anchor_source == "rtc_download":
+        return estimate_start
+    return not (estimate_start and anchor_source is None and rtc_time is not None)
+
+
+def _walk_download_dirs(root: Path, recursive: bool) -> Iterator[tuple]:
+    """Yield (path, signature, mtime, metadata mtime or None) of download directories.
+
+    The signature covers the count, total size and newest mtime of the
+    directory's ``.bin`` files and manifest.json, and mtime is that newest
+    mtime. The directory's own mtime is not used: it also changes when
+    unrelated files (such as a catalog database kept in the directory)
+    are created or removed. Uses os.scandir, so each directory costs one
+    listing plus a stat of each recording.
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        n_bin = 0
+        size = 0
+        newest_ns = 0
+        metadata_mtime = None
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(Path(entry.path))
+                    elif entry.name.lower() == _METADATA_NAME:
+                        metadata_mtime = entry.stat().st_mtime
+                    elif entry.name.endswith(".bin") or entry.name == MANIFEST_NAME:
+                        st = entry.stat()
+                        n_bin += entry.name.endswith(".bin")
+                        size += st.st_size
+                        newest_ns = max(newest_ns, st.st_mtime_ns)
+        except OSError:
+            continue
+        if n_bin or metadata_mtime is not None:
+            yield current, f"{n_bin}:{size}:{newest_ns}", newest_ns / 1e9, metadata_mtime
+
+
+def _timestamp(t: Union[datetime.datetime, float, str]) -> float:
+    """Convert a datetime, Unix seconds or ISO string to Unix seconds (UTC)."""
+    if isinstance(t, str):
+        t = pd.Timestamp(t)
+    return _to_datetime(t).timestamp()
@@ -0,0 +1,442 @@
+"""
+``cass-logger`` command-line tool.
+
+Subcommands
+-----------
+download
+    Incremental download from a connected logger, with a progress line.
+convert
+    Batch conversion of ``.bin``/``.cassz`` recordings to Parquet, Feather,
+    CSV or NPZ, with ``-j N`` worker processes.
+info
+    Download directories and recordings (via the catalog), or a connected
+    logger's firmware, ID, clock and files.
+bench
+    Import times and parse throughput.
+dock
+    Docking daemon downloading every logger that is plugged in.
+
+The firmware version of each recording is taken from the ``manifest.json``
+or ``metadata.txt`` in its directory unless ``--fw-ver`` is given.
+
+Exports
+-------
+build_parser : function
+    The argparse parser of the tool.
+main : function
+    Console-script entry point.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from .download_planner import POLICIES
+
+CONVERT_FORMATS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv", "npz": ".npz"}
+"""Output formats of ``convert`` and their file suffixes."""
+
+_INPUT_SUFFIXES = (".bin", ".cassz")
+_ARROW_ENGINES = {"parquet": ("pyarrow", "fastparquet"), "feather": ("pyarrow",)}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the command line tool; returns the process exit status."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args) or 0
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        return 130
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argparse parser with all subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="cass-logger", description="Download, convert and inspect Cass Logger recordings."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("download", help="download files from a connected logger")
+    p.add_argument("-d", "--dir", help="output directory; files already there are skipped "
+                   "(default: a new tmp_<unix> directory)")
+    p.add_argument("--include", action="append", metavar="GLOB", help="only files matching GLOB")
+    p.add_argument("--exclude", action="append", metavar="GLOB", help="skip files matching GLOB")
+    p.add_argument("--newest", type=int, metavar="N", help="only the N newest files")
+    p.add_argument("--policy", choices=POLICIES, default="device", help="transfer order")
+    p.add_argument("--max-bytes", type=int, help="byte budget of the download")
+    p.add_argument("--max-seconds", type=float, help="time budget of the download")
+    p.add_argument("--redownload", action="store_true", help="transfer files already in --dir again")
+    p.add_argument("--delete-after", action="store_true",
+                   help="delete files from the logger whose local copies are complete "
+                        "(files ending in a partial SD buffer are kept)")
+    p.add_argument("--dry-run", action="store_true", help="print the plan and exit")
+    _add_port_arguments(p)
+    p.set_defaults(func=_cmd_download)
+
+    p = sub.add_parser("convert", help="convert recordings to columnar files or CSV")
+    p.add_argument("paths", nargs="+", type=Path, help=".bin/.cassz files or directories")
+    p.add_argument("-o", "--out-dir", type=Path,
+                   help="output root (default: next to each input)")
+    p.add_argument("-f", "--format", choices=sorted(CONVERT_FORMATS), default="parquet")
+    p.add_argument("-j", "--jobs", type=int, default=1,
+                   help="worker processes (0: one per CPU; default 1)")
+    p.add_argument("--fw-ver", help="firmware version (default: from manifest.json/metadata.txt)")
+    p.add_argument("--overwrite", action="store_true",
+                   help="convert even if the output is newer than the input")
+    p.add_argument("--no-recursive", dest="recursive", action="store_false",
+                   help="do not descend into subdirectories")
+    p.set_defaults(func=_cmd_convert)
+
+    p = sub.add_parser("info", help="describe recordings or a connected logger")
+    p.add_argument("paths", nargs="*", type=Path, help="download directories or recordings")
+    p.add_argument("--catalog", type=Path,
+                   help="catalog database (or directory) to update and query "
+                   "(default: a temporary in-memory catalog)")
+    p.add_argument("--device-id", help="only recordings of this device ID")
+    p.add_argument("--since", help="only recordings ending after this UTC time")
+    p.add_argument("--until", help="only recordings starting before this UTC time")
+    p.add_argument("--start-time", type=datetime.datetime.fromisoformat, metavar="ISO",
+                   help="UTC time of the first sample of the (single) download directory given")
+    p.add_argument("--estimate-start", action="store_true",
+                   help="anchor unanchored directories at their download RTC time "
+                   "(late by the idle time before docking)")
+    p.add_argument("--fw-ver", help="firmware version of recordings given as files "
+                   "(default: from manifest.json/metadata.txt)")
+    p.add_argument("--device", action="store_true", help="query the connected logger")
+    _add_port_arguments(p)
+    p.set_defaults(func=_cmd_info)
+
+    p = sub.add_parser("dock", help="download every logger that is plugged in")
+    p.add_argument("root", type=Path, help="download root (one directory per device ID)")
+    p.add_argument("-j", "--jobs", type=int, default=4, help="devices serviced in parallel")
+    p.add_argument("--poll", type=float, default=1.0, help="seconds between port scans")
+    p.add_argument("--include", action="append", metavar="GLOB", help="only files matching GLOB")
+    p.add_argument("--exclude", action="append", metavar="GLOB", help="skip files matching GLOB")
+    p.add_argument("--delete-after", action="store_true",
+                   help="delete files from the logger whose local copies are complete "
+                        "(files ending in a partial SD buffer are kept)")
+    p.add_argument("--status", type=Path, help="status file (default: ROOT/dock_status.json)")
+    p.add_argument("--no-catalog", dest="catalog", action="store_false",
+                   help="do not update the recording catalog in ROOT")
+    p.set_defaults(func=_cmd_dock)
+
+    p = sub.add_parser("bench", help="benchmarks")
+    bench = p.add_subparsers(dest="bench", required=True)
+    b = bench.add_parser("imports", help="module import times in fresh interpreters")
+    b.add_argument("modules", nargs="*", help="modules (default: the package's main modules)")
+    b.add_argument("-n", "--repeats", type=int, default=5)
+    b.set_defaults(func=_cmd_bench_imports)
+    b = bench.add_parser("parse", help="parse throughput of recordings")
+    b.add_argument("paths", nargs="+", type=Path, help=".bin/.cassz files or directories")
+    b.add_argument("-n", "--repeats", type=int, default=3)
+    b.add_argument("--fw-ver", help="firmware version (default: from manifest.json/metadata.txt)")
+    b.set_defaults(func=_cmd_bench_parse)
+    return parser
+
+
+# --- Private Methods ---
+
+
+def _add_port_arguments(p: argparse.ArgumentParser):
+    p.add_argument("--data-port", help="data serial port (default: auto-detect)")
+    p.add_argument("--command-port", help="command serial port (default: auto-detect)")
+
+
+def _connect(args):
+    from .cass_commands import CassCommands
+
+    cass = CassCommands()
+    if args.data_port or args.command_port:
+        if not (args.data_port and args.command_port):
+            raise SystemExit("--data-port and --command-port must be given together")
+        if not cass.set_manual_serial_ports(args.data_port, args.command_port):
+            raise SystemExit(1)
+    return cass
+
+
+def _cmd_download(args) -> int:
+    cass = _connect(args)
+    plan = cass.plan_download(
+        dir_name=None if args.redownload else args.dir,
+        include=args.include,
+        exclude=args.exclude,
+        newest=args.newest,
+        policy=args.policy,
+        max_bytes=args.max_bytes,
+        max_seconds=args.max_seconds,
+    )
+    if not len(plan):
+        print("No files to download")
+        if args.delete_after and not args.dry_run:
+            cass.download_plan(plan, dir_name=args.dir, delete_after=True)
+        return 0
+    if args.dry_run:
+        print(plan.summary())
+        return 0
+    print(plan.summary().splitlines()[0])
+    progress = _ProgressLine()
+    dir_name = cass.download_plan(
+        plan,
+        dir_name=args.dir,
+        delete_after=args.delete_after,
+        skip_existing=not args.redownload,
+        progress=progress,
+    )
+    progress.finish()
+    print(f"Downloaded to {dir_name}")
+    return 0
+
+
+def _cmd_convert(args) -> int:
+    engines = _ARROW_ENGINES.get(args.format, ())
+    if engines and not any(importlib.util.find_spec(e) for e in engines):
+        print(f"--format {args.format} needs {' or '.join(engines)}; "
+              "install it or use --format csv/npz", file=sys.stderr)
+        return 2
+    tasks = []
+    skipped = 0
+    for src, dst in _conversion_targets(args.paths, args.out_dir, CONVERT_FORMATS[args.format],
+                                        args.recursive):
+        if not args.overwrite and dst.exists() and dst.stat().st_mtime >= src.stat().st_mtime:
+            skipped += 1
+            continue
+        tasks.append((str(src), str(dst), args.format, args.fw_ver or _dir_fw_ver(src.parent)))
+    if skipped:
+        print(f"Skipping {skipped} up-to-date file(s)")
+    if not tasks:
+        return 0
+
+    workers = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    time_start = time.monotonic()
+    failed = 0
+    total_bytes = 0
+    if workers <= 1 or len(tasks) == 1:
+        results = map(_convert_one, tasks)
+        failed, total_bytes = _report_conversions(results, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = pool.map(_convert_one, tasks)
+            failed, total_bytes = _report_conversions(results, len(tasks))
+    elapsed = time.monotonic() - time_start
+    print(f"Converted {len(tasks) - failed}/{len(tasks)} file(s) in {elapsed:.1f} s "
+          f"({total_bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+    return 1 if failed else 0
+
+
+def _report_conversions(results, n: int) -> Tuple[int, int]:
+    """Print one line per finished conversion; return (failures, input bytes)."""
+    failed = 0
+    total_bytes = 0
+    for i, (src, dst, n_rows, n_bytes, error) in enumerate(results, 1):
+        if error:
+            failed += 1
+            print(f"[{i}/{n}] {src}: FAILED ({error})", file=sys.stderr)
+        else:
+            total_bytes += n_bytes
+            print(f"[{i}/{n}] {src} -> {dst} ({n_rows} rows)")
+    return failed, total_bytes
+
+
+def _convert_one(task) -> Tuple[str, str, int, int, Optional[str]]:
+    """Worker: convert one recording (runs in a worker process)."""
+    src, dst, fmt, fw_ver = task
+    try:
+        from .cass_commands import CassCommands
+
+        df = CassCommands.process_data_file(src, fw_ver)
+        Path(dst).parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst + ".tmp"
+        if fmt == "parquet":
+            df.to_parquet(tmp, index=False)
+        elif fmt == "feather":
+            df.to_feather(tmp)
+        elif fmt == "csv":
+            df.to_csv(tmp, index=False)
+        else:
+            import numpy as np
+
+            with open(tmp, "wb") as f:
+                np.savez(f, **{c: df[c].to_numpy() for c in df.columns})
+        os.replace(tmp, dst)
+        return src, dst, len(df), os.path.getsize(src), None
+    except Exception as exc:
+        return src, dst, 0, 0, f"{type(exc).__name__}: {exc}"
+
+
+def _conversion_targets(
+    paths: Sequence[Path], out_dir: Optional[Path], suffix: str, recursive: bool
+) -> List[Tuple[Path, Path]]:
+    """(input, output) pairs; outputs keep each input's path below its argument."""
+    targets = []
+    for root, src in _input_files(paths, recursive):
+        if out_dir is None:
+            dst = src.with_suffix(suffix)
+        elif root == src:
+            dst = out_dir / src.with_suffix(suffix).name
+        else:
+            dst = out_dir / root.resolve().name / src.relative_to(root).with_suffix(suffix)
+        targets.append((src, dst))
+    return targets
+
+
+def _input_files(paths: Sequence[Path], recursive: bool) -> List[Tuple[Path, Path]]:
+    """(argument, recording) pairs for the recordings named by or found under paths."""
+    found = []
+    for root in paths:
+        if root.is_dir():
+            pattern = "**/*" if recursive else "*"
+            found += [(root, p) for p in sorted(root.glob(pattern)) if p.suffix in _INPUT_SUFFIXES]
+        elif root.is_file():
+            found.append((root, root))
+        else:
+            print(f"No such file or directory: {root}", file=sys.stderr)
+    return found
+
+
+_FW_VER_CACHE: Dict[Path, str] = {}
+
+
+def _dir_fw_ver(dir_path: Path) -> str:
+    """Firmware version recorded for a download directory ("std" if unknown)."""
+    dir_path = dir_path.resolve()
+    if dir_path not in _FW_VER_CACHE:
+        from .cass_commands import CassCommands
+        from .manifest import read_manifest
+
+        manifest = read_manifest(dir_path) or {}
+        metadata = {}
+        if not manifest.get("firmware_version"):
+            metadata = CassCommands.find_and_parse_metadata(dir_path, recursive=False) or {}
+        _FW_VER_CACHE[dir_path] = (
+            manifest.get("firmware_version") or metadata.get("firmware_version") or "std"
+        )
+    return _FW_VER_CACHE[dir_path]
+
+
+def _cmd_info(args) -> int:
+    if args.device:
+        cass = _connect(args)
+        print(f"Firmware:  {cass.get_fw_ver()}")
+        print(f"Device ID: {cass.get_device_ID()}")
+        print(f"RTC time:  {cass.get_RTC_time()}")
+        for name, size in cass.catalog.items():
+            print(f"  {name:<24} {size:>12} B")
+        if not args.paths:
+            return 0
+    if not args.paths:
+        print("Nothing to describe: give paths or --device", file=sys.stderr)
+        return 2
+
+    import pandas as pd
+    from .catalog import RecordingCatalog
+    from .manifest import summarize_file
+
+    dir_paths = [path for path in args.paths if path.is_dir()]
+    if args.start_time is not None and len(dir_paths) != 1:
+        print("--start-time needs exactly one download directory", file=sys.stderr)
+        return 2
+    with RecordingCatalog(args.catalog or ":memory:", compute_stats=False) as catalog:
+        for path in args.paths:
+            if path.is_dir():
+                anchors = {path: args.start_time} if args.start_time is not None else None
+                catalog.update(path, anchors=anchors, estimate_start=args.estimate_start)
+            elif path.is_file():
+                summary = summarize_file(path, args.fw_ver or _dir_fw_ver(path.parent))
+                summary.pop("stats")
+                for key, value in summary.items():
+                    print(f"{key:<16} {value}")
+            else:
+                print(f"No such file or directory: {path}", file=sys.stderr)
+        dirs = catalog.dirs(args.device_id)
+        if not len(dirs):
+            return 0
+        files = catalog.files(device_id=args.device_id, since=args.since, until=args.until)
+        with pd.option_context("display.width", 200, "display.max_rows", 500):
+            print(dirs[["path", "device_id", "firmware_version", "start_time", "anchor_source",
+                        "n_files", "total_bytes"]].to_string(index=False))
+            print()
+            print(files[["path", "device_id", "n_records", "sample_rate_hz", "duration_s",
+                         "start_time"]].to_string(index=False))
+    return 0
+
+
+def _cmd_dock(args) -> int:
+    from .dock import DockDaemon
+
+    DockDaemon(
+        args.root,
+        poll_interval=args.poll,
+        max_parallel=args.jobs,
+        status_path=args.status,
+        download_filters={"include": args.include, "exclude": args.exclude},
+        delete_after=args.delete_after,
+        update_catalog=args.catalog,
+    ).run()
+    return 0
+
+
+def _cmd_bench_imports(args) -> int:
+    from .import_bench import run
+
+    run(args.modules or None, args.repeats)
+    return 0
+
+
+def _cmd_bench_parse(args) -> int:
+    from .cass_commands import CassCommands
+    from .parsing import load_records, resolve_fw_key
+
+    for _, src in _input_files(args.paths, recursive=True):
+        fw_ver = args.fw_ver or _dir_fw_ver(src.parent)
+        size = src.stat().st_size
+        timings = {}
+        for label, fn in (
+            ("records", lambda: load_records(src, resolve_fw_key(fw_ver))),
+            ("frame", lambda: CassCommands.process_data_file(src, fw_ver)),
+        ):
+            if label == "records" and src.suffix != ".bin":
+                continue
+            best = float("inf")
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - t0)
+            timings[label] = best
+        line = ", ".join(f"{k} {v * 1e3:.1f} ms ({size / 1e6 / v:.0f} MB/s)" for k, v in timings.items())
+        print(f"{src}: {line}")
+    return 0
+
+
+class _ProgressLine:
+    """Single-line transfer progress on stderr: percent, MB and rate."""
+
+    def __init__(self):
+        self._start = time.monotonic()
+        self._shown = False
+
+    def __call__(self, done: int, total: int, filename: str):
+        elapsed = max(time.monotonic() - self._start, 1e-9)
+        percent = 100.0 * done / total if total else 100.0
+        sys.stderr.write(
+            f"\r{percent:5.1f}%  {done / 1e6:8.1f}/{total / 1e6:.1f} MB  "
+            f"{done / 1e3 / elapsed:7.1f} kB/s  {filename:<24}"
+        )
+        sys.stderr.flush()
+        self._shown = True
+
+    def finish(self):
+        if self._shown:
+            sys.stderr.write("\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Cached catalog of the files stored on a Cass Logger SD card.
+
+Exports
+-------
+DeviceCatalog
+    Names and sizes of the device files, fetched together in one serial
+    session and cached until a mutating command invalidates them.
+"""
+
+from typing import Dict, Iterator, List, Tuple
+
+
+class DeviceCatalog:
+    """Cached listing of device file names and sizes.
+
+    The first query fetches the names ('l') and sizes ('z') back to back in
+    a single session; later queries are answered from memory until
+    ``invalidate`` is called. ``CassCommands`` invalidates the catalog after
+    every command that changes the card or the clock (deletes,
+    download-with-delete, RTC set).
+
+    Parameters
+    ----------
+    cass : CassCommands
+        Connection used to fetch the listing.
+    """
+
+    def __init__(self, cass):
+        self._cass = cass
+        self._names: List[str] = []
+        self._sizes: List[int] = []
+        self._index: Dict[str, int] = {}
+        self._valid = False
+
+    # --- Properties ---
+
+    @property
+    def is_valid(self) -> bool:
+        """True if the cached listing can be used without a device round trip."""
+        return self._valid
+
+    @property
+    def names(self) -> List[str]:
+        """Filenames on the device, in device listing order."""
+        self._ensure()
+        return list(self._names)
+
+    @property
+    def sizes(self) -> List[int]:
+        """File sizes in bytes, in the same order as ``names``."""
+        self._ensure()
+        return list(self._sizes)
+
+    @property
+    def total_bytes(self) -> int:
+        """Sum of all file sizes on the device."""
+        self._ensure()
+        return sum(self._sizes)
+
+    # --- Public Methods ---
+
+    def refresh(self):
+        """Fetch names and sizes from the device, replacing the cache."""
+        names, sizes = self._cass._fetch_listing()
+        self._names = names
+        self._sizes = sizes
+        self._index = {name: i for i, name in enumerate(names)}
+        self._valid = True
+        return self
+
+    def invalidate(self):
+        """Drop the cached listing; the next query refetches it."""
+        self._valid = False
+
+    def items(self) -> List[Tuple[str, int]]:
+        """Return ``(filename, size)`` pairs in device listing order."""
+        self._ensure()
+        return list(zip(self._names, self._sizes))
+
+    def size_of(self, filename: str) -> int:
+        """Return the size in bytes of filename.
+
+        Raises
+        ------
+        KeyError
+            If filename is not on the device.
+        """
+        self._ensure()
+        return self._sizes[self._index[filename]]
+
+    def __len__(self) -> int:
+        self._ensure()
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __contains__(self, filename) -> bool:
+        self._ensure()
+        return filename in self._index
+
+    # --- Private Methods ---
+
+    def _ensure(self):
+        if not self._valid:
+            self.refresh()
@@ -0,0 +1,234 @@
+"""
+Docking daemon: download every logger that is plugged in, automatically.
+
+The daemon polls ``serial.tools.list_ports`` and pairs logger ports by USB
+serial number (falling back to the USB location), so each attached logger
+shows up as one data/command port pair. When a pair appears, a worker
+thread identifies the device with ``get_device_ID``, downloads it
+incrementally into ``<root>/<device ID>/`` (files already there are not
+transferred again), runs post-processing and then leaves the device alone
+until it is unplugged and docked again. Several devices are serviced in
+parallel. The state of every attached device is written to a JSON status
+file that dashboards or scripts can poll.
+
+Exports
+-------
+STATUS_NAME : str
+    Default status filename inside the dock root.
+find_port_pairs : function
+    Group logger serial ports into one pair per attached device (from
+    ``port_cache``).
+DockDaemon
+    Polling daemon servicing attached loggers in parallel.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+from .cass_commands import CassCommands
+from .port_cache import find_port_pairs
+
+STATUS_NAME = "dock_status.json"
+"""Default status filename inside the dock root."""
+
+_STATUS_INTERVAL = 1.0  # shortest time between progress writes of the status file
+
+
+class DockDaemon:
+    """Poll for docked loggers and download each one automatically.
+
+    Parameters
+    ----------
+    root : str or Path
+        Download root; each device is downloaded into ``root/<device ID>``.
+    poll_interval : float, optional
+        Seconds between port enumerations (default 1).
+    max_parallel : int, optional
+        Devices serviced at the same time (default 4).
+    status_path : str or Path, optional
+        JSON status file (default ``root/dock_status.json``).
+    download_filters : dict, optional
+        Keyword arguments for ``CassCommands.plan_download``.
+    delete_after : bool, optional
+        Delete files from the device whose local copies are as large as the
+        device files (default False). Files ending in a partial SD buffer
+        are not transferred completely and stay on the device.
+    post_process : callable, optional
+        ``post_process(dir_path, device_id)`` run after each download.
+    update_catalog : bool, optional
+        Update the ``RecordingCatalog`` in root after each download
+        (default True).
+    connect : callable, optional
+        ``connect(ports) -> CassCommands`` for a port pair; defaults to
+        ``CassCommands`` with the ports set manually.
+
+    Examples
+    --------
+    >>> DockDaemon("fleet").run()  # until Ctrl-C
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        poll_interval: float = 1.0,
+        max_parallel: int = 4,
+        status_path: Optional[Union[str, Path]] = None,
+        download_filters: Optional[dict] = None,
+        delete_after: bool = False,
+        post_process: Optional[Callable[[Path, str], None]] = None,
+        update_catalog: bool = True,
+        connect: Optional[Callable[[Tuple[str, str]], CassCommands]] = None,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.status_path = Path(status_path) if status_path else self.root / STATUS_NAME
+        self.download_filters = download_filters or {}
+        self.delete_after = delete_after
+        self.post_process = post_process
+        self.update_catalog = update_catalog
+        self.connect = connect or _connect_pair
+        self.max_parallel = max_parallel
+        self._pool: Optional[ThreadPoolExecutor] = None  # created by run (or the first poll)
+        self._devices: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._catalog_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_write = 0.0
+
+    # --- Public Methods ---
+
+    def run(self):
+        """Poll until ``stop`` is called or the process is interrupted."""
+        print(f"Docking daemon watching for loggers; downloads go to {self.root}")
+        self._ensure_pool()
+        try:
+            while not self._stop.is_set():
+                self.poll()
+                self._stop.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool, self._pool = self._pool, None
+            pool.shutdown(wait=True)
+            self._write_status(force=True)
+
+    def start(self):
+        """Run the daemon in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="cass-dock-poll", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and wait for running downloads to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self):
+        """Enumerate ports once: service new devices, forget unplugged ones."""
+        pairs = find_port_pairs()
+        with self._lock:
+            for key in [k for k in self._devices if k not in pairs]:
+                print(f"[{key}] unplugged")
+                del self._devices[key]
+            new = [key for key in pairs if key not in self._devices]
+            for key in new:
+                self._devices[key] = {"ports": list(pairs[key]), "state": "queued",
+                                      "since": time.time()}
+        for key in new:
+            print(f"[{key}] docked on {', '.join(pairs[key])}")
+            self._ensure_pool().submit(self._service, key, pairs[key])
+        if new:
+            self._write_status(force=True)
+
+    def status(self) -> Dict[str, Dict[str, object]]:
+        """Return a copy of the state of every attached device."""
+        with self._lock:
+            return {key: dict(entry) for key, entry in self._devices.items()}
+
+    # --- Private Methods ---
+
+    def _ensure_pool(self) -> ThreadPoolExecutor:
+        """Return the worker pool, creating it after a previous run shut it down."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_parallel, thread_name_prefix="cass-dock"
+            )
+        return self._pool
+
+    def _service(self, key: str, ports: Tuple[str, str]):
+        """Identify, download and post-process one docked device."""
+        try:
+            self._update(key, state="identifying")
+            cass = self.connect(ports)
+            device_id = cass.get_device_ID()
+            dir_path = self.root / _safe_dirname(device_id or key)
+            self._update(key, state="downloading", device_id=device_id, dir=str(dir_path),
+                         bytes_done=0, bytes_total=None)
+            plan = cass.plan_download(dir_name=str(dir_path), **self.download_filters)
+
+            def progress(done, total, filename):
+                self._update(key, bytes_done=done, bytes_total=total, file=filename, write=False)
+
+            if len(plan) or self.delete_after:
+                cass.download_plan(
+                    plan,
+                    dir_name=str(dir_path),
+                    delete_after=self.delete_after,
+                    skip_existing=True,
+                    progress=progress,
+                )
+            self._update(key, state="post-processing")
+            if len(plan) and self.update_catalog:
+                from .catalog import RecordingCatalog
+
+                with self._catalog_lock, RecordingCatalog(self.root) as catalog:
+                    catalog.update(dir_path, recursive=False)
+            if len(plan) and self.post_process is not None:
+                self.post_process(dir_path, device_id)
+            self._update(key, state="done", finished=time.time())
+            print(f"[{key}] device {device_id} done ({dir_path})")
+        except Exception as exc:
+            self._update(key, state="error", error=f"{type(exc).__name__}: {exc}")
+            print(f"[{key}] error: {exc}")
+
+    def _update(self, key: str, write: bool = True, **fields):
+        with self._lock:
+            entry = self._devices.get(key)
+            if entry is None:  # unplugged meanwhile
+                return
+            entry.update(fields)
+        self._write_status(force=write)
+
+    def _write_status(self, force: bool = False):
+        """Atomically rewrite the status file (progress writes are throttled)."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_write < _STATUS_INTERVAL:
+                return
+            self._last_write = now
+            status = {"updated": time.time(), "root": str(self.root), "devices": self._devices}
+            tmp = self.status_path.with_name(self.status_path.name + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump(status, f, indent=1)
+            os.replace(tmp, self.status_path)
+
+
+def _connect_pair(ports: Tuple[str, str]) -> CassCommands:
+    """CassCommands bound to one port pair (roles from the cache or a handshake)."""
+    cass = CassCommands()
+    cass.set_manual_serial_ports(*ports, verify=False)
+    return cass
+
+
+def _safe_dirname(name: str) -> str:
+    """Directory name for a device ID (path separators and oddities replaced)."""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name.strip()) or "unknown"
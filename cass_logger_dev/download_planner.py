@@ -0,0 +1,228 @@
+"""
+Selective, prioritized download planning for the Cass Logger.
+
+Exports
+-------
+DownloadPlanner
+    Builds a DownloadPlan from the device file catalog using filename globs,
+    size ranges, a "newest N" limit, byte/time budgets and an ordering policy.
+DownloadPlan
+    Ordered list of files to transfer with an up-front ETA.
+PlannedFile
+    One entry of a DownloadPlan.
+POLICIES
+    Names of the supported ordering policies.
+"""
+
+import fnmatch
+from dataclasses import dataclass, field
+from typing import Collection, Iterable, List, Optional, Sequence, Tuple
+from .firmware_structs import SD_BUFF_SIZE
+
+DEFAULT_THROUGHPUT_BPS = 100_000.0
+"""Link throughput assumed (bytes/s) until a transfer has been measured."""
+
+POLICIES = ("device", "smallest_first", "largest_first", "newest_first", "oldest_first")
+"""Supported transfer orderings. "device" keeps the SD card listing order."""
+
+
+@dataclass
+class PlannedFile:
+    """A file selected for transfer.
+
+    Attributes
+    ----------
+    filename : str
+        Name of the file on the device.
+    size : int
+        Size of the file on the device in bytes.
+    transfer_bytes : int
+        Bytes that will actually be transferred (whole SD buffers only).
+    eta_seconds : float
+        Estimated time from the start of the plan until this file is done.
+    """
+
+    filename: str
+    size: int
+    transfer_bytes: int
+    eta_seconds: float
+
+
+@dataclass
+class DownloadPlan:
+    """Ordered set of files to download, with estimates.
+
+    Attributes
+    ----------
+    files : list of PlannedFile
+        Files to transfer, in transfer order.
+    skipped : list of (str, str)
+        ``(filename, reason)`` for files that matched the filters but were
+        left out: "exists" (already downloaded, see ``DownloadPlanner.plan``)
+        or the budget that excluded them ("max_bytes", "max_seconds").
+    throughput_bps : float
+        Link throughput (bytes/s) the estimates are based on.
+    throughput_assumed : bool
+        True if throughput_bps is DEFAULT_THROUGHPUT_BPS because no
+        transfer from the device has been measured yet.
+    max_seconds : float or None
+        Time budget; the executor stops starting new files once exceeded.
+    """
+
+    files: List[PlannedFile] = field(default_factory=list)
+    skipped: List[Tuple[str, str]] = field(default_factory=list)
+    throughput_bps: float = DEFAULT_THROUGHPUT_BPS
+    throughput_assumed: bool = False
+    max_seconds: Optional[float] = None
+
+    @property
+    def filenames(self) -> List[str]:
+        """Filenames in transfer order."""
+        return [f.filename for f in self.files]
+
+    @property
+    def total_bytes(self) -> int:
+        """Total number of bytes that will be transferred."""
+        return sum(f.transfer_bytes for f in self.files)
+
+    @property
+    def eta_seconds(self) -> float:
+        """Estimated duration of the whole plan in seconds."""
+        return self.files[-1].eta_seconds if self.files else 0.0
+
+    def summary(self) -> str:
+        """Return a short human-readable description of the plan."""
+        lines = [
+            f"{len(self.files)} file(s), {self.total_bytes / 1e6:.2f} MB, "
+            f"ETA {self.eta_seconds:.1f} s at {self.throughput_bps / 1e3:.1f} kB/s"
+            + (" (assumed, not measured)" if self.throughput_assumed else "")
+        ]
+        lines += [
+            f"  {f.filename:<40} {f.transfer_bytes:>12} B  done at {f.eta_seconds:8.1f} s"
+            for f in self.files
+        ]
+        existing = sum(reason == "exists" for _, reason in self.skipped)
+        if existing:
+            lines.append(f"  skipped {existing} file(s) already downloaded")
+        if len(self.skipped) > existing:
+            lines.append(f"  skipped {len(self.skipped) - existing} file(s) over budget")
+        return "\n".join(lines)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+
+class DownloadPlanner:
+    """Select and order device files for download.
+
+    The SD card lists files in the order they were recorded, so listing
+    position is used as the recency of a file ("newest" = listed last).
+
+    Parameters
+    ----------
+    items : iterable of (str, int)
+        ``(filename, size)`` pairs in device listing order, e.g.
+        ``DeviceCatalog.items()``.
+    throughput_bps : float, optional
+        Measured link throughput in bytes/s. Defaults to
+        DEFAULT_THROUGHPUT_BPS when no measurement is available.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[Tuple[str, int]],
+        throughput_bps: Optional[float] = None,
+    ):
+        self.items = list(items)
+        self.throughput_assumed = not throughput_bps
+        self.throughput_bps = throughput_bps or DEFAULT_THROUGHPUT_BPS
+
+    def plan(
+        self,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        newest: Optional[int] = None,
+        policy: str = "device",
+        max_bytes: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        skip: Optional[Collection[str]] = None,
+    ) -> DownloadPlan:
+        """Build a DownloadPlan.
+
+        Parameters
+        ----------
+        include : sequence of str, optional
+            Filename globs; a file must match at least one (default: all).
+        exclude : sequence of str, optional
+            Filename globs of files to leave out.
+        min_size, max_size : int, optional
+            Inclusive size range in bytes.
+        newest : int, optional
+            Keep only the N most recently recorded matching files.
+        policy : str, optional
+            Transfer order, one of POLICIES (default "device").
+        max_bytes : int, optional
+            Stop adding files once this many bytes would be transferred.
+        max_seconds : float, optional
+            Stop adding files once the ETA would exceed this many seconds.
+        skip : collection of str, optional
+            Filenames that are already downloaded. They still count towards
+            ``newest`` but are left out before the budgets are applied, so
+            repeated budgeted downloads make progress.
+
+        Returns
+        -------
+        DownloadPlan
+
+        Raises
+        ------
+        ValueError
+            If policy is not one of POLICIES.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; expected one of {POLICIES}")
+
+        # (listing position, filename, size)
+        candidates = [
+            (pos, name, size)
+            for pos, (name, size) in enumerate(self.items)
+            if (include is None or any(fnmatch.fnmatch(name, p) for p in include))
+            and not (exclude and any(fnmatch.fnmatch(name, p) for p in exclude))
+            and (min_size is None or size >= min_size)
+            and (max_size is None or size <= max_size)
+        ]
+        if newest is not None:
+            candidates = candidates[-newest:] if newest > 0 else []
+        existing = []
+        if skip:
+            existing = [(name, "exists") for _, name, _ in candidates if name in skip]
+            candidates = [c for c in candidates if c[1] not in skip]
+
+        if policy == "smallest_first":
+            candidates.sort(key=lambda c: (c[2], c[0]))
+        elif policy == "largest_first":
+            candidates.sort(key=lambda c: (-c[2], c[0]))
+        elif policy == "newest_first":
+            candidates.reverse()
+
+        plan = DownloadPlan(
+            throughput_bps=self.throughput_bps,
+            throughput_assumed=self.throughput_assumed,
+            max_seconds=max_seconds,
+        )
+        plan.skipped.extend(existing)
+        total_bytes = 0
+        for _, name, size in candidates:
+            transfer_bytes = (size // SD_BUFF_SIZE) * SD_BUFF_SIZE
+            eta = (total_bytes + transfer_bytes) / self.throughput_bps
+            if max_bytes is not None and total_bytes + transfer_bytes > max_bytes:
+                plan.skipped.append((name, "max_bytes"))
+                continue
+            if max_seconds is not None and eta > max_seconds:
+                plan.skipped.append((name, "max_seconds"))
+                continue
+            total_bytes += transfer_bytes
+            plan.files.append(PlannedFile(name, size, transfer_bytes, eta))
+        return plan
@@ -0,0 +1,515 @@
+"""
+Event detection and indexing over accelerometer channels.
+
+Each recording is scanned once, chunk by chunk, for impacts (acceleration
+magnitude above a threshold), airtime (magnitude near zero, i.e. free fall)
+and landings (an impact shortly after airtime), using vectorized hysteresis.
+The events are saved next to the recording as ``<name>.events.npz``; queries
+such as "all landings above 4 g last month" then read only these small
+index files, never the raw data.
+
+Exports
+-------
+EVENTS_SUFFIX : str
+    Suffix appended to a recording's filename for its event index.
+EVENT_TYPES : tuple of str
+    Event type names; the stored type code is the position in this tuple.
+EVENT_DTYPE : np.dtype
+    Record layout of a stored event.
+EventDetector
+    Thresholds and the detection pass.
+EventIndex
+    Events of one recording, with save/load and DataFrame conversion.
+load_events : function
+    Load a recording's event index, detecting events if missing or stale.
+index_directory : function
+    Index every recording of a download directory, anchored to UTC.
+query_events : function
+    Filter events across indexed recordings without reading raw data.
+"""
+
+import datetime
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from .firmware_structs import CHANNEL_GROUPS
+from .parsing import iter_chunks, resolve_fw_key
+from .session import Session, _to_datetime
+from .signal_utils import hysteresis, runs
+
+EVENTS_SUFFIX = ".events.npz"
+"""Suffix appended to a recording's filename for its saved event index."""
+
+EVENT_TYPES = ("impact", "airtime", "landing")
+"""Event type names; stored events use the index into this tuple."""
+
+EVENT_DTYPE = np.dtype(
+    [
+        ("t_s", "<f8"),
+        ("type", "u1"),
+        ("peak_g", "<f4"),
+        ("duration_s", "<f4"),
+    ]
+)
+"""One stored event: start time (elapsed s), type code, peak magnitude (g) and
+duration (s). For airtime the peak is the lowest magnitude; for landings the
+duration is that of the preceding airtime."""
+
+STANDARD_GRAVITY = 9.80665
+
+
+class _RunTracker:
+    """Hysteresis runs of a signal, carried across chunk boundaries."""
+
+    def __init__(self, on: float, off: float):
+        self.on, self.off = on, off
+        self.active = False
+        self.start_us = self.last_us = 0
+        self.peak = -np.inf
+
+    def update(self, x: np.ndarray, t_us: np.ndarray) -> List[tuple]:
+        """Add a chunk; return the runs completed so far as (start, end, peak)."""
+        done = []
+        state = hysteresis(x, self.on, self.off, initial=self.active)
+        starts, stops = runs(state)
+        if self.active and (not len(starts) or starts[0] != 0):
+            done.append((self.start_us, self.last_us, self.peak))
+            self.active = False
+        if not len(starts):
+            return done
+
+        bounds = np.column_stack([starts, stops]).ravel()
+        peaks = np.maximum.reduceat(np.append(x, -np.inf), bounds)[::2]
+        run_starts = t_us[starts].astype(np.int64)
+        run_ends = t_us[stops - 1].astype(np.int64)
+        if self.active:
+            run_starts[0] = self.start_us
+            peaks[0] = max(peaks[0], self.peak)
+
+        n_done = len(starts) - 1 if stops[-1] == len(x) else len(starts)
+        done.extend(zip(run_starts[:n_done], run_ends[:n_done], peaks[:n_done]))
+        self.active = n_done < len(starts)
+        if self.active:
+            self.start_us, self.last_us, self.peak = run_starts[-1], run_ends[-1], peaks[-1]
+        return done
+
+    def finish(self) -> List[tuple]:
+        """Close a run still open at the end of the stream."""
+        if not self.active:
+            return []
+        self.active = False
+        return [(self.start_us, self.last_us, self.peak)]
+
+
+class EventDetector:
+    """Threshold settings for impact, airtime and landing detection.
+
+    All thresholds are acceleration magnitudes in g. Each condition uses two
+    thresholds so that noise around a single level does not split one event
+    into many.
+
+    Parameters
+    ----------
+    impact_g : float, optional
+        Magnitude that starts an impact (default 3.0).
+    impact_release_g : float, optional
+        Magnitude below which an impact ends (default 2.0).
+    airtime_g : float, optional
+        Magnitude below which airtime starts (default 0.3).
+    airtime_release_g : float, optional
+        Magnitude above which airtime ends (default 0.6).
+    min_airtime_s : float, optional
+        Shortest free-fall period reported as airtime (default 0.15).
+    landing_window_s : float, optional
+        An impact starting at most this long after airtime ends is reported
+        as a landing instead of an impact (default 0.3).
+    """
+
+    def __init__(
+        self,
+        impact_g: float = 3.0,
+        impact_release_g: float = 2.0,
+        airtime_g: float = 0.3,
+        airtime_release_g: float = 0.6,
+        min_airtime_s: float = 0.15,
+        landing_window_s: float = 0.3,
+    ):
+        if impact_release_g >= impact_g or airtime_release_g <= airtime_g:
+            raise ValueError("Release thresholds must lie inside the trigger thresholds")
+        self.impact_g = impact_g
+        self.impact_release_g = impact_release_g
+        self.airtime_g = airtime_g
+        self.airtime_release_g = airtime_release_g
+        self.min_airtime_s = min_airtime_s
+        self.landing_window_s = landing_window_s
+
+    @property
+    def params(self) -> Dict[str, float]:
+        """Settings as a dict, stored with each index to detect stale results."""
+        return dict(vars(self))
+
+    def detect(
+        self,
+        full_filename: Union[str, Path],
+        fw_ver: str = "std",
+        group: str = "imu_accel",
+        chunk_records: int = 1 << 20,
+    ) -> np.ndarray:
+        """Scan one recording and return its events.
+
+        Parameters
+        ----------
+        full_filename : str or Path
+            Raw ``.bin`` recording.
+        fw_ver : str, optional
+            Firmware version string (default "std").
+        group : str, optional
+            Accelerometer channel group of CHANNEL_GROUPS, e.g. "imu_accel"
+            or "i2c_accel" (default "imu_accel"). Channels are in m/s^2.
+        chunk_records : int, optional
+            Records per chunk (default 2**20).
+
+        Returns
+        -------
+        np.ndarray
+            Events with EVENT_DTYPE, sorted by time.
+        """
+        channels = CHANNEL_GROUPS[resolve_fw_key(fw_ver)][group]
+        impacts = _RunTracker(self.impact_g, self.impact_release_g)
+        # airtime is a low-magnitude condition: track the negated signal
+        airtime = _RunTracker(-self.airtime_g, -self.airtime_release_g)
+        impact_runs, airtime_runs = [], []
+        for _, elapsed, block in iter_chunks(full_filename, fw_ver, chunk_records):
+            sq = np.zeros(len(block), dtype=np.float32)
+            for channel in channels:
+                sq += np.square(block[channel], dtype=np.float32)
+            mag = np.sqrt(sq) / STANDARD_GRAVITY
+            impact_runs += impacts.update(mag, elapsed)
+            airtime_runs += airtime.update(-mag, elapsed)
+        impact_runs += impacts.finish()
+        airtime_runs += airtime.finish()
+        airtime_runs = _runs_array(airtime_runs)
+        airtime_runs[:, 2] *= -1
+        return self._classify(_runs_array(impact_runs), airtime_runs)
+
+    # --- Private Methods ---
+
+    def _classify(self, impact_runs: np.ndarray, airtime_runs: np.ndarray) -> np.ndarray:
+        """Combine raw runs (start_us, end_us, peak) into typed events."""
+        air_duration = (airtime_runs[:, 1] - airtime_runs[:, 0]) * 1e-6
+        airtime_runs = airtime_runs[air_duration >= self.min_airtime_s]
+        air_duration = air_duration[air_duration >= self.min_airtime_s]
+
+        impact_types = np.zeros(len(impact_runs), dtype=np.uint8)
+        impact_durations = (impact_runs[:, 1] - impact_runs[:, 0]) * 1e-6
+        if len(airtime_runs) and len(impact_runs):
+            # first impact starting at or after the end of each airtime
+            j = np.searchsorted(impact_runs[:, 0], airtime_runs[:, 1], side="left")
+            ok = j < len(impact_runs)
+            gap = impact_runs[np.minimum(j, len(impact_runs) - 1), 0] - airtime_runs[:, 1]
+            ok &= gap <= self.landing_window_s * 1e6
+            impact_types[j[ok]] = EVENT_TYPES.index("landing")
+            impact_durations[j[ok]] = air_duration[ok]
+
+        events = np.empty(len(impact_runs) + len(airtime_runs), dtype=EVENT_DTYPE)
+        n = len(impact_runs)
+        events["t_s"][:n] = impact_runs[:, 0] * 1e-6
+        events["type"][:n] = impact_types
+        events["peak_g"][:n] = impact_runs[:, 2]
+        events["duration_s"][:n] = impact_durations
+        events["t_s"][n:] = airtime_runs[:, 0] * 1e-6
+        events["type"][n:] = EVENT_TYPES.index("airtime")
+        events["peak_g"][n:] = airtime_runs[:, 2]
+        events["duration_s"][n:] = air_duration
+        return events[np.argsort(events["t_s"], kind="stable")]
+
+
+def _runs_array(run_list) -> np.ndarray:
+    """Stack (start_us, end_us, peak) tuples into an (n, 3) float64 array."""
+    if not run_list:
+        return np.empty((0, 3), dtype=np.float64)
+    return np.array(run_list, dtype=np.float64)
+
+
+class EventIndex:
+    """Events of one recording.
+
+    Parameters
+    ----------
+    events : np.ndarray
+        Events with EVENT_DTYPE.
+    meta : dict
+        Source information (source, size, mtime, fw_key, group, detector
+        params and, if known, start_time as Unix seconds). anchor_source is
+        set when ``index_directory`` derived start_time from its Session.
+    """
+
+    def __init__(self, events: np.ndarray, meta: dict):
+        self.events = events
+        self.meta = meta
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def start_time(self) -> Optional[datetime.datetime]:
+        """UTC time of the recording's first sample, if anchored."""
+        if self.meta.get("start_time") is None:
+            return None
+        return _to_datetime(self.meta["start_time"])
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the events as a DataFrame.
+
+        Columns are file, t_s, type, peak_g and duration_s, plus time (UTC)
+        when the recording is anchored.
+        """
+        df = pd.DataFrame(
+            {
+                "file": Path(self.meta["source"]).name,
+                "t_s": self.events["t_s"],
+                "type": pd.Categorical.from_codes(self.events["type"], EVENT_TYPES),
+                "peak_g": self.events["peak_g"],
+                "duration_s": self.events["duration_s"],
+            }
+        )
+        if self.start_time is not None:
+            df.insert(
+                2, "time", pd.Timestamp(self.start_time) + pd.to_timedelta(df["t_s"], unit="s")
+            )
+        return df
+
+    def save(self, path: Union[str, Path]):
+        """Write the index to an ``.npz`` file."""
+        np.savez(path, events=self.events, meta=np.array(json.dumps(self.meta)))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "EventIndex":
+        """Read an index written by ``save``."""
+        with np.load(path) as npz:
+            return cls(npz["events"], json.loads(str(npz["meta"])))
+
+
+def load_events(
+    full_filename: Union[str, Path],
+    fw_ver: str = "std",
+    group: str = "imu_accel",
+    detector: Optional[EventDetector] = None,
+    start_time: Optional[Union[datetime.datetime, float]] = None,
+) -> EventIndex:
+    """Load the saved event index of a recording, detecting events if needed.
+
+    Detection reruns when the index is missing, when the recording's size or
+    modification time changed, or when the group or detector settings differ.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Raw ``.bin`` recording.
+    fw_ver : str, optional
+        Firmware version string (default "std").
+    group : str, optional
+        Accelerometer channel group (default "imu_accel").
+    detector : EventDetector, optional
+        Detection settings (default EventDetector()).
+    start_time : datetime or float, optional
+        UTC time (or Unix seconds) of the first sample, stored with the index.
+
+    Returns
+    -------
+    EventIndex
+    """
+    full_filename = Path(full_filename)
+    detector = detector or EventDetector()
+    index_path = _events_path(full_filename)
+    stat = full_filename.stat()
+    start_ts = _to_datetime(start_time).timestamp() if start_time is not None else None
+    if index_path.is_file():
+        index = EventIndex.load(index_path)
+        meta = index.meta
+        if (
+            meta["size"] == stat.st_size
+            and meta["mtime"] == stat.st_mtime
+            and meta["group"] == group
+            and meta["detector"] == detector.params
+        ):
+            if start_ts is not None and (
+                meta.get("start_time") != start_ts or "anchor_source" in meta
+            ):
+                meta["start_time"] = start_ts
+                meta.pop("anchor_source", None)  # set by the caller, not index_directory
+                index.save(index_path)
+            return index
+
+    events = detector.detect(full_filename, fw_ver, group)
+    meta = {
+        "source": str(full_filename.resolve()),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "fw_key": resolve_fw_key(fw_ver),
+        "group": group,
+        "detector": detector.params,
+        "start_time": start_ts,
+    }
+    index = EventIndex(events, meta)
+    index.save(index_path)
+    return index
+
+
+def index_directory(
+    dir_path: Union[str, Path],
+    fw_ver: Optional[str] = None,
+    group: str = "imu_accel",
+    detector: Optional[EventDetector] = None,
+    start_time: Optional[Union[datetime.datetime, float]] = None,
+    file_start_times: Optional[Dict[str, Union[datetime.datetime, float]]] = None,
+    estimate_start: bool = False,
+) -> pd.DataFrame:
+    """Detect and save the events of every recording in a download directory.
+
+    Files are anchored to UTC through ``session.Session`` from the given
+    start_time or file_start_times (or, with estimate_start, the download
+    RTC time), so later queries can filter by date. Without an anchor,
+    start times that an earlier ``index_directory`` call stored are
+    cleared; ones set through ``load_events(start_time=...)`` are kept.
+
+    Parameters
+    ----------
+    dir_path : str or Path
+        Download directory.
+    fw_ver : str, optional
+        Firmware version string (default: from the download metadata).
+    group : str, optional
+        Accelerometer channel group (default "imu_accel").
+    detector : EventDetector, optional
+        Detection settings (default EventDetector()).
+    start_time : datetime or float, optional
+        UTC time (or Unix seconds) of the first sample of the download.
+    file_start_times : dict, optional
+        Maps filenames to their UTC start times.
+    estimate_start : bool, optional
+        Without an anchor, assume the last file ended at the download RTC
+        time (default False); see ``session.Session``.
+
+    Returns
+    -------
+    pd.DataFrame
+        All events of the directory (see ``EventIndex.to_frame``).
+    """
+    session = Session(
+        dir_path,
+        fw_ver=fw_ver,
+        start_time=start_time,
+        file_start_times=file_start_times,
+        estimate_start=estimate_start,
+    )
+    file_index = session.index
+    frames = []
+    for i, name in enumerate(session.files):
+        index = load_events(Path(dir_path, name), session.dtype_key, group, detector)
+        meta = index.meta
+        if session.anchored:
+            start_ts = file_index["start_time"].iloc[i].timestamp()
+            anchor = (start_ts, session.anchor_source)
+        elif meta.get("anchor_source") is not None:
+            anchor = (None, None)  # drop the anchor an earlier call stored
+        else:
+            anchor = (meta.get("start_time"), None)
+        if anchor != (meta.get("start_time"), meta.get("anchor_source")):
+            meta["start_time"] = anchor[0]
+            meta.pop("anchor_source", None)
+            if anchor[1] is not None:
+                meta["anchor_source"] = anchor[1]
+            index.save(_events_path(Path(dir_path, name)))
+        frames.append(index.to_frame())
+    if not frames:
+        return EventIndex(np.empty(0, dtype=EVENT_DTYPE), {"source": ""}).to_frame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def query_events(
+    paths: Union[str, Path, Sequence[Union[str, Path]]],
+    types: Optional[Union[str, Sequence[str]]] = None,
+    min_peak_g: Optional[float] = None,
+    max_peak_g: Optional[float] = None,
+    min_duration_s: Optional[float] = None,
+    since: Optional[Union[datetime.datetime, float]] = None,
+    until: Optional[Union[datetime.datetime, float]] = None,
+) -> pd.DataFrame:
+    """Select events from saved indexes; raw recordings are never read.
+
+    Parameters
+    ----------
+    paths : path or sequence of paths
+        Directories (searched recursively for ``*.bin.events.npz``),
+        recordings or index files.
+    types : str or sequence of str, optional
+        Event types to keep (see EVENT_TYPES).
+    min_peak_g, max_peak_g : float, optional
+        Bounds on the peak magnitude in g.
+    min_duration_s : float, optional
+        Shortest event duration to keep.
+    since, until : datetime or float, optional
+        UTC time range; recordings without an anchor are dropped when given.
+
+    Returns
+    -------
+    pd.DataFrame
+        Matching events sorted by time, with a "dir" column added.
+
+    Examples
+    --------
+    >>> month_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=30)
+    >>> query_events("data", types="landing", min_peak_g=4, since=month_ago)
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    if isinstance(types, str):
+        types = [types]
+    index_paths = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            index_paths += sorted(path.rglob(f"*.bin{EVENTS_SUFFIX}"))
+        elif path.name.endswith(EVENTS_SUFFIX):
+            index_paths.append(path)
+        else:
+            index_paths.append(_events_path(path))
+
+    frames = []
+    for index_path in index_paths:
+        index = EventIndex.load(index_path)
+        events = index.events
+        keep = np.ones(len(events), dtype=bool)
+        if types is not None:
+            keep &= np.isin(events["type"], [EVENT_TYPES.index(t) for t in types])
+        if min_peak_g is not None:
+            keep &= events["peak_g"] >= min_peak_g
+        if max_peak_g is not None:
+            keep &= events["peak_g"] <= max_peak_g
+        if min_duration_s is not None:
+            keep &= events["duration_s"] >= min_duration_s
+        if since is not None or until is not None:
+            if index.start_time is None:
+                continue
+            t_abs = index.meta["start_time"] + events["t_s"]
+            if since is not None:
+                keep &= t_abs >= _to_datetime(since).timestamp()
+            if until is not None:
+                keep &= t_abs <= _to_datetime(until).timestamp()
+        if keep.any():
+            df = EventIndex(events[keep], index.meta).to_frame()
+            df.insert(0, "dir", str(index_path.parent))
+            frames.append(df)
+
+    if not frames:
+        empty = EventIndex(np.empty(0, dtype=EVENT_DTYPE), {"source": ""}).to_frame()
+        empty.insert(0, "dir", pd.Series(dtype=object))
+        return empty
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values("time" if "time" in df else "t_s", ignore_index=True)
+
+
+def _events_path(full_filename: Path) -> Path:
+    return full_filename.with_name(full_filename.name + EVENTS_SUFFIX)
@@ -7,10 +7,21 @@ FIRMWARE_DTYPES : dict
     Maps firmware key strings ("std", "i2c_1", "i2c_2") to their dtype constructor.
 COLUMN_ORDERS : dict
     Maps firmware key strings to the preferred DataFrame column order.
+SD_BUFF_SIZE : int
+    Size in bytes of one SD buffer sent by the firmware per 't' command.
+FORK_GAIN, SHOCK_GAIN : float
+    ADC-count to millimetre gains of the fork (a0) and shock (b0) pots.
+CHANNEL_GAINS : dict
+    Maps channel names to the gain converting them to physical units.
+CHANNEL_GROUPS : dict
+    Maps firmware key strings to named groups of related channels.
 """
 
 import numpy as np
 
+SD_BUFF_SIZE = 5120
+"""Size in bytes of one SD buffer sent by the firmware per 't' command."""
+
 
 def dtype_std():
     """Return the NumPy dtype for standard firmware.
@@ -287,3 +298,33 @@ COLUMN_ORDERS = {
     ],
 }
 """Maps firmware key string to the preferred DataFrame column order."""
+
+FORK_GAIN = 4.884e-02
+"""Converts raw a0 ADC counts to millimetres of fork travel."""
+
+SHOCK_GAIN = 2.442e-02
+"""Converts raw b0 ADC counts to millimetres of shock travel."""
+
+CHANNEL_GAINS = {
+    "a0": FORK_GAIN,
+    "b0": SHOCK_GAIN,
+}
+"""Maps channel name to the gain converting it to physical units (default 1)."""
+
+
+def _channel_groups(columns):
+    """Group the channels of one firmware's column order by sensor."""
+    groups = {
+        "suspension": ["a0", "b0"],
+        "imu_accel": ["gx", "gy", "gz"],
+        "imu_gyro": ["wx", "wy", "wz"],
+    }
+    suffixes = sorted({c[len("gx"):] for c in columns if c.startswith("gx_")})
+    for suffix in suffixes:
+        groups[f"{suffix[1:]}_accel"] = [f"{a}{suffix}" for a in ("gx", "gy", "gz")]
+        groups[f"{suffix[1:]}_gyro"] = [f"{a}{suffix}" for a in ("wx", "wy", "wz")]
+    return groups
+
+
+CHANNEL_GROUPS = {key: _channel_groups(cols) for key, cols in COLUMN_ORDERS.items()}
+"""Maps firmware key string to {group name: channel list}."""
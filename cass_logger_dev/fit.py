@@ -0,0 +1,45 @@
+"""
+Parsing of FIT activity files (GPS computers, watches).
+
+``fitdecode`` and ``pandas`` are imported on first use, so importing the
+device or parsing modules does not pay for them.
+
+Exports
+-------
+read_fit_file : function
+    Parse a FIT file into session and record DataFrames.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Tuple, Union
+from ._lazy import lazy_import
+
+fitdecode = lazy_import("fitdecode")
+pd = lazy_import("pandas")
+
+
+def read_fit_file(full_filename: Union[str, Path]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Parse a FIT file into session and record DataFrames.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Path to the FIT file.
+
+    Returns
+    -------
+    tuple of (pd.DataFrame, pd.DataFrame)
+        (df_session, df_record) — one row per session/record frame.
+    """
+    records, sessions = [], []
+    with fitdecode.FitReader(str(full_filename)) as fit:
+        for frame in fit:
+            if frame.frame_type == fitdecode.FIT_FRAME_DATA:
+                if frame.name == "record":
+                    records.append({field.name: field.value for field in frame.fields})
+                elif frame.name == "session":
+                    sessions.append({field.name: field.value for field in frame.fields})
+    # build each frame once; concatenating per row is quadratic
+    return pd.DataFrame(sessions), pd.DataFrame(records)
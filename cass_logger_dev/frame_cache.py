@@ -0,0 +1,201 @@
+"""
+Opt-in in-process cache of parsed recordings.
+
+Once enabled with ``enable_cache``, ``CassCommands.process_data_file``
+keeps the processed columns of every file it parses in an LRU cache with a
+byte budget. Entries are keyed by the file's resolved path, size and
+modification time, the firmware key and the column projection, so a file
+that is rewritten (e.g. downloaded again) is parsed afresh. Cached columns
+are contiguous, read-only NumPy arrays; hits wrap them in the requested
+output table without copying. pandas hits are shallow copies of one
+cached DataFrame over those arrays, so with Copy-on-Write (the default
+from pandas 3) modifying a returned frame copies the affected columns
+instead of touching the cache; without it such writes raise.
+
+Exports
+-------
+CacheInfo : NamedTuple
+    Hit/miss statistics of a RecordingCache.
+RecordingCache
+    Byte-budgeted LRU map from cache keys to column dicts.
+cache_key : function
+    Cache key of a file, firmware key and column projection.
+enable_cache : function
+    Turn on caching in ``process_data_file``.
+disable_cache : function
+    Turn caching off and release the cached columns.
+active_cache : function
+    The enabled RecordingCache, or None.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Sequence, Union
+import numpy as np
+from ._lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+DEFAULT_MAX_BYTES = 1 << 30
+"""Default byte budget of enable_cache (1 GiB)."""
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of a RecordingCache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: int
+
+
+class RecordingCache:
+    """LRU cache of column dicts with a total byte budget.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Budget for the cached arrays (default DEFAULT_MAX_BYTES). Least
+        recently used entries are evicted to stay within it; a single
+        entry larger than the budget is not cached.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # key -> [columns, nbytes, pandas DataFrame over the columns or None]
+        self._entries: "OrderedDict[tuple, list]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: tuple) -> Optional[Dict[str, np.ndarray]]:
+        """Return the cached columns of key (marking them recently used), or None."""
+        entry = self._lookup(key, count=True)
+        return None if entry is None else dict(entry[0])
+
+    def get_frame(self, key: tuple, count: bool = True) -> Optional[pd.DataFrame]:
+        """Return a shallow copy of the cached DataFrame of key, or None.
+
+        count=False leaves the hit/miss statistics alone (used to serve
+        an entry that was just stored).
+        """
+        entry = self._lookup(key, count)
+        if entry is None:
+            return None
+        with self._lock:
+            if entry[2] is None:
+                entry[2] = pd.DataFrame(entry[0], copy=False)
+            return entry[2].copy(deep=False)
+
+    def put(self, key: tuple, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Cache columns under key and return the cached, read-only columns."""
+        frozen = {}
+        for name, col in columns.items():
+            col = np.ascontiguousarray(col)
+            if col.base is not None:
+                col = col.copy()  # do not pin (or freeze) a larger parent buffer
+            col.flags.writeable = False
+            frozen[name] = col
+        nbytes = sum(col.nbytes for col in frozen.values())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if nbytes > self.max_bytes:
+                return dict(frozen)
+            while self._entries and self._bytes + nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[1]
+                self._evictions += 1
+            self._entries[key] = [frozen, nbytes, None]
+            self._bytes += nbytes
+        return dict(frozen)
+
+    def clear(self):
+        """Drop all entries (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self) -> CacheInfo:
+        """Return hit/miss statistics and the current size."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, len(self._entries),
+                             self._bytes, self.max_bytes)
+
+    # --- Private Methods ---
+
+    def _lookup(self, key: tuple, count: bool) -> Optional[list]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            if count:
+                if entry is None:
+                    self._misses += 1
+                else:
+                    self._hits += 1
+            return entry
+
+
+def cache_key(
+    full_filename: Union[str, Path], fw_key: Optional[str], columns: Optional[Sequence[str]] = None
+) -> tuple:
+    """Key of a file's parsed columns: (path, size, mtime_ns, fw_key, projection).
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist.
+    """
+    path = Path(full_filename).resolve()
+    st = path.stat()
+    return (str(path), st.st_size, st.st_mtime_ns, fw_key, tuple(columns) if columns else None)
+
+
+_active: Optional[RecordingCache] = None
+
+
+def enable_cache(max_bytes: int = DEFAULT_MAX_BYTES) -> RecordingCache:
+    """Cache parsed recordings in ``process_data_file`` and return the cache.
+
+    Calling it again changes the budget of the enabled cache, evicting
+    entries on the next insertion if it shrank.
+
+    Examples
+    --------
+    >>> cache = enable_cache(512 << 20)
+    >>> df = CassCommands.process_data_file("log_0001.bin")  # parsed
+    >>> df = CassCommands.process_data_file("log_0001.bin")  # from the cache
+    >>> cache.info()
+    CacheInfo(hits=1, misses=1, evictions=0, entries=1, bytes=..., max_bytes=536870912)
+    """
+    global _active
+    if _active is None:
+        _active = RecordingCache(max_bytes)
+    else:
+        _active.max_bytes = max_bytes
+    return _active
+
+
+def disable_cache():
+    """Stop caching and release the cached columns."""
+    global _active
+    if _active is not None:
+        _active.clear()
+    _active = None
+
+
+def active_cache() -> Optional[RecordingCache]:
+    """Return the enabled RecordingCache, or None if caching is off."""
+    return _active
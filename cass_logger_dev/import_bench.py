@@ -0,0 +1,104 @@
+"""
+Import-time benchmark for the package's modules.
+
+Each module is imported in a fresh interpreter, several times, and the best
+wall time is reported together with the heavy dependencies the import
+pulled in. Run it with ``python -m cass_logger_dev.import_bench``.
+
+Exports
+-------
+DEFAULT_MODULES : tuple of str
+    Modules measured by default.
+HEAVY_DEPENDENCIES : tuple of str
+    Third-party modules reported when an import loads them.
+measure : function
+    Best-of-n import time of one module in fresh interpreters.
+run : function
+    Measure several modules and print a table.
+"""
+
+import json
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_MODULES = (
+    "numpy",
+    "cass_logger_dev",
+    "cass_logger_dev.parsing",
+    "cass_logger_dev.cass_commands",
+    "cass_logger_dev.fit",
+    "cass_logger_dev.session",
+    "pandas",
+)
+"""Modules measured by ``run`` when none are given."""
+
+HEAVY_DEPENDENCIES = (
+    "pandas",
+    "serial",
+    "serial.tools.list_ports",
+    "fitdecode",
+    "matplotlib",
+)
+"""Third-party modules reported when an import loads them."""
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeats: int = 5) -> Dict[str, object]:
+    """Import module in ``repeats`` fresh interpreters; keep the fastest run.
+
+    Parameters
+    ----------
+    module : str
+        Module to import.
+    repeats : int, optional
+        Number of fresh interpreters (default 5).
+
+    Returns
+    -------
+    dict
+        "module", "ms" (best import time in milliseconds) and "loaded"
+        (heavy dependencies present after the import).
+
+    Raises
+    ------
+    RuntimeError
+        If the import fails.
+    """
+    code = _PROBE.format(module=module, heavy=HEAVY_DEPENDENCIES)
+    best = None
+    for _ in range(repeats):
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return {"module": module, "ms": best["seconds"] * 1e3, "loaded": best["loaded"]}
+
+
+def run(modules: Optional[Sequence[str]] = None, repeats: int = 5) -> List[Dict[str, object]]:
+    """Measure modules and print a table of import times.
+
+    Returns
+    -------
+    list of dict
+        One ``measure`` result per module.
+    """
+    results = [measure(m, repeats) for m in (modules or DEFAULT_MODULES)]
+    width = max(len(r["module"]) for r in results)
+    for r in results:
+        loaded = ", ".join(r["loaded"]) or "-"
+        print(f"{r['module']:<{width}}  {r['ms']:8.1f} ms  heavy: {loaded}")
+    return results
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:] or None)
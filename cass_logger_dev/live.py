@@ -0,0 +1,350 @@
+"""
+Live capture of records streamed on the data serial port.
+
+A reader thread decodes the incoming byte stream with the firmware's record
+dtype and writes whole records into a fixed-size NumPy ring buffer.
+Readers take snapshots of the latest records (or of everything newer than a
+previous read) without locking and without copying the whole buffer: the
+single writer publishes a record counter after each write, and readers
+validate their copy against it. Decoded records can also be written to
+disk by a rolling writer, in the same ``.bin`` layout as downloaded files.
+
+The stream is started and stopped with command bytes sent on the command
+port; they are parameters because they depend on the firmware build.
+
+Exports
+-------
+RingBuffer
+    Fixed-size single-producer ring buffer of structured records.
+RollingWriter
+    Writes records to ``.bin`` files, starting a new file at a size limit.
+LiveCapture
+    Reader thread feeding a RingBuffer from ``CassCommands.ser_data``.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple, Union
+import numpy as np
+from .parsing import record_dtype
+
+_COUNTER_MODULUS = 2**32
+_MAX_STEP_US = 1_000_000  # larger tmicros steps mean a misaligned stream
+_ALIGN_RECORDS = 16  # records inspected to find the record boundary
+
+
+class RingBuffer:
+    """Fixed-size ring buffer of structured records for one writer thread.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of records kept.
+    dtype : np.dtype
+        Structured record dtype.
+    """
+
+    def __init__(self, capacity: int, dtype: np.dtype):
+        self.capacity = int(capacity)
+        self.dtype = dtype
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        self._written = 0  # total records ever written; published last
+
+    @property
+    def written(self) -> int:
+        """Total number of records written since creation."""
+        return self._written
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def push(self, records: np.ndarray):
+        """Append records (writer thread only); the oldest are overwritten."""
+        n = len(records)
+        if not n:
+            return
+        if n > self.capacity:
+            records = records[-self.capacity:]
+            self._written += n - self.capacity
+            n = self.capacity
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = records[:first]
+        self._buf[:n - first] = records[first:]
+        # publish only after the data is in place
+        self._written += n
+
+    def latest(self, n: Optional[int] = None) -> np.ndarray:
+        """Return a copy of the newest n records (default: all kept)."""
+        end = self._written
+        n = min(len(self) if n is None else n, len(self))
+        return self._copy_range(end - n, end)[1]
+
+    def since(self, counter: int) -> Tuple[int, np.ndarray]:
+        """Return records written after a previous counter value.
+
+        Parameters
+        ----------
+        counter : int
+            ``written`` value of the previous read (0 for everything).
+
+        Returns
+        -------
+        tuple of (int, np.ndarray)
+            The new counter to pass next time, and the records. If the
+            reader fell more than ``capacity`` records behind, the lost
+            records are skipped.
+        """
+        end = self._written
+        start, records = self._copy_range(max(counter, end - self.capacity), end)
+        return start + len(records), records
+
+    def _copy_range(self, start: int, end: int) -> Tuple[int, np.ndarray]:
+        """Copy records [start, end) and drop any overwritten during the copy."""
+        n = end - start
+        if n <= 0:
+            return end, self._buf[:0].copy()
+        i = start % self.capacity
+        first = min(n, self.capacity - i)
+        out = np.concatenate([self._buf[i:i + first], self._buf[:n - first]])
+        # records the writer may have overwritten while we copied
+        overwritten = self._written - self.capacity - start
+        if overwritten > 0:
+            out = out[overwritten:]
+            start += overwritten
+        return start, out
+
+
+class RollingWriter:
+    """Write records to ``<prefix>_<unix>_<n>.bin`` files of bounded size.
+
+    Parameters
+    ----------
+    dir_path : str or Path
+        Output directory (created if missing).
+    prefix : str, optional
+        Filename prefix (default "live").
+    max_bytes : int, optional
+        Size at which a new file is started (default 64 MiB).
+    """
+
+    def __init__(
+        self, dir_path: Union[str, Path], prefix: str = "live", max_bytes: int = 64 << 20
+    ):
+        self.dir_path = Path(dir_path)
+        self.dir_path.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.files = []
+        self._file = None
+        self._size = 0
+        self._stamp = int(time.time())
+
+    def write(self, records: np.ndarray):
+        """Append records, rotating to a new file at max_bytes."""
+        data = records.tobytes()
+        if self._file is None or self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def close(self):
+        """Flush and close the current file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        self.close()
+        path = self.dir_path / f"{self.prefix}_{self._stamp}_{len(self.files)}.bin"
+        self._file = open(path, "wb")
+        self._size = 0
+        self.files.append(path)
+
+
+class LiveCapture:
+    """Stream records from the logger's data port into a ring buffer.
+
+    Parameters
+    ----------
+    cass : CassCommands
+        Connected logger; its ``ser_data``/``ser_command`` ports are used.
+    fw_ver : str, optional
+        Firmware version string (default "std").
+    buffer_seconds : float, optional
+        Seconds of data kept in the ring buffer (default 60).
+    sample_rate_hz : float, optional
+        Expected record rate, used to size the buffer and to find record
+        boundaries in the stream (default 1000).
+    start_command, stop_command : bytes, optional
+        Bytes written to the command port to start/stop streaming. None
+        sends nothing (e.g. firmware that streams unconditionally).
+    writer : RollingWriter, optional
+        Also write every decoded record to disk.
+    poll_interval : float, optional
+        Longest wait for new bytes in the reader thread, in seconds; bounds
+        the added latency (default 0.01).
+
+    Examples
+    --------
+    >>> with LiveCapture(cass, start_command=b"s", stop_command=b"q") as live:
+    ...     time.sleep(1)
+    ...     recent = live.window(0.5)
+    """
+
+    def __init__(
+        self,
+        cass,
+        fw_ver: str = "std",
+        buffer_seconds: float = 60.0,
+        sample_rate_hz: float = 1000.0,
+        start_command: Optional[bytes] = None,
+        stop_command: Optional[bytes] = None,
+        writer: Optional[RollingWriter] = None,
+        poll_interval: float = 0.01,
+    ):
+        self.cass = cass
+        self.dtype = record_dtype(fw_ver)
+        self.sample_rate_hz = sample_rate_hz
+        self.buffer = RingBuffer(int(buffer_seconds * sample_rate_hz), self.dtype)
+        self.start_command = start_command
+        self.stop_command = stop_command
+        self.writer = writer
+        self.poll_interval = poll_interval
+        self.bytes_received = 0
+        self.resyncs = 0
+        self.last_update = None
+        self.error: Optional[BaseException] = None
+        self._pending = b""
+        self._aligned = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self) -> bool:
+        """True while the reader thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Send the start command and launch the reader thread."""
+        if self.running:
+            return
+        ser = self.cass.ser_data
+        ser.reset_input_buffer()
+        if self.start_command:
+            self.cass.ser_command.write(self.start_command)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cass-live", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the reader thread, send the stop command and release the ports."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.stop_command:
+            self.cass.ser_command.write(self.stop_command)
+        if self.writer is not None:
+            self.writer.close()
+        self.cass._close_serial()
+
+    def latest(self, n: Optional[int] = None) -> np.ndarray:
+        """Copy of the newest n records (default: the whole buffer)."""
+        return self.buffer.latest(n)
+
+    def since(self, counter: int) -> Tuple[int, np.ndarray]:
+        """Records written after counter; see ``RingBuffer.since``."""
+        return self.buffer.since(counter)
+
+    def window(self, seconds: float) -> np.ndarray:
+        """Copy of the records of the last ``seconds`` of device time."""
+        records = self.buffer.latest()
+        if not len(records):
+            return records
+        tmicros = records["tmicros"].astype(np.int64)
+        # age relative to the newest record, robust to counter rollover
+        age = (tmicros[-1] - tmicros) % _COUNTER_MODULUS
+        return records[np.argmax(age <= seconds * 1e6):]
+
+    # --- Private Methods ---
+
+    def _run(self):
+        ser = self.cass.ser_data
+        # the port is shared with the command helpers, which rely on its
+        # blocking timeout; only poll with the short one while streaming
+        timeout = ser.timeout
+        ser.timeout = self.poll_interval
+        try:
+            while not self._stop.is_set():
+                data = ser.read(max(int(ser.in_waiting), 1))
+                if data:
+                    self._feed(data)
+        except BaseException as exc:  # surfaced to the caller via .error
+            self.error = exc
+        finally:
+            ser.timeout = timeout
+
+    def _feed(self, data: bytes):
+        """Decode whole records from the stream and publish them."""
+        self.bytes_received += len(data)
+        buf = self._pending + data
+        itemsize = self.dtype.itemsize
+        if not self._aligned:
+            offset = _find_alignment(buf, self.dtype, 1e6 / self.sample_rate_hz)
+            if offset is None:
+                self._pending = buf[-_ALIGN_RECORDS * itemsize:]
+                return
+            buf = buf[offset:]
+            self._aligned = True
+        n = len(buf) // itemsize
+        self._pending = buf[n * itemsize:]
+        if not n:
+            return
+        records = np.frombuffer(buf, dtype=self.dtype, count=n)
+        step = np.diff(records["tmicros"].astype(np.int64)) % _COUNTER_MODULUS
+        bad = np.flatnonzero((step == 0) | (step > _MAX_STEP_US))
+        if len(bad):
+            # lost bytes shifted the record boundary: keep what came before
+            # and search for the boundary again in the rest
+            self._pending = buf[(bad[0] + 1) * itemsize:]
+            records = records[:bad[0] + 1]
+            self._aligned = False
+            self.resyncs += 1
+        self.buffer.push(records)
+        if self.writer is not None:
+            self.writer.write(records)
+        self.last_update = time.monotonic()
+
+
+def _find_alignment(buf: bytes, dtype: np.dtype, expected_step_us: float) -> Optional[int]:
+    """Byte offset at which records start, judged by a steady tmicros step.
+
+    Misaligned offsets can also show a steady step when they read constant
+    or counting fields, so among the steady candidates the one closest to
+    the expected sample period wins. Returns None until enough records are
+    available to decide.
+    """
+    itemsize = dtype.itemsize
+    if len(buf) < (_ALIGN_RECORDS + 1) * itemsize:
+        return None
+    best, best_error = None, np.inf
+    for offset in range(itemsize):
+        tmicros = np.frombuffer(buf, dtype=dtype, count=_ALIGN_RECORDS, offset=offset)["tmicros"]
+        step = np.diff(tmicros.astype(np.int64)) % _COUNTER_MODULUS
+        median = np.median(step)
+        if not 0 < median < _MAX_STEP_US:
+            continue
+        if (np.abs(step - median) <= 0.1 * median).all():
+            error = abs(np.log(median / expected_step_us))
+            if error < best_error:
+                best, best_error = offset, error
+    return best
@@ -0,0 +1,312 @@
+"""
+Multi-resolution min/max/mean decimation pyramids for fast visualization.
+
+A pyramid summarizes every channel of a recording into buckets of
+``base_bucket`` samples (level 0), and each further level merges ``factor``
+buckets of the level below. It is built once per file in a single streaming
+pass over the memory-mapped records and saved next to the recording as
+``<name>.lod.npz``. ``get_view`` then answers any time window at screen
+resolution by picking the finest level that fits ``max_points``, falling
+back to the raw samples when the window is small enough.
+
+Exports
+-------
+LOD_SUFFIX : str
+    Suffix appended to a recording's filename for its pyramid.
+LodView
+    Result of a pyramid query.
+LodPyramid
+    In-memory pyramid with ``get_view``.
+build_pyramid : function
+    Build (and by default save) the pyramid of a ``.bin`` file.
+load_pyramid : function
+    Load a saved pyramid, rebuilding it if missing or stale.
+"""
+
+import json
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Union
+import numpy as np
+from .parsing import (
+    TimeBase,
+    elapsed_micros,
+    load_records,
+    record_dtype,
+    resolve_fw_key,
+    time_base,
+)
+
+LOD_SUFFIX = ".lod.npz"
+"""Suffix appended to a recording's filename for its saved pyramid."""
+
+
+class LodView(NamedTuple):
+    """Decimated data for one channel over a time window.
+
+    Attributes
+    ----------
+    t : np.ndarray
+        Bucket start times (or sample times for raw views) in seconds.
+    min, max, mean : np.ndarray
+        Per-bucket statistics; all equal to the samples for raw views.
+    level : int
+        Pyramid level used, or -1 for raw samples.
+    """
+
+    t: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    mean: np.ndarray
+    level: int
+
+
+class LodPyramid:
+    """Per-channel min/max/mean pyramid of one recording.
+
+    Parameters
+    ----------
+    levels : list of dict
+        One dict per level with arrays "t" (bucket start, s), "min", "max",
+        "mean" (shape (n_buckets, n_channels)) and "count".
+    channels : list of str
+        Channel names, matching the second axis of the level arrays.
+    meta : dict
+        Source file information (path, size, mtime, fw_key, base_bucket,
+        factor, time_base).
+    """
+
+    def __init__(self, levels: List[dict], channels: List[str], meta: dict):
+        self.levels = levels
+        self.channels = list(channels)
+        self.meta = meta
+        self._channel_index = {c: i for i, c in enumerate(self.channels)}
+        self._records = None
+
+    @property
+    def source(self) -> Path:
+        """Path of the recording the pyramid summarizes."""
+        return Path(self.meta["source"])
+
+    def get_view(
+        self,
+        channel: str,
+        t0: Optional[float] = None,
+        t1: Optional[float] = None,
+        max_points: int = 2000,
+    ) -> LodView:
+        """Return screen-resolution data for channel between t0 and t1 seconds.
+
+        Parameters
+        ----------
+        channel : str
+            Channel name (raw units, no gains applied).
+        t0, t1 : float, optional
+            Window in elapsed seconds (default: whole recording).
+        max_points : int, optional
+            Upper bound on the number of returned points (default 2000).
+
+        Returns
+        -------
+        LodView
+
+        Raises
+        ------
+        KeyError
+            If channel is not in the pyramid.
+        """
+        j = self._channel_index[channel]
+        t0 = -np.inf if t0 is None else t0
+        t1 = np.inf if t1 is None else t1
+
+        n_raw = self._raw_count(t0, t1)
+        if n_raw <= max_points and self.source.is_file():
+            return self._raw_view(channel, t0, t1)
+
+        for level_idx, level in enumerate(self.levels):
+            lo, hi = self._bucket_range(level["t"], t0, t1)
+            if hi - lo <= max_points or level_idx == len(self.levels) - 1:
+                return LodView(
+                    level["t"][lo:hi],
+                    level["min"][lo:hi, j],
+                    level["max"][lo:hi, j],
+                    level["mean"][lo:hi, j],
+                    level_idx,
+                )
+
+    def save(self, path: Union[str, Path]):
+        """Write the pyramid to an ``.npz`` file."""
+        arrays = {}
+        for i, level in enumerate(self.levels):
+            for key, value in level.items():
+                arrays[f"level{i}_{key}"] = value
+        meta = dict(self.meta, channels=self.channels, n_levels=len(self.levels))
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "LodPyramid":
+        """Read a pyramid written by ``save``."""
+        with np.load(path) as npz:
+            meta = json.loads(str(npz["meta"]))
+            levels = [
+                {key: npz[f"level{i}_{key}"] for key in ("t", "min", "max", "mean", "count")}
+                for i in range(meta.pop("n_levels"))
+            ]
+        channels = meta.pop("channels")
+        return cls(levels, channels, meta)
+
+    # --- Private Methods ---
+
+    def _bucket_range(self, t, t0, t1):
+        """Index range of the buckets overlapping [t0, t1]."""
+        lo = max(int(np.searchsorted(t, t0, side="right")) - 1, 0)
+        hi = int(np.searchsorted(t, t1, side="right"))
+        return lo, hi
+
+    def _raw_count(self, t0, t1) -> int:
+        """Approximate number of raw samples in [t0, t1] from level 0."""
+        level = self.levels[0]
+        lo, hi = self._bucket_range(level["t"], t0, t1)
+        return int(level["count"][lo:hi].sum())
+
+    def _raw_view(self, channel, t0, t1) -> LodView:
+        if self._records is None:
+            self._records = load_records(self.source, self.meta["fw_key"], mmap=True)
+        base = TimeBase(*self.meta["time_base"])
+        bb = self.meta["base_bucket"]
+        lo, hi = self._bucket_range(self.levels[0]["t"], t0, t1)
+        start, stop = lo * bb, min(hi * bb, len(self._records))
+        block = self._records[start:stop]
+        t = elapsed_micros(block["tmicros"], start, base) * 1e-6
+        x = np.asarray(block[channel], dtype=np.float32)
+        keep = (t >= t0) & (t <= t1)
+        t, x = t[keep], x[keep]
+        return LodView(t, x, x, x, -1)
+
+
+def build_pyramid(
+    full_filename: Union[str, Path],
+    fw_ver: str = "std",
+    channels: Optional[Sequence[str]] = None,
+    base_bucket: int = 32,
+    factor: int = 8,
+    chunk_records: int = 1 << 20,
+    save: bool = True,
+) -> LodPyramid:
+    """Build the decimation pyramid of a recording in one streaming pass.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Raw ``.bin`` file.
+    fw_ver : str, optional
+        Firmware version string (default "std").
+    channels : sequence of str, optional
+        Channels to summarize (default: every field except tmicros).
+    base_bucket : int, optional
+        Samples per level-0 bucket (default 32).
+    factor : int, optional
+        Buckets merged per level (default 8).
+    chunk_records : int, optional
+        Records processed per chunk; bounds memory use (default 2**20).
+    save : bool, optional
+        Write the pyramid next to the recording (default True).
+
+    Returns
+    -------
+    LodPyramid
+    """
+    full_filename = Path(full_filename)
+    dtype_key = resolve_fw_key(fw_ver)
+    records = load_records(full_filename, dtype_key, mmap=True)
+    if channels is None:
+        channels = [c for c in record_dtype(dtype_key).names if c != "tmicros"]
+    channels = list(channels)
+    base = time_base(records["tmicros"])
+
+    n = len(records)
+    n_buckets = -(-n // base_bucket)
+    chunk_records = max(chunk_records // base_bucket, 1) * base_bucket
+    level0 = {
+        "t": np.empty(n_buckets, dtype=np.float64),
+        "min": np.empty((n_buckets, len(channels)), dtype=np.float32),
+        "max": np.empty((n_buckets, len(channels)), dtype=np.float32),
+        "mean": np.empty((n_buckets, len(channels)), dtype=np.float32),
+        "count": np.full(n_buckets, base_bucket, dtype=np.int64),
+    }
+    if n_buckets:
+        level0["count"][-1] = n - (n_buckets - 1) * base_bucket
+
+    for start in range(0, n, chunk_records):
+        block = records[start:start + chunk_records]
+        b0 = start // base_bucket
+        nb = -(-len(block) // base_bucket)
+        pad = nb * base_bucket - len(block)
+        elapsed = elapsed_micros(block["tmicros"], start, base)
+        level0["t"][b0:b0 + nb] = elapsed[::base_bucket] * 1e-6
+        for j, channel in enumerate(channels):
+            x = np.asarray(block[channel], dtype=np.float32)
+            if pad:
+                # pad the partial last bucket with its own edge value
+                x = np.concatenate([x, np.full(pad, x[-1], dtype=np.float32)])
+            x = x.reshape(nb, base_bucket)
+            level0["min"][b0:b0 + nb, j] = x.min(axis=1)
+            level0["max"][b0:b0 + nb, j] = x.max(axis=1)
+            sums = x.sum(axis=1, dtype=np.float64)
+            if pad:
+                sums[-1] -= pad * x[-1, -1]
+            level0["mean"][b0:b0 + nb, j] = sums / level0["count"][b0:b0 + nb]
+
+    levels = [level0]
+    while len(levels[-1]["t"]) > factor:
+        levels.append(_merge_level(levels[-1], factor))
+
+    meta = {
+        "source": str(full_filename.resolve()),
+        "size": full_filename.stat().st_size,
+        "mtime": full_filename.stat().st_mtime,
+        "fw_key": dtype_key,
+        "base_bucket": base_bucket,
+        "factor": factor,
+        "time_base": list(base),
+    }
+    pyramid = LodPyramid(levels, channels, meta)
+    if save:
+        pyramid.save(_pyramid_path(full_filename))
+    return pyramid
+
+
+def load_pyramid(
+    full_filename: Union[str, Path], fw_ver: str = "std", **build_kwargs
+) -> LodPyramid:
+    """Load the saved pyramid of a recording, rebuilding it if needed.
+
+    The saved pyramid is rebuilt when it is missing or when the recording's
+    size or modification time no longer match.
+    """
+    full_filename = Path(full_filename)
+    lod_path = _pyramid_path(full_filename)
+    if lod_path.is_file():
+        pyramid = LodPyramid.load(lod_path)
+        stat = full_filename.stat()
+        if pyramid.meta["size"] == stat.st_size and pyramid.meta["mtime"] == stat.st_mtime:
+            return pyramid
+    return build_pyramid(full_filename, fw_ver, **build_kwargs)
+
+
+def _pyramid_path(full_filename: Path) -> Path:
+    return full_filename.with_name(full_filename.name + LOD_SUFFIX)
+
+
+def _merge_level(level: dict, factor: int) -> dict:
+    """Merge groups of factor buckets into the next pyramid level."""
+    n = len(level["t"])
+    starts = np.arange(0, n, factor)
+    count = np.add.reduceat(level["count"], starts)
+    weighted = level["mean"].astype(np.float64) * level["count"][:, None]
+    return {
+        "t": level["t"][starts],
+        "min": np.minimum.reduceat(level["min"], starts, axis=0),
+        "max": np.maximum.reduceat(level["max"], starts, axis=0),
+        "mean": (np.add.reduceat(weighted, starts, axis=0) / count[:, None]).astype(np.float32),
+        "count": count,
+    }
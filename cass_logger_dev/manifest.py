@@ -0,0 +1,247 @@
+"""
+Machine-readable download manifest (``manifest.json``).
+
+Written next to ``metadata.txt`` by ``CassCommands.download_plan`` (and so
+``download_all``), the manifest lists for every downloaded file its size,
+SHA-256 checksum, firmware key and record itemsize, record count, sample
+rate, first/last raw tmicros and per-channel min/max/mean. Summaries are
+computed in one streaming pass over the bytes as each file lands, so
+loaders, catalogs and dashboards can make most decisions without opening
+the ``.bin`` files.
+
+Exports
+-------
+MANIFEST_NAME : str
+    Filename of the manifest inside a download directory.
+MANIFEST_VERSION : int
+    Format version written to the manifest.
+FileSummarizer
+    Streaming summary of one recording, fed with raw bytes.
+summarize_file : function
+    Summary of a ``.bin`` file on disk.
+write_manifest : function
+    Write a manifest for a download directory.
+read_manifest : function
+    Read a directory's manifest, if any.
+build_manifest : function
+    Create the manifest of an existing download directory.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+from .parsing import record_dtype, resolve_fw_key
+
+MANIFEST_NAME = "manifest.json"
+"""Filename of the manifest inside a download directory."""
+
+MANIFEST_VERSION = 1
+"""Format version written to (and accepted from) manifest files."""
+
+
+class FileSummarizer:
+    """Single-pass summary of one recording fed with raw bytes.
+
+    Bytes may arrive in pieces of any size; a record split across pieces is
+    carried over to the next call.
+
+    Parameters
+    ----------
+    filename : str
+        Name recorded in the summary.
+    fw_ver : str, optional
+        Firmware version string (default "std").
+    """
+
+    def __init__(self, filename: str, fw_ver: str = "std"):
+        self.filename = filename
+        self.fw_key = resolve_fw_key(fw_ver)
+        self.dtype = record_dtype(self.fw_key)
+        self.channels = [c for c in self.dtype.names if c != "tmicros"]
+        self._sha = hashlib.sha256()
+        self._size = 0
+        self._carry = b""
+        self._n = 0
+        self._tmicros = []  # first two raw values, for the sample step
+        self._last = None
+        self._rolled = False
+        self._min = {c: np.inf for c in self.channels}
+        self._max = {c: -np.inf for c in self.channels}
+        self._sum = {c: 0.0 for c in self.channels}
+
+    def update(self, data: bytes):
+        """Add the next piece of the file's bytes."""
+        data = bytes(data)
+        self._sha.update(data)
+        self._size += len(data)
+        buf = self._carry + data if self._carry else data
+        n = len(buf) // self.dtype.itemsize
+        self._carry = buf[n * self.dtype.itemsize:]
+        if not n:
+            return
+        records = np.frombuffer(buf, dtype=self.dtype, count=n)
+        tmicros = records["tmicros"]
+        if len(self._tmicros) < 2:
+            self._tmicros.extend(int(v) for v in tmicros[: 2 - len(self._tmicros)])
+        self._last = int(tmicros[-1])
+        self._rolled |= bool((tmicros < 0).any())
+        self._n += n
+        for c in self.channels:
+            x = records[c]
+            self._min[c] = min(self._min[c], float(x.min()))
+            self._max[c] = max(self._max[c], float(x.max()))
+            self._sum[c] += float(x.sum(dtype=np.float64))
+
+    def result(self) -> Dict[str, object]:
+        """Return the summary of everything fed so far.
+
+        Returns
+        -------
+        dict
+            Keys: name, size, sha256, fw_key, itemsize, n_records,
+            trailing_bytes, sample_rate_hz, first_tmicros, last_tmicros,
+            rolled, duration_us and stats ({channel: {min, max, mean}}).
+        """
+        step = self._tmicros[1] - self._tmicros[0] if len(self._tmicros) > 1 else 0
+        first = self._tmicros[0] if self._tmicros else None
+        if not self._n:
+            duration_us = 0
+        elif self._rolled:
+            duration_us = (self._n - 1) * step
+        else:
+            duration_us = self._last - first
+        return {
+            "name": self.filename,
+            "size": self._size,
+            "sha256": self._sha.hexdigest(),
+            "fw_key": self.fw_key,
+            "itemsize": self.dtype.itemsize,
+            "n_records": self._n,
+            "trailing_bytes": len(self._carry),
+            "sample_rate_hz": 1e6 / step if step > 0 else None,
+            "first_tmicros": first,
+            "last_tmicros": self._last,
+            "rolled": self._rolled,
+            "duration_us": duration_us,
+            "stats": {
+                c: {"min": self._min[c], "max": self._max[c], "mean": self._sum[c] / self._n}
+                for c in self.channels
+            }
+            if self._n
+            else {},
+        }
+
+
+def summarize_file(
+    full_filename: Union[str, Path], fw_ver: str = "std", chunk_bytes: int = 1 << 24
+) -> Dict[str, object]:
+    """Summarize a ``.bin`` file on disk in one streaming pass.
+
+    See ``FileSummarizer.result`` for the returned keys.
+    """
+    full_filename = Path(full_filename)
+    summarizer = FileSummarizer(full_filename.name, fw_ver)
+    with open(full_filename, "rb") as f:
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                break
+            summarizer.update(data)
+    return summarizer.result()
+
+
+def write_manifest(
+    dir_path: Union[str, Path],
+    files: Sequence[Dict[str, object]],
+    firmware_version: Optional[str] = None,
+    device_id: Optional[str] = None,
+    rtc_time: Optional[int] = None,
+) -> Path:
+    """Write ``manifest.json`` for a download directory.
+
+    The file is written to a temporary name and renamed into place, so
+    readers never see a partial manifest.
+
+    Parameters
+    ----------
+    dir_path : str or Path
+        Download directory.
+    files : sequence of dict
+        Per-file summaries in download order (``FileSummarizer.result``).
+    firmware_version, device_id : str, optional
+        As reported by the device.
+    rtc_time : int or str, optional
+        Device RTC time (Unix seconds) at the end of the download; stored
+        as an int, or null if it is not a number.
+
+    Returns
+    -------
+    Path
+        Path of the written manifest.
+    """
+    if rtc_time is not None:
+        rtc_time = int(rtc_time) if str(rtc_time).strip().isdigit() else None
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created": time.time(),
+        "firmware_version": firmware_version,
+        "fw_key": resolve_fw_key(firmware_version),
+        "device_id": device_id,
+        "rtc_time": rtc_time,
+        "files": list(files),
+    }
+    path = Path(dir_path, MANIFEST_NAME)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+    return path
+
+
+def read_manifest(dir_path: Union[str, Path]) -> Optional[Dict[str, object]]:
+    """Return the parsed manifest of a download directory.
+
+    Returns None if the directory has no manifest or it is unreadable or of
+    an unknown version.
+    """
+    path = Path(dir_path, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def build_manifest(dir_path: Union[str, Path], fw_ver: Optional[str] = None) -> Path:
+    """Create the manifest of an existing download directory.
+
+    Device information and file order come from metadata.txt when present;
+    otherwise all ``.bin`` files are listed by name.
+
+    Returns
+    -------
+    Path
+        Path of the written manifest.
+    """
+    from .cass_commands import CassCommands  # cass_commands imports this module
+
+    dir_path = Path(dir_path)
+    metadata = CassCommands.find_and_parse_metadata(dir_path, recursive=False) or {}
+    fw_ver = fw_ver or metadata.get("firmware_version") or "std"
+    names: List[str] = [
+        f for f in (metadata.get("files") or []) if Path(dir_path, f).is_file()
+    ] or sorted(p.name for p in dir_path.glob("*.bin"))
+    return write_manifest(
+        dir_path,
+        [summarize_file(Path(dir_path, name), fw_ver) for name in names],
+        firmware_version=fw_ver,
+        device_id=metadata.get("device_id"),
+        rtc_time=metadata.get("rtc_time"),
+    )
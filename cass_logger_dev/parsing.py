@@ -0,0 +1,416 @@
+"""
+Parsing core shared by every reader of Cass Logger recordings.
+
+Exports
+-------
+resolve_fw_key : function
+    Map a firmware version string to a FIRMWARE_DTYPES key.
+record_dtype : function
+    Return the structured record dtype for a firmware version string.
+load_records : function
+    Read (or memory-map) a raw ``.bin`` file as a structured array.
+time_base : function
+    Summarize a tmicros column into the parameters of its elapsed-time axis.
+elapsed_micros : function
+    Elapsed microseconds for any slice of a recording, given its time base.
+iter_chunks : function
+    Stream a memory-mapped recording in fixed-size chunks with elapsed time.
+handle_tmicros_rollover : function
+    Rebuild a monotonic timestamp column after a 32-bit counter rollover.
+records_to_frame : function
+    Build the DataFrame returned by ``CassCommands.process_data_file``.
+BACKENDS : tuple of str
+    Output backends accepted by ``records_to_table``.
+records_to_columns : function
+    Processed columns of a record array as NumPy arrays, without copying
+    the sensor channels.
+records_to_table : function
+    Processed records as a pandas DataFrame, Arrow table, Polars DataFrame
+    or dict of NumPy arrays.
+columns_to_table : function
+    Wrap a dict of column arrays in the table type of an output backend.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import importlib.util
+import warnings
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple, Union
+import numpy as np
+from ._lazy import lazy_import
+from .firmware_structs import (
+    FIRMWARE_DTYPES,
+    COLUMN_ORDERS,
+)
+from .tracing import span
+
+pd = lazy_import("pandas")
+
+BACKENDS = ("pandas", "arrow", "polars", "numpy")
+"""Output backends of ``records_to_table``: pandas DataFrame, pyarrow Table,
+polars DataFrame, or dict of NumPy arrays."""
+
+_BACKEND_PACKAGES = {"arrow": "pyarrow", "polars": "polars"}
+
+
+class TimeBase(NamedTuple):
+    """Parameters of the elapsed-time axis of one recording.
+
+    Attributes
+    ----------
+    tmicros0 : int
+        Raw tmicros value of the first record.
+    step : int
+        Difference between the first two raw tmicros values.
+    rolled : bool
+        True if the counter went negative anywhere in the file; elapsed
+        time is then reconstructed as ``index * step``.
+    """
+
+    tmicros0: int
+    step: int
+    rolled: bool
+
+
+def resolve_fw_key(fw_ver: str = "std") -> str:
+    """Map a firmware version string to a FIRMWARE_DTYPES key.
+
+    Parameters
+    ----------
+    fw_ver : str, optional
+        Firmware version string. Must contain "i2c_2", "i2c_1", or
+        default to "std" (default "std").
+
+    Returns
+    -------
+    str
+        One of the FIRMWARE_DTYPES keys.
+    """
+    fw_ver = fw_ver or "std"
+    if "i2c_2" in fw_ver:
+        return "i2c_2"
+    elif "i2c_1" in fw_ver:
+        return "i2c_1"
+    return "std"
+
+
+def record_dtype(fw_ver: str = "std") -> np.dtype:
+    """Return the structured NumPy dtype of one record.
+
+    Raises
+    ------
+    ValueError
+        If fw_ver does not map to a known firmware dtype.
+    """
+    try:
+        return FIRMWARE_DTYPES[resolve_fw_key(fw_ver)]()
+    except KeyError:
+        raise ValueError(f"Unsupported firmware version: {fw_ver}")
+
+
+def load_records(
+    full_filename: Union[str, Path], fw_ver: str = "std", mmap: bool = False
+) -> np.ndarray:
+    """Read a raw ``.bin`` file as a structured array of records.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Path to the binary file.
+    fw_ver : str, optional
+        Firmware version string (default "std").
+    mmap : bool, optional
+        Memory-map the file read-only instead of reading it (default False).
+        A trailing partial record is ignored.
+
+    Returns
+    -------
+    np.ndarray
+        Structured array with the firmware's record dtype.
+    """
+    dt = record_dtype(fw_ver)
+    if not mmap:
+        with span("parse.fromfile", path=str(full_filename)) as s:
+            data = np.fromfile(full_filename, dtype=dt)
+            s.set(bytes=data.nbytes, records=len(data))
+        return data
+    n_records = Path(full_filename).stat().st_size // dt.itemsize
+    if n_records == 0:
+        return np.empty(0, dtype=dt)
+    with span("parse.memmap", path=str(full_filename), bytes=n_records * dt.itemsize,
+              records=n_records):
+        return np.memmap(full_filename, dtype=dt, mode="r", shape=(n_records,))
+
+
+def time_base(tmicros) -> TimeBase:
+    """Summarize a full tmicros column into its TimeBase.
+
+    Parameters
+    ----------
+    tmicros : array-like
+        Raw tmicros column of the whole recording.
+
+    Returns
+    -------
+    TimeBase
+    """
+    tmicros = np.asarray(tmicros)
+    if len(tmicros) == 0:
+        return TimeBase(0, 0, False)
+    step = int(tmicros[1]) - int(tmicros[0]) if len(tmicros) > 1 else 0
+    return TimeBase(int(tmicros[0]), step, bool((tmicros < 0).any()))
+
+
+def elapsed_micros(tmicros, start_index: int, base: TimeBase) -> np.ndarray:
+    """Return elapsed microseconds for a slice of a recording.
+
+    Matches the ``tmicros`` column of ``records_to_frame`` for the whole
+    file, so chunked and windowed readers agree with full loads.
+
+    Parameters
+    ----------
+    tmicros : array-like
+        Raw tmicros values of the slice.
+    start_index : int
+        Record index of the first element of the slice within the file.
+    base : TimeBase
+        Time base of the whole file.
+
+    Returns
+    -------
+    np.ndarray
+        int64 elapsed microseconds.
+    """
+    if base.rolled:
+        return (np.arange(len(tmicros), dtype=np.int64) + start_index) * base.step
+    return np.asarray(tmicros, dtype=np.int64) - base.tmicros0
+
+
+def iter_chunks(
+    full_filename: Union[str, Path], fw_ver: str = "std", chunk_records: int = 1 << 20
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """Stream a recording in chunks of memory-mapped records.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Path to the binary file.
+    fw_ver : str, optional
+        Firmware version string (default "std").
+    chunk_records : int, optional
+        Records per chunk (default 2**20).
+
+    Yields
+    ------
+    tuple of (int, np.ndarray, np.ndarray)
+        ``(start_index, elapsed_us, records)``: index of the chunk's first
+        record, its int64 elapsed microseconds (as in ``records_to_frame``)
+        and a read-only structured view of the records.
+    """
+    records = load_records(full_filename, fw_ver, mmap=True)
+    base = time_base(records["tmicros"])
+    for start in range(0, len(records), chunk_records):
+        block = records[start:start + chunk_records]
+        yield start, elapsed_micros(block["tmicros"], start, base), block
+
+
+def handle_tmicros_rollover(col):
+    """Reconstruct a monotonic timestamp column from a rolled-over microsecond counter.
+
+    Assumes a constant sample interval derived from the first two samples.
+
+    Parameters
+    ----------
+    col : array-like
+        tmicros column values (may contain negative values from rollover).
+
+    Returns
+    -------
+    np.ndarray
+        Monotonically increasing int64 timestamp array starting from 0.
+    """
+    step_size = col[1] - col[0]
+    new_col = np.arange(0, len(col) * step_size, step_size, dtype=np.int64)
+    return new_col
+
+
+def records_to_frame(
+    data: np.ndarray, dtype_key: str, elapsed: Optional[np.ndarray] = None
+) -> pd.DataFrame:
+    """Build the processed DataFrame for a structured record array.
+
+    The tmicros column is zero-referenced and a 't' column (seconds,
+    float64) is inserted.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Structured array of records.
+    dtype_key : str
+        FIRMWARE_DTYPES key the records were parsed with.
+    elapsed : np.ndarray, optional
+        Precomputed elapsed microseconds (see ``elapsed_micros``), used
+        when data is a slice of a longer recording.
+
+    Returns
+    -------
+    pd.DataFrame
+        Parsed sensor data with columns ordered per COLUMN_ORDERS.
+    """
+    column_order = COLUMN_ORDERS[dtype_key]
+    with span("frame.construct", bytes=data.nbytes, records=len(data)):
+        df = pd.DataFrame(data)
+
+    with span("frame.tmicros", records=len(data)) as s:
+        if elapsed is not None:
+            df["tmicros"] = elapsed
+        else:
+            if (df["tmicros"] < 0).any():
+                s.set(rollover=True)
+                df["tmicros"] = df["tmicros"].astype(np.float64)
+                df["tmicros"] = handle_tmicros_rollover(df["tmicros"])
+
+            df["tmicros"] -= df["tmicros"].iloc[0]
+        df.insert(1, "t", df["tmicros"] * 1e-6)
+
+    # Only reorder columns that exist in this firmware's dtype
+    with span("frame.reorder", bytes=data.nbytes, records=len(data)):
+        df = df[[col for col in column_order if col in df.columns]]
+
+    return df
+
+
+def records_to_columns(
+    data: np.ndarray, dtype_key: str, elapsed: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """Return the columns of ``records_to_frame`` as NumPy arrays.
+
+    ``tmicros`` and ``t`` are computed as in ``records_to_frame``; the
+    sensor channels are views into data (strided by the record size), so
+    nothing is copied.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Structured array of records.
+    dtype_key : str
+        FIRMWARE_DTYPES key the records were parsed with.
+    elapsed : np.ndarray, optional
+        Precomputed elapsed microseconds (see ``elapsed_micros``).
+
+    Returns
+    -------
+    dict of str to np.ndarray
+        Columns in COLUMN_ORDERS order.
+    """
+    with span("columns.tmicros", records=len(data)) as s:
+        if elapsed is not None:
+            tmicros = np.asarray(elapsed)
+        elif len(data) and (data["tmicros"] < 0).any():
+            s.set(rollover=True)
+            tmicros = handle_tmicros_rollover(data["tmicros"].astype(np.float64))
+        else:
+            tmicros = data["tmicros"] - (data["tmicros"][0] if len(data) else 0)
+        columns = {"tmicros": tmicros, "t": tmicros * 1e-6}
+    for col in COLUMN_ORDERS[dtype_key]:
+        if col not in columns and col in data.dtype.names:
+            columns[col] = data[col]
+    return columns
+
+
+def records_to_table(
+    data: np.ndarray,
+    dtype_key: str,
+    elapsed: Optional[np.ndarray] = None,
+    backend: str = "pandas",
+):
+    """Build the processed records in the format of an output backend.
+
+    "arrow" and "polars" wrap NumPy buffers without a further copy: each
+    sensor channel is gathered once into a contiguous array (Arrow and
+    Polars columns cannot be strided), and ``tmicros``/``t`` are handed
+    over as they are. This skips the intermediate pandas DataFrame and its
+    copies. If the backend's package is not installed, a warning is issued
+    and a pandas DataFrame is returned.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Structured array of records.
+    dtype_key : str
+        FIRMWARE_DTYPES key the records were parsed with.
+    elapsed : np.ndarray, optional
+        Precomputed elapsed microseconds (see ``elapsed_micros``).
+    backend : str, optional
+        One of BACKENDS (default "pandas"). "numpy" returns the dict of
+        ``records_to_columns``.
+
+    Returns
+    -------
+    pd.DataFrame, pyarrow.Table, polars.DataFrame or dict of np.ndarray
+
+    Raises
+    ------
+    ValueError
+        If backend is not one of BACKENDS.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    package = _BACKEND_PACKAGES.get(backend)
+    if package is not None and importlib.util.find_spec(package) is None:
+        warnings.warn(f"{backend} backend needs {package}; returning a pandas DataFrame")
+        backend = "pandas"
+    if backend == "pandas":
+        return records_to_frame(data, dtype_key, elapsed=elapsed)
+
+    return columns_to_table(records_to_columns(data, dtype_key, elapsed=elapsed), backend)
+
+
+def columns_to_table(
+    columns: Dict[str, np.ndarray],
+    backend: str = "pandas",
+    index: Optional[np.ndarray] = None,
+    copy: bool = True,
+):
+    """Wrap a dict of column arrays in the table type of an output backend.
+
+    Arrow and Polars columns are made contiguous (a no-op for arrays that
+    already are) and wrapped without a further copy. A missing package
+    falls back to pandas with a warning, as in ``records_to_table``.
+
+    Parameters
+    ----------
+    columns : dict of str to np.ndarray
+        Equal-length columns, in output order.
+    backend : str, optional
+        One of BACKENDS (default "pandas").
+    index : np.ndarray, optional
+        Row labels of the pandas DataFrame (ignored by other backends).
+    copy : bool, optional
+        Copy the columns into the pandas DataFrame (default True); False
+        wraps the arrays as they are.
+
+    Returns
+    -------
+    pd.DataFrame, pyarrow.Table, polars.DataFrame or dict of np.ndarray
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    package = _BACKEND_PACKAGES.get(backend)
+    if package is not None and importlib.util.find_spec(package) is None:
+        warnings.warn(f"{backend} backend needs {package}; returning a pandas DataFrame")
+        backend = "pandas"
+    if backend == "numpy":
+        return columns
+    with span(f"table.{backend}", records=len(next(iter(columns.values()), ()))):
+        if backend == "pandas":
+            return pd.DataFrame(columns, index=index, copy=copy)
+        columns = {name: np.ascontiguousarray(col) for name, col in columns.items()}
+        if backend == "arrow":
+            import pyarrow as pa
+
+            return pa.table({name: pa.array(col) for name, col in columns.items()})
+        import polars as pl
+
+        return pl.DataFrame({name: pl.Series(name, col) for name, col in columns.items()})
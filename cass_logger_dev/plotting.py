@@ -0,0 +1,228 @@
+"""
+Plotting helpers for Cass Logger recordings.
+
+Plots are drawn from the decimation pyramid of each file (see ``lod``), so
+the renderer only ever receives about ``max_points`` points per channel: a
+mean line plus a min/max envelope. Interactive figures re-query the pyramid
+when an axis is zoomed or panned, showing raw samples once the window is
+small enough. Grids of many files hold only each file's pyramid, never its
+full DataFrame.
+
+Exports
+-------
+GROUP_LABELS : dict
+    Title and y-axis label for each channel group.
+plot_group : function
+    Plot one channel group of a recording, one channel per axis.
+plot_file : function
+    Plot several channel groups of a recording in one figure.
+plot_grid : function
+    Plot one channel group of many recordings into a grid of axes.
+"""
+
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.collections import PolyCollection
+from .firmware_structs import CHANNEL_GAINS, CHANNEL_GROUPS
+from .lod import LodPyramid, load_pyramid
+from .parsing import resolve_fw_key
+
+GROUP_LABELS = {
+    "suspension": ("Fork / Shock Travel", "Travel [mm]"),
+    "imu_accel": ("Internal IMU - Acceleration", "accel [m/s^2]"),
+    "imu_gyro": ("Internal IMU - Angular Velocity", "angular velocity"),
+}
+"""Maps channel group to (title, y label); I2C groups are labelled on the fly."""
+
+
+class _DecimatedAxes:
+    """Mean lines and min/max envelopes kept in sync with an axis' x limits.
+
+    Data updates never trigger autoscaling, so zoom/pan callbacks cannot
+    feed back into each other across shared axes.
+    """
+
+    def __init__(
+        self, ax, pyramid: LodPyramid, channels: Sequence[str], max_points: int, **plot_kwargs
+    ):
+        self.ax = ax
+        self.pyramid = pyramid
+        self.channels = list(channels)
+        self.max_points = max_points
+        self.lines = [ax.plot([], [], label=c, **plot_kwargs)[0] for c in self.channels]
+        self.envelopes = [
+            ax.add_collection(
+                PolyCollection([], facecolor=line.get_color(), alpha=0.3, linewidth=0),
+                autolim=False,
+            )
+            for line in self.lines
+        ]
+        self._updating = False
+        t_range, y_range = self.update(None, None)
+
+        if t_range[1] > t_range[0]:
+            ax.set_xlim(*t_range)
+        if y_range[1] > y_range[0]:
+            margin = 0.05 * (y_range[1] - y_range[0])
+            ax.set_ylim(y_range[0] - margin, y_range[1] + margin)
+        # callbacks hold bound methods weakly; the closure keeps self alive
+        ax.callbacks.connect("xlim_changed", lambda ax: self._on_xlim(ax))
+
+    def update(self, t0: Optional[float], t1: Optional[float]):
+        """Re-query the pyramid for [t0, t1]; return the (t, y) data ranges."""
+        t_lo, t_hi, y_lo, y_hi = np.inf, -np.inf, np.inf, -np.inf
+        for channel, line, envelope in zip(self.channels, self.lines, self.envelopes):
+            gain = CHANNEL_GAINS.get(channel, 1.0)
+            view = self.pyramid.get_view(channel, t0, t1, self.max_points)
+            line.set_data(view.t, view.mean * gain)
+            if view.level >= 0 and len(view.t):
+                verts = np.column_stack(
+                    [np.r_[view.t, view.t[::-1]], np.r_[view.min, view.max[::-1]] * gain]
+                )
+                envelope.set_verts([verts])
+            else:
+                envelope.set_verts([])
+            if len(view.t):
+                t_lo, t_hi = min(t_lo, view.t[0]), max(t_hi, view.t[-1])
+                lo, hi = sorted((view.min.min() * gain, view.max.max() * gain))
+                y_lo, y_hi = min(y_lo, lo), max(y_hi, hi)
+        return (t_lo, t_hi), (y_lo, y_hi)
+
+    def _on_xlim(self, ax):
+        if self._updating:
+            return
+        self._updating = True
+        try:
+            # the toolbar redraws after zoom/pan; redrawing here would draw twice
+            t0, t1 = ax.get_xlim()
+            self.update(t0, t1)
+        finally:
+            self._updating = False
+
+
+def _group_labels(group: str):
+    if group in GROUP_LABELS:
+        return GROUP_LABELS[group]
+    sensor, kind = group.rsplit("_", 1)
+    title, ylabel = GROUP_LABELS[f"imu_{kind}"]
+    return title.replace("Internal IMU", f"I2C IMU ({sensor})"), ylabel
+
+
+def plot_group(
+    full_filename: Union[str, Path],
+    group: str = "suspension",
+    fw_ver: str = "std",
+    axs: Optional[Sequence] = None,
+    max_points: int = 2000,
+    pyramid: Optional[LodPyramid] = None,
+):
+    """Plot the channels of one group against time, one axis per channel.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Raw ``.bin`` recording.
+    group : str, optional
+        Key of CHANNEL_GROUPS for this firmware (default "suspension").
+    fw_ver : str, optional
+        Firmware version string (default "std").
+    axs : sequence of Axes, optional
+        Axes to draw into, one per channel. A new figure is created if None.
+    max_points : int, optional
+        Points per channel handed to matplotlib (default 2000).
+    pyramid : LodPyramid, optional
+        Pre-loaded pyramid; loaded (or built) from the file if None.
+
+    Returns
+    -------
+    tuple of (Figure, list of Axes)
+
+    Raises
+    ------
+    KeyError
+        If group is not available for this firmware.
+    """
+    full_filename = Path(full_filename)
+    channels = CHANNEL_GROUPS[resolve_fw_key(fw_ver)][group]
+    if pyramid is None:
+        pyramid = load_pyramid(full_filename, fw_ver)
+    if axs is None:
+        fig, axs = plt.subplots(nrows=len(channels), ncols=1, sharex=True, figsize=(12, 8))
+        axs = np.atleast_1d(axs)
+    fig = axs[0].figure
+
+    title, ylabel = _group_labels(group)
+    for ax, channel in zip(axs, channels):
+        _DecimatedAxes(ax, pyramid, [channel], max_points)
+        ax.set_title(f"{title} - {channel} {full_filename.name}")
+        ax.set_xlabel("time [s]")
+        ax.set_ylabel(ylabel)
+        ax.tick_params(axis="x", labelbottom=True)
+    return fig, list(axs)
+
+
+def plot_file(
+    full_filename: Union[str, Path],
+    groups: Sequence[str] = ("suspension",),
+    fw_ver: str = "std",
+    max_points: int = 2000,
+):
+    """Plot several channel groups of one recording in a single figure.
+
+    Returns
+    -------
+    tuple of (Figure, list of Axes)
+    """
+    dtype_key = resolve_fw_key(fw_ver)
+    pyramid = load_pyramid(full_filename, fw_ver)
+    n_axes = sum(len(CHANNEL_GROUPS[dtype_key][g]) for g in groups)
+    fig, axs = plt.subplots(nrows=n_axes, ncols=1, sharex=True, figsize=(12, 2.5 * n_axes))
+    axs = list(np.atleast_1d(axs))
+    pos = 0
+    for group in groups:
+        n = len(CHANNEL_GROUPS[dtype_key][group])
+        plot_group(full_filename, group, fw_ver, axs[pos:pos + n], max_points, pyramid)
+        pos += n
+    fig.tight_layout()
+    return fig, axs
+
+
+def plot_grid(
+    filenames: Sequence[Union[str, Path]],
+    group: str = "suspension",
+    fw_ver: str = "std",
+    ncols: int = 3,
+    max_points: int = 1000,
+):
+    """Plot one channel group of many recordings into a grid, one cell per file.
+
+    Each file contributes only its pyramid, so memory stays proportional to
+    the number of files rather than their length.
+
+    Returns
+    -------
+    tuple of (Figure, list of Axes)
+    """
+    filenames: List[Path] = [Path(f) for f in filenames]
+    channels = CHANNEL_GROUPS[resolve_fw_key(fw_ver)][group]
+    nrows = max(-(-len(filenames) // ncols), 1)
+    fig, axs = plt.subplots(
+        nrows=nrows, ncols=ncols, sharex=False, figsize=(4 * ncols, 3 * nrows), squeeze=False
+    )
+    axs = list(axs.ravel())
+    title, ylabel = _group_labels(group)
+    for ax, full_filename in zip(axs, filenames):
+        pyramid = load_pyramid(full_filename, fw_ver)
+        _DecimatedAxes(ax, pyramid, channels, max_points, linewidth=0.8)
+        ax.set_title(full_filename.name, fontsize="small")
+        ax.set_xlabel("time [s]")
+        ax.set_ylabel(ylabel)
+    for ax in axs[len(filenames):]:
+        ax.set_visible(False)
+    if axs and filenames:
+        axs[0].legend(fontsize="small")
+    fig.suptitle(title)
+    fig.tight_layout()
+    return fig, axs
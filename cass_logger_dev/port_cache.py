@@ -0,0 +1,365 @@
+"""
+Cached data/command roles of logger serial ports.
+
+Which of a logger's two serial ports carries data and which carries
+commands is found with a handshake: ``u`` is written to both ports and the
+device answers ``x`` on the data port. The answer does not change for a
+given device and USB interface, so it is stored in a small JSON cache keyed
+by the device's USB serial number (or USB location). Known devices then
+connect without the full handshake: ``confirm_roles`` only writes ``u`` to
+the cached command port and expects ``x`` back on the cached data port.
+If that probe times out (e.g. a stale entry keyed by USB location now
+belongs to another device), the entry is forgotten and the handshake is
+repeated. Entries added without a handshake (see
+``CassCommands.set_manual_serial_ports(verify=False)``) are verified by a
+handshake the first time they are used. Many attached devices can be
+identified at once with ``identify_ports``, which runs the handshakes in
+parallel. Entries also keep the device's last measured download throughput,
+so download plans made in a new process start from a measured ETA.
+
+The cache lives in ``~/.cass_logger/port_roles.json``; set the
+``CASS_PORT_CACHE`` environment variable to another path, or to an empty
+string to keep it in memory only.
+
+Exports
+-------
+DEFAULT_CACHE_PATH : Path
+    Default cache file.
+PortRoleCache
+    Persistent map of device key to data/command interface.
+default_role_cache : function
+    Process-wide cache used by ``CassCommands``.
+device_key : function
+    Cache key of a serial port's device.
+find_port_pairs : function
+    Group logger serial ports into one pair per attached device.
+handshake : function
+    Find the data and command port of an open port pair.
+confirm_roles : function
+    Check cached roles of an open port pair with one probe.
+identify_ports : function
+    Roles of every attached logger, with handshakes run in parallel.
+"""
+
+import json
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from ._lazy import lazy_import
+
+serial = lazy_import("serial")
+list_ports = lazy_import("serial.tools.list_ports")
+
+DEFAULT_CACHE_PATH = Path.home() / ".cass_logger" / "port_roles.json"
+"""Default cache file; overridden by the CASS_PORT_CACHE environment variable."""
+
+
+def device_key(port) -> str:
+    """Cache key of the device a ``list_ports.comports()`` entry belongs to.
+
+    The USB serial number, shared by both ports of a logger; else the USB
+    location without the interface number; else the port name.
+    """
+    if port.serial_number:
+        return port.serial_number
+    if port.location:
+        return port.location.split(":")[0]  # strip the interface number
+    return port.device
+
+
+def _interface_id(port) -> str:
+    """Stable name of one of a device's two USB serial interfaces."""
+    # Linux locations end in the interface number; elsewhere the port name
+    # is derived from the USB location and is stable across replugs
+    if port.location and ":" in port.location:
+        return port.location
+    return port.device
+
+
+def find_port_pairs(ports: Optional[list] = None) -> Dict[str, Tuple[str, str]]:
+    """Group logger serial ports into one pair per attached device.
+
+    Parameters
+    ----------
+    ports : list, optional
+        ``list_ports.comports()`` entries (default: enumerate now).
+
+    Returns
+    -------
+    dict
+        Maps ``device_key`` to the device's two port names, sorted. Groups
+        without exactly two logger ports are left out.
+    """
+    from .cass_commands import CassCommands  # cass_commands imports this module
+
+    if ports is None:
+        ports = list_ports.comports()
+    groups: Dict[str, List[str]] = {}
+    for port in ports:
+        if CassCommands.is_logger_port(port):
+            groups.setdefault(device_key(port), []).append(port.device)
+    return {key: tuple(sorted(names)) for key, names in groups.items() if len(names) == 2}
+
+
+class PortRoleCache:
+    """Persistent map from device key to its data and command interfaces.
+
+    Parameters
+    ----------
+    path : str or Path, optional
+        JSON file; None keeps the cache in memory only.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, object]] = {}
+        if self.path is not None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def lookup(
+        self, port_names: Sequence[str], ports: Optional[list] = None
+    ) -> Tuple[Optional[str], Optional[Tuple[str, str]], bool]:
+        """Cached roles of a port pair.
+
+        Parameters
+        ----------
+        port_names : sequence of str
+            The device's two port names.
+        ports : list, optional
+            ``list_ports.comports()`` entries (default: enumerate now).
+
+        Returns
+        -------
+        tuple of (str or None, (str, str) or None, bool)
+            Device key (None if the ports are not enumerated), the
+            (data, command) port names if cached, and whether the entry
+            has been verified by a handshake.
+        """
+        by_name = {p.device: p for p in (ports if ports is not None else list_ports.comports())}
+        pair = [by_name.get(name) for name in port_names]
+        if None in pair:
+            return None, None, False
+        key = device_key(pair[0])
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return key, None, False
+        interfaces = {_interface_id(p): p.device for p in pair}
+        data, command = interfaces.get(entry.get("data")), interfaces.get(entry.get("command"))
+        if data is None or command is None or data == command:
+            return key, None, False
+        return key, (data, command), bool(entry.get("verified"))
+
+    def store(
+        self,
+        key: str,
+        data_port: str,
+        command_port: str,
+        verified: bool = True,
+        ports: Optional[list] = None,
+    ):
+        """Record the roles of a device's ports (by port name) and save."""
+        by_name = {p.device: p for p in (ports if ports is not None else list_ports.comports())}
+        if data_port not in by_name or command_port not in by_name:
+            return
+        entry = {
+            "data": _interface_id(by_name[data_port]),
+            "command": _interface_id(by_name[command_port]),
+            "verified": verified,
+            "updated": time.time(),
+        }
+        with self._lock:
+            old = self._entries.get(key)
+            if old and all(old.get(k) == entry[k] for k in ("data", "command", "verified")):
+                return
+            if old and "throughput_bps" in old:
+                entry["throughput_bps"] = old["throughput_bps"]
+            self._entries[key] = entry
+            self._save()
+
+    def throughput(self, key: str) -> Optional[float]:
+        """Last measured download throughput (bytes/s) of a device, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.get("throughput_bps")
+
+    def store_throughput(self, key: str, throughput_bps: float):
+        """Record a device's measured download throughput (bytes/s) and save."""
+        with self._lock:
+            self._entries.setdefault(key, {})["throughput_bps"] = throughput_bps
+            self._save()
+
+    def forget(self, key: str):
+        """Drop a device's port roles (e.g. after a failed connection).
+
+        The measured throughput of the device is kept.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            if "throughput_bps" in entry:
+                self._entries[key] = {"throughput_bps": entry["throughput_bps"]}
+            self._save()
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+    # --- Private Methods ---
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w") as f:
+                json.dump(self._entries, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            warnings.warn(f"Could not save port role cache {self.path}: {exc}")
+
+
+_default_cache: Optional[PortRoleCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def default_role_cache() -> PortRoleCache:
+    """Process-wide PortRoleCache at CASS_PORT_CACHE or DEFAULT_CACHE_PATH."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PortRoleCache(os.environ.get("CASS_PORT_CACHE", DEFAULT_CACHE_PATH))
+        return _default_cache
+
+
+def handshake(ser_a, ser_b, timeout: float = 3.0) -> Tuple[object, object]:
+    """Find the data and command port of an open port pair.
+
+    Writes ``u`` to both ports and returns ``(ser_data, ser_command)``
+    according to which port the device answers ``x`` on.
+
+    Raises
+    ------
+    TimeoutError
+        If the device does not respond within timeout seconds.
+    RuntimeError
+        If neither port returns the expected handshake response.
+    """
+    ser_b.write(b"u")
+    ser_a.write(b"u")
+
+    timer = time.monotonic()
+    while ser_a.in_waiting < 1 and ser_b.in_waiting < 1:
+        if time.monotonic() - timer > timeout:
+            raise TimeoutError("Timeout waiting for serial response from device.")
+        time.sleep(0.001)
+
+    response_a = ser_a.read(ser_a.in_waiting).decode("utf-8", "replace")
+    response_b = ser_b.read(ser_b.in_waiting).decode("utf-8", "replace")
+    if response_b == "x":
+        return ser_b, ser_a
+    if response_a == "x":
+        return ser_a, ser_b
+    raise RuntimeError("ERROR! No response from teensy!")
+
+
+def confirm_roles(ser_data, ser_command, timeout: float = 0.5) -> bool:
+    """Check cached roles: ``u`` on ser_command must be answered by ``x`` on ser_data.
+
+    Returns
+    -------
+    bool
+        False if nothing arrives on ser_data within timeout seconds or the
+        reply is not ``x``.
+    """
+    ser_command.write(b"u")
+    timer = time.monotonic()
+    while ser_data.in_waiting < 1:
+        if time.monotonic() - timer > timeout:
+            return False
+        time.sleep(0.001)
+    return ser_data.read(ser_data.in_waiting).decode("utf-8", "replace") == "x"
+
+
+def identify_ports(
+    pairs: Optional[Dict[str, Tuple[str, str]]] = None,
+    baud_rate: int = 9600,
+    max_workers: int = 8,
+    cache: Optional[PortRoleCache] = None,
+    timeout: float = 3.0,
+) -> Dict[str, Tuple[str, str]]:
+    """Data and command port of every attached logger.
+
+    Devices with a verified cache entry are not contacted; the others are
+    handshaken in parallel and their roles cached.
+
+    Parameters
+    ----------
+    pairs : dict, optional
+        ``find_port_pairs`` result (default: enumerate now).
+    baud_rate : int, optional
+        Serial baud rate (default 9600).
+    max_workers : int, optional
+        Handshakes run at the same time (default 8).
+    cache : PortRoleCache, optional
+        Role cache (default: ``default_role_cache()``).
+    timeout : float, optional
+        Handshake timeout per device in seconds (default 3).
+
+    Returns
+    -------
+    dict
+        Maps device key to (data port, command port). Devices that fail
+        the handshake are left out with a warning.
+    """
+    ports = list_ports.comports()
+    if pairs is None:
+        pairs = find_port_pairs(ports)
+    cache = cache or default_role_cache()
+    roles: Dict[str, Tuple[str, str]] = {}
+    pending = []
+    for key, names in pairs.items():
+        _, cached, verified = cache.lookup(names, ports)
+        if cached is not None and verified:
+            roles[key] = cached
+        else:
+            pending.append((key, names))
+
+    def identify(item):
+        key, names = item
+        ser_a = serial.Serial(names[0], baud_rate, timeout=1)
+        try:
+            ser_b = serial.Serial(names[1], baud_rate, timeout=1)
+            try:
+                ser_data, ser_command = handshake(ser_a, ser_b, timeout)
+                return key, (ser_data.port, ser_command.port)
+            finally:
+                ser_b.close()
+        finally:
+            ser_a.close()
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+            futures = {pool.submit(identify, item): item[0] for item in pending}
+        for future, key in futures.items():
+            try:
+                _, (data, command) = future.result()
+            except Exception as exc:
+                warnings.warn(f"Could not identify ports of {key}: {exc}")
+                continue
+            cache.store(key, data, command, verified=True, ports=ports)
+            roles[key] = (data, command)
+    return roles
@@ -0,0 +1,354 @@
+"""
+Filtered scans of recordings with predicate pushdown.
+
+Instead of loading a whole recording into a DataFrame and boolean-indexing
+it, ``scan`` evaluates a predicate chunk by chunk over the memory-mapped
+records (or the blocks of a ``.cassz`` archive) and materializes only the
+matching rows of the requested columns; ``scan_ranges`` returns just the
+record ranges where the predicate holds. Only the columns the predicate
+references are converted per chunk, so memory stays bounded by the chunk
+size plus the result.
+
+Predicates are Python expressions over the record columns, ``t`` (elapsed
+seconds) and ``tmicros`` (elapsed microseconds), e.g.
+``"a0 > 3000"``, ``"norm(gx, gy, gz) > 3 * g0"`` or
+``"(abs(wz) > 5) & (t < 60)"``. Expressions are parsed and checked
+against a whitelist of operators, functions (FUNCTIONS) and constants
+(CONSTANTS) before they are evaluated on NumPy arrays; ``and``/``or``/
+``not`` and chained comparisons work element-wise. Column values are
+converted to float64 for evaluation, so raw ADC arithmetic cannot
+overflow.
+
+Exports
+-------
+FUNCTIONS : dict
+    Functions available in predicates.
+CONSTANTS : dict
+    Constants available in predicates.
+Predicate
+    A validated, compiled predicate expression.
+scan : function
+    Matching rows of the requested columns.
+scan_ranges : function
+    Record ranges where a predicate holds.
+"""
+
+from __future__ import annotations
+
+import ast
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from ._lazy import lazy_import
+from .archive import ARCHIVE_SUFFIX, ArchiveReader
+from .firmware_structs import COLUMN_ORDERS
+from .parsing import columns_to_table, elapsed_micros, iter_chunks, record_dtype, resolve_fw_key
+from .signal_utils import runs
+
+pd = lazy_import("pandas")
+
+
+def _norm(*xs):
+    return np.sqrt(sum(np.square(x) for x in xs))
+
+
+FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "hypot": np.hypot,
+    "norm": _norm,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+    "exp": np.exp,
+    "log": np.log,
+    "log10": np.log10,
+}
+"""Functions available in predicates; ``norm(x, y, ...)`` is the Euclidean norm."""
+
+CONSTANTS = {"pi": np.pi, "g0": 9.80665}
+"""Constants available in predicates; ``g0`` is standard gravity in m/s^2."""
+
+_TIME_COLUMNS = ("tmicros", "t")
+
+_ALLOWED = (
+    ast.Expression, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name,
+    ast.Load, ast.Constant, ast.And, ast.Or, ast.Not, ast.Invert, ast.USub, ast.UAdd,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.BitAnd, ast.BitOr, ast.BitXor,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+
+class Predicate:
+    """A validated predicate expression over record columns.
+
+    Parameters
+    ----------
+    expr : str
+        Expression, e.g. ``"norm(gx, gy, gz) > 3 * g0"``.
+    fw_ver : str, optional
+        Firmware version string; column names are checked against its
+        record dtype (default "std").
+
+    Attributes
+    ----------
+    columns : list of str
+        Columns the expression references.
+
+    Raises
+    ------
+    ValueError
+        If the expression has a syntax error or uses anything other than
+        columns, numbers, FUNCTIONS, CONSTANTS and arithmetic, comparison
+        and logical operators.
+    """
+
+    def __init__(self, expr: str, fw_ver: str = "std"):
+        self.expr = expr
+        try:
+            tree = ast.parse(expr.strip(), mode="eval")
+        except SyntaxError as exc:
+            raise ValueError(f"Invalid predicate {expr!r}: {exc.msg}") from None
+        available = set(record_dtype(fw_ver).names) | set(_TIME_COLUMNS)
+        columns = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED):
+                raise ValueError(f"{type(node).__name__} is not allowed in predicate {expr!r}")
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                    raise ValueError(
+                        f"Unknown function in predicate {expr!r}; available: {sorted(FUNCTIONS)}"
+                    )
+                if node.keywords:
+                    raise ValueError(f"Keyword arguments are not allowed in predicate {expr!r}")
+            elif isinstance(node, ast.Name) and node.id not in FUNCTIONS and node.id not in CONSTANTS:
+                if node.id not in available:
+                    raise ValueError(
+                        f"Unknown column {node.id!r} in predicate {expr!r}; "
+                        f"available: {sorted(available)}"
+                    )
+                columns.add(node.id)
+            elif isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+                raise ValueError(f"Only numeric constants are allowed in predicate {expr!r}")
+        self.columns: List[str] = sorted(columns)
+        tree = ast.fix_missing_locations(_Elementwise().visit(tree))
+        self._code = compile(tree, "<predicate>", "eval")
+
+    def __repr__(self):
+        return f"Predicate({self.expr!r})"
+
+    def evaluate(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Evaluate on a dict of column arrays; return a boolean mask."""
+        n = len(next(iter(columns.values()))) if columns else 0
+        namespace = {"__builtins__": {}, **FUNCTIONS, **CONSTANTS, **columns}
+        mask = eval(self._code, namespace)
+        return np.broadcast_to(np.asarray(mask, dtype=bool), (n,))
+
+
+class _Elementwise(ast.NodeTransformer):
+    """Rewrite and/or/not and chained comparisons into element-wise operators."""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        operands = [node.left, *node.comparators]
+        parts = [
+            ast.Compare(left=operands[i], ops=[op], comparators=[operands[i + 1]])
+            for i, op in enumerate(node.ops)
+        ]
+        result = parts[0]
+        for part in parts[1:]:
+            result = ast.BinOp(left=result, op=ast.BitAnd(), right=part)
+        return result
+
+
+def scan(
+    full_filename: Union[str, Path],
+    where: Union[str, Predicate],
+    columns: Optional[Sequence[str]] = None,
+    fw_ver: str = "std",
+    chunk_records: int = 1 << 20,
+    limit: Optional[int] = None,
+    backend: str = "pandas",
+):
+    """Return the rows of a recording where a predicate holds.
+
+    Equivalent to ``df[mask][columns]`` on the full ``process_data_file``
+    DataFrame (``tmicros`` is int64 here), without loading the recording.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        ``.bin`` file or ``.cassz`` archive.
+    where : str or Predicate
+        Predicate expression (see the module docstring).
+    columns : sequence of str, optional
+        Columns to return (default: all, in COLUMN_ORDERS order).
+    fw_ver : str, optional
+        Firmware version string of a ``.bin`` file (default "std").
+    chunk_records : int, optional
+        Records evaluated per chunk (default 2**20).
+    limit : int, optional
+        Stop after this many matching rows.
+    backend : str, optional
+        Output type, one of ``parsing.BACKENDS`` (default "pandas").
+
+    Returns
+    -------
+    pd.DataFrame (or the selected backend's table)
+        Matching rows; the pandas index holds their record numbers.
+    """
+    fw_key = _fw_key(full_filename, fw_ver)
+    predicate = where if isinstance(where, Predicate) else Predicate(where, fw_key)
+    if columns is None:
+        columns = [c for c in COLUMN_ORDERS[fw_key] if c in _TIME_COLUMNS or c in record_dtype(fw_key).names]
+    else:
+        _check_columns(columns, fw_key)
+    parts: Dict[str, List[np.ndarray]] = {c: [] for c in columns}
+    rows: List[np.ndarray] = []
+    found = 0
+    for start, elapsed, records in _iter_source(full_filename, fw_key, chunk_records):
+        mask = predicate.evaluate(_chunk_columns(records, elapsed, predicate.columns))
+        idx = np.flatnonzero(mask)
+        if limit is not None:
+            idx = idx[: limit - found]
+        if not len(idx):
+            continue
+        for c in columns:
+            if c == "tmicros":
+                parts[c].append(elapsed[idx])
+            elif c == "t":
+                parts[c].append(elapsed[idx] * 1e-6)
+            else:
+                parts[c].append(records[c][idx])
+        rows.append(idx + start)
+        found += len(idx)
+        if limit is not None and found >= limit:
+            break
+    dtypes = _column_dtypes(fw_key)
+    out = {
+        c: np.concatenate(parts[c]) if parts[c] else np.empty(0, dtype=dtypes[c]) for c in columns
+    }
+    index = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    return columns_to_table(out, backend, index=index)
+
+
+def scan_ranges(
+    full_filename: Union[str, Path],
+    where: Union[str, Predicate],
+    fw_ver: str = "std",
+    chunk_records: int = 1 << 20,
+    min_records: int = 1,
+) -> pd.DataFrame:
+    """Return the record ranges of a recording where a predicate holds.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        ``.bin`` file or ``.cassz`` archive.
+    where : str or Predicate
+        Predicate expression (see the module docstring).
+    fw_ver : str, optional
+        Firmware version string of a ``.bin`` file (default "std").
+    chunk_records : int, optional
+        Records evaluated per chunk (default 2**20).
+    min_records : int, optional
+        Shortest range to return (default 1).
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns start and stop (record numbers, stop exclusive), n_records,
+        and t_start/t_end (elapsed seconds of the first and last record).
+    """
+    fw_key = _fw_key(full_filename, fw_ver)
+    predicate = where if isinstance(where, Predicate) else Predicate(where, fw_key)
+    starts, stops, t_starts, t_ends = [], [], [], []
+    for start, elapsed, records in _iter_source(full_filename, fw_key, chunk_records):
+        mask = predicate.evaluate(_chunk_columns(records, elapsed, predicate.columns))
+        run_starts, run_stops = runs(mask)
+        for a, b in zip(run_starts, run_stops):
+            if stops and stops[-1] == start + a:  # continues a range of the previous chunk
+                stops[-1] = start + b
+                t_ends[-1] = elapsed[b - 1]
+            else:
+                starts.append(start + a)
+                stops.append(start + b)
+                t_starts.append(elapsed[a])
+                t_ends.append(elapsed[b - 1])
+    df = pd.DataFrame(
+        {
+            "start": np.asarray(starts, dtype=np.int64),
+            "stop": np.asarray(stops, dtype=np.int64),
+            "t_start": np.asarray(t_starts, dtype=np.int64) * 1e-6,
+            "t_end": np.asarray(t_ends, dtype=np.int64) * 1e-6,
+        }
+    )
+    df.insert(2, "n_records", df["stop"] - df["start"])
+    return df[df["n_records"] >= min_records].reset_index(drop=True)
+
+
+# --- Private Methods ---
+
+
+def _fw_key(full_filename, fw_ver: str) -> str:
+    if Path(full_filename).suffix == ARCHIVE_SUFFIX:
+        return ArchiveReader(full_filename).fw_key
+    return resolve_fw_key(fw_ver)
+
+
+def _check_columns(columns: Sequence[str], fw_key: str):
+    available = set(record_dtype(fw_key).names) | set(_TIME_COLUMNS)
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}; available: {sorted(available)}")
+
+
+def _column_dtypes(fw_key: str) -> Dict[str, np.dtype]:
+    dtype = record_dtype(fw_key)
+    dtypes = {name: dtype[name] for name in dtype.names}
+    dtypes.update(tmicros=np.dtype(np.int64), t=np.dtype(np.float64))
+    return dtypes
+
+
+def _iter_source(
+    full_filename, fw_key: str, chunk_records: int
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """``(start, elapsed_us, records)`` chunks of a ``.bin`` file or archive."""
+    if Path(full_filename).suffix != ARCHIVE_SUFFIX:
+        yield from iter_chunks(full_filename, fw_key, chunk_records)
+        return
+    reader = ArchiveReader(full_filename)
+    for start in range(0, reader.n_records, chunk_records):
+        records = reader.read_records(start, start + chunk_records)
+        yield start, elapsed_micros(records["tmicros"], start, reader.time_base), records
+
+
+def _chunk_columns(records: np.ndarray, elapsed: np.ndarray, names: Sequence[str]):
+    """float64 arrays of the columns a predicate references."""
+    columns = {}
+    for name in names:
+        if name == "tmicros":
+            columns[name] = elapsed.astype(np.float64)
+        elif name == "t":
+            columns[name] = elapsed * 1e-6
+        else:
+            columns[name] = records[name].astype(np.float64)
+    if not columns:  # constant predicate: keep the chunk length
+        columns["_"] = np.empty(len(records))
+    return columns
@@ -0,0 +1,221 @@
+"""
+Per-device command scheduler serializing access to a logger's serial ports.
+
+``CassCommands`` talks to the device over two ports without any locking,
+so two threads issuing commands at once interleave their byte streams.
+A ``CommandScheduler`` owns one ``CassCommands`` and runs every request on
+a single worker thread, taking requests from a priority queue and returning
+``concurrent.futures.Future`` objects. Long operations are submitted as
+generators that yield between protocol-safe steps (e.g. one SD buffer of a
+download); each step is re-queued, so a quick status query submitted with a
+higher priority runs between two buffers instead of after the whole file.
+The device has a single open file, so stepwise operations hold it from
+their first step to their last and run one after another.
+
+Exports
+-------
+PRIORITY_STATUS, PRIORITY_NORMAL, PRIORITY_BULK : int
+    Default priorities (lower runs first).
+CommandScheduler
+    Priority queue and worker thread for one device.
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Callable, Optional, Union
+
+PRIORITY_STATUS = 0
+"""Quick queries: RTC time, firmware version, device ID."""
+
+PRIORITY_NORMAL = 10
+"""Default priority of submitted commands."""
+
+PRIORITY_BULK = 20
+"""Transfers and other long, stepwise operations."""
+
+_SHUTDOWN = float("inf")  # sentinel priority, after every real request
+
+
+class _Request:
+    """One queued request; generator requests run one step at a time."""
+
+    def __init__(self, fn: Callable, args, kwargs, stepwise: bool):
+        self.future = Future()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.stepwise = stepwise
+        self.steps = None
+
+    def run_step(self) -> bool:
+        """Run the request (or its next step); return True when finished."""
+        if self.steps is None:
+            if not self.future.set_running_or_notify_cancel():
+                return True
+            try:
+                result = self.fn(*self.args, **self.kwargs)
+            except BaseException as exc:
+                self.future.set_exception(exc)
+                return True
+            if not self.stepwise:
+                self.future.set_result(result)
+                return True
+            self.steps = result
+        try:
+            next(self.steps)
+        except StopIteration as done:
+            self.future.set_result(done.value)
+            return True
+        except BaseException as exc:
+            self.future.set_exception(exc)
+            return True
+        return False
+
+    def abort(self):
+        """Cancel a waiting request, or close a started generator."""
+        if self.steps is None:
+            self.future.cancel()
+            return
+        self.steps.close()
+        if not self.future.done():
+            self.future.set_exception(CancelledError())
+
+
+class CommandScheduler:
+    """Run all commands for one logger on a single worker thread.
+
+    Requests run in priority order (lower first, FIFO within a priority).
+    Only the worker thread touches the ports, so any number of client
+    threads may submit concurrently. Clients must not call the wrapped
+    ``CassCommands`` directly while the scheduler is running.
+
+    Parameters
+    ----------
+    cass : CassCommands, optional
+        Device to drive. A new ``CassCommands`` (auto-detected ports) is
+        created if omitted.
+
+    Examples
+    --------
+    >>> with CommandScheduler() as sched:
+    ...     download = sched.read_file("log_0001.bin", 5_120_000)
+    ...     rtc = sched.call("get_RTC_time", priority=PRIORITY_STATUS)
+    ...     print(rtc.result())  # answered between two SD buffers
+    ...     data = download.result()
+    """
+
+    def __init__(self, cass=None):
+        if cass is None:
+            from .cass_commands import CassCommands
+
+            cass = CassCommands()
+        self.cass = cass
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._cancel = False
+        self._closed = False
+        self._active: Optional[_Request] = None  # started stepwise request
+        self._waiting = []  # stepwise requests queued behind the active one
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="cass-scheduler", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    # --- Public Methods ---
+
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_NORMAL, **kwargs) -> Future:
+        """Queue ``fn(cass, *args, **kwargs)`` and return its Future."""
+        return self._put(_Request(fn, (self.cass, *args), kwargs, stepwise=False), priority)
+
+    def call(self, method: str, *args, priority: int = PRIORITY_NORMAL, **kwargs) -> Future:
+        """Queue a ``CassCommands`` method call by name and return its Future.
+
+        Examples
+        --------
+        >>> sched.call("get_fw_ver", priority=PRIORITY_STATUS).result()
+        'std'
+        """
+        return self.submit(lambda cass: getattr(cass, method)(*args, **kwargs), priority=priority)
+
+    def submit_steps(
+        self, fn: Callable, *args, priority: int = PRIORITY_BULK, **kwargs
+    ) -> Future:
+        """Queue a stepwise operation and return its Future.
+
+        ``fn(cass, *args, **kwargs)`` must return a generator. One step
+        runs per turn (up to the next ``yield``), after which the request
+        goes back into the queue, so requests with a lower priority value
+        run in between. Each ``yield`` must leave the ports idle. The
+        Future's result is the generator's return value.
+        """
+        return self._put(_Request(fn, (self.cass, *args), kwargs, stepwise=True), priority)
+
+    def read_file(
+        self,
+        filename: str,
+        file_size: int,
+        priority: int = PRIORITY_BULK,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> Future:
+        """Download a file stepwise; the Future's result is as ``read_file``'s."""
+        return self.submit_steps(
+            lambda cass: cass.read_file_steps(filename, file_size, progress), priority=priority
+        )
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """Stop accepting requests and stop the worker thread.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Block until the worker has exited (default True).
+        cancel_pending : bool, optional
+            Cancel queued requests and close started stepwise ones instead
+            of running them to completion (default False).
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._cancel = cancel_pending
+                self._queue.put((_SHUTDOWN, next(self._seq), None))
+        if wait:
+            self._thread.join()
+
+    # --- Private Methods ---
+
+    def _put(self, request: _Request, priority: Union[int, float]) -> Future:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("CommandScheduler has been shut down")
+            self._queue.put((priority, next(self._seq), request))
+        return request.future
+
+    def _run(self):
+        while True:
+            priority, _, request = self._queue.get()
+            if request is None:
+                break
+            if self._cancel:
+                request.abort()
+                continue
+            if request.stepwise and self._active not in (None, request):
+                self._waiting.append((priority, request))
+                continue
+            finished = request.run_step()
+            if request.stepwise:
+                self._active = None if finished else request
+                if finished:
+                    for waiting in self._waiting:
+                        self._queue.put((waiting[0], next(self._seq), waiting[1]))
+                    self._waiting = []
+            if not finished:
+                self._queue.put((priority, next(self._seq), request))
+        for _, request in self._waiting:
+            request.abort()
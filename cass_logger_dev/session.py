@@ -0,0 +1,313 @@
+"""
+Stitch the recordings of one download directory onto a single timeline.
+
+Each ``.bin`` file is zero-referenced on its own by ``process_data_file``.
+A Session places every file at an offset on a shared, continuous timeline
+and, when possible, anchors that timeline to absolute (UTC) time. Files are
+memory-mapped lazily; window queries only read the files (and the records
+within them) that overlap the window.
+
+Exports
+-------
+Session
+    Lazy, continuous view over the recordings of a download directory.
+"""
+
+import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from .cass_commands import CassCommands
+from .manifest import read_manifest
+from .parsing import (
+    TimeBase,
+    elapsed_micros,
+    load_records,
+    records_to_frame,
+    resolve_fw_key,
+    time_base,
+)
+
+_COUNTER_MODULUS = 2**32
+
+
+class _FileEntry:
+    """Per-file bookkeeping for a Session."""
+
+    def __init__(self, path: Path, dtype_key: str):
+        self.path = path
+        self.records = load_records(path, dtype_key, mmap=True)
+        self.n_records = len(self.records)
+        self.base: TimeBase = time_base(self.records["tmicros"])
+        if self.n_records:
+            self.duration_us = int(
+                elapsed_micros(self.records["tmicros"][-1:], self.n_records - 1, self.base)[0]
+            )
+            self.last_raw = int(self.records["tmicros"][-1])
+        else:
+            self.duration_us = 0
+            self.last_raw = 0
+        self.offset_us = 0
+
+
+class Session:
+    """A continuous recording stitched from the files of a download directory.
+
+    Absolute time is anchored by ``start_time`` or per-file
+    ``file_start_times``. Without them the session is unanchored
+    (``start_time`` and ``anchor_source`` are None) and only session
+    seconds are available. The device RTC time stored in metadata.txt is
+    read when the logger is docked, not when it stops recording, so it is
+    used only if ``estimate_start`` is set, as an upper bound of the end of
+    the last file (``anchor_source`` "rtc_download").
+
+    Within a power cycle the logger's microsecond counter keeps running
+    across files, so the gap between consecutive files is recovered from
+    the raw counter. Gaps longer than ``max_gap`` seconds are treated as a
+    counter reset and the next file is placed directly after the previous.
+
+    Parameters
+    ----------
+    dir_path : str or Path
+        Download directory containing ``.bin`` files and metadata.txt (or
+        manifest.json, which is preferred when present).
+    fw_ver : str, optional
+        Firmware version string. Defaults to the one in metadata.txt.
+    files : sequence of str, optional
+        Filenames in recording order. Defaults to the order recorded in
+        metadata.txt, else file modification time.
+    start_time : datetime or float, optional
+        Absolute time (UTC datetime or Unix seconds) of the first sample.
+    file_start_times : dict, optional
+        Maps filename to the absolute start time (datetime or Unix seconds)
+        of that file; overrides the counter-derived offsets.
+    max_gap : float, optional
+        Longest plausible gap between files in seconds (default 600).
+    estimate_start : bool, optional
+        If no anchor is given, estimate one by assuming the last file ended
+        at the download RTC time (default False). Timestamps are then late
+        by however long the logger sat idle before it was downloaded.
+
+    Attributes
+    ----------
+    start_time : datetime or None
+        UTC time of the first sample, None if the session is unanchored.
+    anchor_source : str or None
+        "start_time", "file_start_times", "rtc_download" or None.
+    rtc_time : datetime or None
+        Device RTC time recorded at download, if known.
+    """
+
+    def __init__(
+        self,
+        dir_path: Union[str, Path],
+        fw_ver: Optional[str] = None,
+        files: Optional[Sequence[str]] = None,
+        start_time: Optional[Union[datetime.datetime, float]] = None,
+        file_start_times: Optional[Dict[str, Union[datetime.datetime, float]]] = None,
+        max_gap: float = 600.0,
+        estimate_start: bool = False,
+    ):
+        self.dir_path = Path(dir_path)
+        metadata = read_manifest(self.dir_path)
+        if metadata is not None:
+            metadata = dict(metadata, files=[f["name"] for f in metadata["files"]])
+        else:
+            metadata = CassCommands.find_and_parse_metadata(self.dir_path, recursive=False) or {}
+        if fw_ver is None:
+            fw_ver = metadata.get("firmware_version") or "std"
+        self.dtype_key = resolve_fw_key(fw_ver)
+        self.device_id = metadata.get("device_id")
+
+        if files is None:
+            files = [
+                f for f in (metadata.get("files") or []) if Path(self.dir_path, f).is_file()
+            ]
+        if not files:
+            paths = sorted(
+                self.dir_path.glob("*.bin"), key=lambda p: (p.stat().st_mtime, p.name)
+            )
+            files = [p.name for p in paths]
+        self.files: List[str] = list(files)
+
+        self._entries = [_FileEntry(Path(self.dir_path, f), self.dtype_key) for f in self.files]
+        self._place_files(max_gap)
+
+        self.rtc_time: Optional[datetime.datetime] = None
+        if metadata.get("rtc_time") is not None:
+            self.rtc_time = datetime.datetime.fromtimestamp(
+                metadata["rtc_time"], datetime.timezone.utc
+            )
+        self.anchor_source: Optional[str] = None
+        self.start_time: Optional[datetime.datetime] = None
+        if file_start_times:
+            self._apply_file_start_times(file_start_times)
+        if start_time is not None:
+            self.start_time = _to_datetime(start_time)
+            self.anchor_source = "start_time"
+        elif self.start_time is None and estimate_start and self.rtc_time is not None:
+            self.start_time = self.rtc_time - datetime.timedelta(microseconds=self.duration_us)
+            self.anchor_source = "rtc_download"
+
+        self._starts = np.array([e.offset_us for e in self._entries], dtype=np.int64)
+        self._ends = self._starts + np.array([e.duration_us for e in self._entries], dtype=np.int64)
+
+    # --- Properties ---
+
+    @property
+    def n_records(self) -> int:
+        """Total number of records across all files."""
+        return sum(e.n_records for e in self._entries)
+
+    @property
+    def duration_us(self) -> int:
+        """Session duration from the first to the last sample in microseconds."""
+        if not self._entries:
+            return 0
+        return max(e.offset_us + e.duration_us for e in self._entries)
+
+    @property
+    def anchored(self) -> bool:
+        """True if the session timeline is anchored to absolute time."""
+        return self.start_time is not None
+
+    @property
+    def duration(self) -> float:
+        """Session duration in seconds."""
+        return self.duration_us * 1e-6
+
+    @property
+    def index(self) -> pd.DataFrame:
+        """Global time index: one row per file with its start/end on the timeline."""
+        df = pd.DataFrame(
+            {
+                "file": self.files,
+                "start_s": self._starts * 1e-6,
+                "end_s": self._ends * 1e-6,
+                "n_records": [e.n_records for e in self._entries],
+            }
+        )
+        if self.start_time is not None:
+            origin = pd.Timestamp(self.start_time)
+            df["start_time"] = origin + pd.to_timedelta(self._starts, unit="us")
+            df["end_time"] = origin + pd.to_timedelta(self._ends, unit="us")
+        return df
+
+    # --- Public Methods ---
+
+    def window(
+        self,
+        t0: Union[float, datetime.datetime],
+        t1: Union[float, datetime.datetime],
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """Return the samples between t0 and t1 from every overlapping file.
+
+        Parameters
+        ----------
+        t0, t1 : float or datetime
+            Window bounds in session seconds, or absolute datetimes if the
+            session is anchored.
+        columns : sequence of str, optional
+            Columns to return besides the time columns (default: all).
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns ``t`` (session seconds), ``time`` (UTC timestamps, if
+            anchored), ``file`` and the requested channels. ``tmicros``
+            stays relative to the start of each file.
+        """
+        t0_us, t1_us = self._to_session_us(t0), self._to_session_us(t1)
+        hits = np.flatnonzero((self._ends >= t0_us) & (self._starts <= t1_us))
+        frames = [self._file_window(i, t0_us, t1_us, columns) for i in hits]
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return self._file_window(0, 0, -1, columns) if self._entries else pd.DataFrame()
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def iter_files(self, columns: Optional[Sequence[str]] = None):
+        """Yield ``(filename, DataFrame)`` for each file on the session timeline.
+
+        Only one file's frame is materialized at a time.
+        """
+        for i, name in enumerate(self.files):
+            yield name, self._file_window(i, self._starts[i], self._ends[i], columns)
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Return the whole session as a single DataFrame."""
+        return self.window(0, self.duration_us * 1e-6, columns)
+
+    # --- Private Methods ---
+
+    def _place_files(self, max_gap: float):
+        """Set each file's offset on the session timeline from the raw counter."""
+        max_gap_us = max_gap * 1e6
+        for prev, entry in zip(self._entries, self._entries[1:]):
+            prev_end = prev.offset_us + prev.duration_us
+            gap = (entry.base.tmicros0 - prev.last_raw) % _COUNTER_MODULUS
+            if not entry.n_records or gap > max_gap_us:
+                gap = max(prev.base.step, 0)
+            entry.offset_us = prev_end + gap
+
+    def _apply_file_start_times(self, file_start_times):
+        """Override offsets with absolute per-file start times."""
+        starts = {name: _to_datetime(t) for name, t in file_start_times.items()}
+        known = [(e, starts[e.path.name]) for e in self._entries if e.path.name in starts]
+        if not known:
+            return
+        ref_entry, ref_time = known[0]
+        origin = ref_time - datetime.timedelta(microseconds=ref_entry.offset_us)
+        for entry, start in known:
+            entry.offset_us = int((start - origin).total_seconds() * 1e6)
+        first = min(e.offset_us for e in self._entries)
+        for entry in self._entries:
+            entry.offset_us -= first
+        self.start_time = origin + datetime.timedelta(microseconds=first)
+        self.anchor_source = "file_start_times"
+
+    def _to_session_us(self, t) -> float:
+        if isinstance(t, (datetime.datetime, pd.Timestamp)):
+            if self.start_time is None:
+                raise ValueError("Session has no absolute time anchor.")
+            return (_to_datetime(t) - self.start_time).total_seconds() * 1e6
+        return float(t) * 1e6
+
+    def _file_window(self, i: int, t0_us: float, t1_us: float, columns) -> pd.DataFrame:
+        """Processed frame of file i restricted to the session window [t0, t1]."""
+        entry = self._entries[i]
+        lo_us, hi_us = t0_us - entry.offset_us, t1_us - entry.offset_us
+        if entry.base.rolled:
+            step = max(entry.base.step, 1)
+            start = max(int(np.ceil(lo_us / step)), 0)
+            stop = min(int(np.floor(hi_us / step)) + 1, entry.n_records)
+        else:
+            raw = entry.records["tmicros"]
+            start = int(np.searchsorted(raw, lo_us + entry.base.tmicros0, side="left"))
+            stop = int(np.searchsorted(raw, hi_us + entry.base.tmicros0, side="right"))
+        start, stop = max(start, 0), max(stop, start)
+
+        records = np.asarray(entry.records[start:stop])
+        elapsed = elapsed_micros(records["tmicros"], start, entry.base)
+        df = records_to_frame(records, self.dtype_key, elapsed=elapsed)
+        if columns is not None:
+            df = df[[c for c in df.columns if c in columns or c in ("tmicros", "t")]]
+
+        session_us = elapsed + entry.offset_us
+        df["t"] = session_us * 1e-6
+        if self.start_time is not None:
+            df.insert(
+                2, "time", pd.Timestamp(self.start_time) + pd.to_timedelta(session_us, unit="us")
+            )
+        df.insert(2, "file", self.files[i])
+        return df
+
+
+def _to_datetime(t) -> datetime.datetime:
+    """Convert Unix seconds or a datetime to an aware UTC datetime."""
+    if isinstance(t, pd.Timestamp):
+        t = t.to_pydatetime()
+    if isinstance(t, datetime.datetime):
+        return t if t.tzinfo else t.replace(tzinfo=datetime.timezone.utc)
+    return datetime.datetime.fromtimestamp(float(t), datetime.timezone.utc)
@@ -0,0 +1,107 @@
+"""
+Vectorized signal helpers shared by the analysis modules.
+
+Exports
+-------
+StreamingDerivative
+    Central-difference derivative computed chunk by chunk.
+hysteresis : function
+    Two-threshold (Schmitt trigger) state of a signal, resumable across chunks.
+runs : function
+    Start/stop indices of the True runs of a boolean array.
+"""
+
+from typing import Tuple
+import numpy as np
+
+
+class StreamingDerivative:
+    """Central-difference derivative over a stream of chunks.
+
+    The derivative at sample i is ``(x[i+span] - x[i-span]) / (t[i+span] -
+    t[i-span])``. Differencing over ``2*span`` samples limits the noise
+    amplification of single-sample differences, and time differences are
+    taken on the integer microsecond axis before conversion to seconds, so
+    long recordings do not lose precision. The last ``2*span`` samples of
+    each chunk are carried over, so every sample except the first and last
+    ``span`` of the stream gets exactly one derivative value.
+
+    Parameters
+    ----------
+    span : int, optional
+        Half-width of the difference stencil in samples (default 2).
+    """
+
+    def __init__(self, span: int = 2):
+        self.span = span
+        self._x = np.empty(0, dtype=np.float64)
+        self._t = np.empty(0, dtype=np.int64)
+
+    def update(self, x, t_us) -> Tuple[np.ndarray, np.ndarray]:
+        """Add a chunk; return ``(t_us, dxdt)`` for the samples now resolved.
+
+        Parameters
+        ----------
+        x : array-like
+            Signal values of the chunk.
+        t_us : array-like
+            int64 elapsed microseconds of the chunk.
+
+        Returns
+        -------
+        tuple of (np.ndarray, np.ndarray)
+            Sample times (us) and derivative (units of x per second). Samples
+            with non-increasing timestamps yield NaN.
+        """
+        s = self.span
+        x = np.concatenate([self._x, np.asarray(x, dtype=np.float64)])
+        t = np.concatenate([self._t, np.asarray(t_us, dtype=np.int64)])
+        self._x, self._t = x[-2 * s:], t[-2 * s:]
+        if len(x) <= 2 * s:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        dt = (t[2 * s:] - t[:-2 * s]).astype(np.float64) * 1e-6
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dxdt = np.where(dt > 0, (x[2 * s:] - x[:-2 * s]) / dt, np.nan)
+        return t[s:-s], dxdt
+
+
+def hysteresis(x, on: float, off: float, initial: bool = False) -> np.ndarray:
+    """Return the two-threshold state of x.
+
+    The state turns True when ``x >= on`` and back to False when
+    ``x <= off`` (``off < on``); in between it keeps its previous value.
+
+    Parameters
+    ----------
+    x : array-like
+        Signal values.
+    on, off : float
+        Switch-on and switch-off thresholds.
+    initial : bool, optional
+        State before the first sample, e.g. the last state of the previous
+        chunk (default False).
+
+    Returns
+    -------
+    np.ndarray
+        Boolean state per sample.
+    """
+    x = np.asarray(x)
+    marks = np.full(len(x) + 1, -1, dtype=np.int8)
+    marks[0] = int(initial)
+    marks[1:][x <= off] = 0
+    marks[1:][x >= on] = 1
+    idx = np.where(marks >= 0, np.arange(len(marks)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return marks[idx][1:].astype(bool)
+
+
+def runs(mask) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(starts, stops)`` of the True runs of a boolean array.
+
+    A run still active at the end stops at ``len(mask)``.
+    """
+    padded = np.concatenate([[0], np.asarray(mask, dtype=np.int8), [0]])
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
@@ -0,0 +1,426 @@
+"""
+Batched spectral analysis: Welch power spectral densities and band powers.
+
+All requested channels of a recording are processed together: samples are
+streamed chunk by chunk from the memory-mapped records (or ``.cassz``
+archive blocks), cut into overlapping segments with a strided view, and
+every segment of every channel is windowed and transformed in a single 2-D
+``rfft`` call. Segments that straddle a chunk boundary are completed from
+the carried-over tail of the previous chunk, so the result equals a Welch
+estimate over the whole recording while memory stays bounded by the chunk
+size. The window, its normalization and the frequency axis are computed
+once per parameter set (``welch_plan``) and shared by every file of a
+batch.
+
+PSDs are one-sided and density-scaled (units**2/Hz, with raw channels
+converted by CHANNEL_GAINS), matching ``scipy.signal.welch`` with a
+periodic window and constant detrending.
+
+Exports
+-------
+WelchPlan
+    Window, normalization and frequency axis of one Welch configuration.
+welch_plan : function
+    Cached WelchPlan for a parameter set.
+StreamingWelch
+    Welch accumulator over chunks of multi-channel samples.
+welch : function
+    Welch PSD of in-memory arrays.
+psd_file : function
+    PSDs of the channels of one recording.
+psd_files : function
+    PSDs of many recordings in a process pool.
+band_power : function
+    Integrated power per channel in frequency bands.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+import numpy as np
+from ._lazy import lazy_import
+from .firmware_structs import CHANNEL_GAINS, CHANNEL_GROUPS
+from .parsing import record_dtype
+from .scan import _fw_key, _iter_source
+
+pd = lazy_import("pandas")
+
+WINDOWS = ("hann", "hamming", "blackman", "boxcar")
+"""Window names accepted by WelchPlan."""
+
+_BATCH_VALUES = 1 << 18  # samples windowed and transformed per rfft call (cache-sized)
+
+
+class WelchPlan:
+    """Precomputed window, scaling and frequency axis of a Welch estimate.
+
+    Parameters
+    ----------
+    nperseg : int
+        Segment length in samples.
+    fs : float
+        Sample rate in Hz.
+    window : str, optional
+        One of WINDOWS (default "hann"); windows are periodic.
+    overlap : float, optional
+        Fraction of a segment shared with the next one, 0 <= overlap < 1
+        (default 0.5).
+    detrend : bool, optional
+        Subtract each segment's mean before windowing (default True).
+
+    Attributes
+    ----------
+    step : int
+        Samples between segment starts.
+    freqs : np.ndarray
+        Frequencies of the one-sided spectrum in Hz.
+    """
+
+    def __init__(
+        self,
+        nperseg: int,
+        fs: float,
+        window: str = "hann",
+        overlap: float = 0.5,
+        detrend: bool = True,
+    ):
+        if nperseg < 2:
+            raise ValueError("nperseg must be at least 2")
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap must be in [0, 1)")
+        if window not in WINDOWS:
+            raise ValueError(f"window must be one of {WINDOWS}")
+        self.nperseg = nperseg
+        self.fs = float(fs)
+        self.window_name = window
+        self.overlap = overlap
+        self.detrend = detrend
+        self.step = max(1, nperseg - int(round(overlap * nperseg)))
+        self.window = _window(window, nperseg)
+        self.window.flags.writeable = False
+        self.freqs = np.fft.rfftfreq(nperseg, 1.0 / self.fs)
+        self.freqs.flags.writeable = False
+        # one-sided density: every bin except DC (and Nyquist for even lengths) doubled
+        scale = np.full(len(self.freqs), 2.0 / (self.fs * np.sum(self.window ** 2)))
+        scale[0] /= 2
+        if nperseg % 2 == 0:
+            scale[-1] /= 2
+        self.scale = scale
+
+    def __repr__(self):
+        return (f"WelchPlan(nperseg={self.nperseg}, fs={self.fs:g}, window={self.window_name!r}, "
+                f"overlap={self.overlap:g})")
+
+    def segment_power(self, segments: np.ndarray) -> np.ndarray:
+        """Sum of the periodograms of segments shaped (..., n_segments, nperseg).
+
+        Returns the unscaled power summed over the segment axis, shaped
+        (..., n_freqs).
+        """
+        if self.detrend:
+            segments = segments - segments.mean(axis=-1, keepdims=True)
+            segments *= self.window
+        else:
+            segments = segments * self.window
+        spec = np.fft.rfft(segments, axis=-1)
+        return (spec.real ** 2 + spec.imag ** 2).sum(axis=-2)
+
+
+@lru_cache(maxsize=32)
+def welch_plan(
+    nperseg: int, fs: float, window: str = "hann", overlap: float = 0.5, detrend: bool = True
+) -> WelchPlan:
+    """Return the (cached) WelchPlan of a parameter set."""
+    return WelchPlan(nperseg, fs, window, overlap, detrend)
+
+
+class StreamingWelch:
+    """Welch PSD of several channels accumulated over chunks.
+
+    Parameters
+    ----------
+    plan : WelchPlan
+        Segment length, window and sample rate.
+    n_channels : int
+        Number of channels (rows) of every chunk.
+
+    Examples
+    --------
+    >>> acc = StreamingWelch(welch_plan(1024, 1000.0), 3)
+    >>> for chunk in chunks:  # each shaped (3, n)
+    ...     acc.update(chunk)
+    >>> freqs, psd = acc.result()
+    """
+
+    def __init__(self, plan: WelchPlan, n_channels: int):
+        self.plan = plan
+        self.n_channels = n_channels
+        self.n_segments = 0
+        self._power = np.zeros((n_channels, len(plan.freqs)))
+        self._tail = np.empty((n_channels, 0))
+
+    def update(self, x):
+        """Add a chunk of samples shaped (n_channels, n)."""
+        plan = self.plan
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim != 2 or x.shape[0] != self.n_channels:
+            raise ValueError(f"Expected a chunk shaped ({self.n_channels}, n), got {x.shape}")
+        buf = np.concatenate([self._tail, x], axis=1) if self._tail.shape[1] else x
+        n = buf.shape[1]
+        n_segments = 0 if n < plan.nperseg else (n - plan.nperseg) // plan.step + 1
+        if n_segments:
+            segments = np.lib.stride_tricks.sliding_window_view(buf, plan.nperseg, axis=1)
+            segments = segments[:, ::plan.step][:, :n_segments]
+            batch = max(1, _BATCH_VALUES // (self.n_channels * plan.nperseg))
+            for i in range(0, n_segments, batch):
+                self._power += plan.segment_power(segments[:, i:i + batch])
+            self.n_segments += n_segments
+        self._tail = buf[:, n_segments * plan.step:].copy()
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(freqs, psd)``, psd shaped (n_channels, n_freqs).
+
+        The PSD is all NaN if fewer than nperseg samples were added.
+        """
+        if not self.n_segments:
+            return self.plan.freqs, np.full_like(self._power, np.nan)
+        return self.plan.freqs, self._power * (self.plan.scale / self.n_segments)
+
+
+def welch(
+    x,
+    fs: float,
+    nperseg: int = 1024,
+    window: str = "hann",
+    overlap: float = 0.5,
+    detrend: bool = True,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Welch PSD of one or more in-memory signals.
+
+    Parameters
+    ----------
+    x : array-like
+        Samples, shaped (n,) or (n_channels, n).
+    fs : float
+        Sample rate in Hz.
+    nperseg, window, overlap, detrend
+        See WelchPlan.
+
+    Returns
+    -------
+    tuple of (np.ndarray, np.ndarray)
+        Frequencies (Hz) and PSD shaped like x with the sample axis
+        replaced by frequency.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    acc = StreamingWelch(welch_plan(nperseg, float(fs), window, overlap, detrend), len(np.atleast_2d(x)))
+    acc.update(np.atleast_2d(x))
+    freqs, psd = acc.result()
+    return freqs, psd[0] if x.ndim == 1 else psd
+
+
+def psd_file(
+    full_filename: Union[str, Path],
+    channels: Sequence[str] = ("imu_accel", "imu_gyro"),
+    nperseg: int = 1024,
+    window: str = "hann",
+    overlap: float = 0.5,
+    detrend: bool = True,
+    fs: Optional[float] = None,
+    fw_ver: str = "std",
+    chunk_records: int = 1 << 20,
+) -> pd.DataFrame:
+    """Welch PSDs of the channels of one recording, streamed in chunks.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        ``.bin`` file or ``.cassz`` archive.
+    channels : sequence of str, optional
+        Channel names and/or CHANNEL_GROUPS names (default the IMU
+        accelerometer and gyroscope).
+    nperseg, window, overlap, detrend
+        See WelchPlan.
+    fs : float, optional
+        Sample rate in Hz (default: from the median timestamp step of the
+        first chunk).
+    fw_ver : str, optional
+        Firmware version string of a ``.bin`` file (default "std").
+    chunk_records : int, optional
+        Records read per chunk (default 2**20).
+
+    Returns
+    -------
+    pd.DataFrame
+        One column per channel, indexed by frequency in Hz. Values are in
+        (channel unit)**2/Hz; ``attrs`` holds fs, n_segments and
+        n_records.
+    """
+    fw_key = _fw_key(full_filename, fw_ver)
+    names = _expand_channels(channels, fw_key)
+    gains = np.array([CHANNEL_GAINS.get(c, 1.0) for c in names])[:, None]
+    acc = None
+    n_records = 0
+    for _, elapsed, records in _iter_source(full_filename, fw_key, chunk_records):
+        if acc is None:
+            if fs is None:
+                fs = _sample_rate(elapsed)
+            acc = StreamingWelch(welch_plan(nperseg, float(fs), window, overlap, detrend), len(names))
+        acc.update(np.stack([records[c] for c in names]) * gains)
+        n_records += len(records)
+    if acc is None:
+        acc = StreamingWelch(welch_plan(nperseg, float(fs or 1.0), window, overlap, detrend), len(names))
+    freqs, psd = acc.result()
+    df = pd.DataFrame(psd.T, index=pd.Index(freqs, name="freq_hz"), columns=names)
+    df.attrs.update(fs=acc.plan.fs, n_segments=acc.n_segments, n_records=n_records)
+    return df
+
+
+def psd_files(
+    paths: Union[str, Path, Sequence[Union[str, Path]]],
+    channels: Sequence[str] = ("imu_accel", "imu_gyro"),
+    nperseg: int = 1024,
+    window: str = "hann",
+    overlap: float = 0.5,
+    detrend: bool = True,
+    fs: Optional[float] = None,
+    fw_ver: str = "std",
+    workers: Optional[int] = None,
+    chunk_records: int = 1 << 20,
+) -> Dict[str, pd.DataFrame]:
+    """Welch PSDs of many recordings, one task per file in a process pool.
+
+    Each worker process builds the WelchPlan once and reuses it for every
+    file with the same sample rate.
+
+    Parameters
+    ----------
+    paths : path or sequence of paths
+        ``.bin`` files, ``.cassz`` archives and/or directories (searched
+        recursively).
+    workers : int, optional
+        Worker processes (default os.cpu_count()). 0 or 1 runs in this
+        process.
+    Other parameters
+        As for ``psd_file``.
+
+    Returns
+    -------
+    dict
+        Maps each file path to its ``psd_file`` DataFrame. Files that fail
+        are left out with a printed message.
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix in (".bin", ".cassz")))
+        else:
+            files.append(path)
+    kwargs = dict(channels=tuple(channels), nperseg=nperseg, window=window, overlap=overlap,
+                  detrend=detrend, fs=fs, fw_ver=fw_ver, chunk_records=chunk_records)
+    tasks = [(str(f), kwargs) for f in files]
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1 or len(tasks) <= 1:
+        results = [_psd_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_psd_task, tasks, chunksize=max(1, len(tasks) // (8 * workers))))
+    psds = {}
+    for (path, _), (df, error) in zip(tasks, results):
+        if error:
+            print(f"Skipping {path}: {error}")
+        else:
+            psds[path] = df
+    return psds
+
+
+def band_power(
+    psd: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+    bands: Dict[str, Tuple[float, float]],
+) -> pd.DataFrame:
+    """Integrated power of each channel in frequency bands.
+
+    Parameters
+    ----------
+    psd : pd.DataFrame or dict of pd.DataFrame
+        ``psd_file`` result, or the ``psd_files`` dict.
+    bands : dict
+        Maps band names to ``(low, high)`` in Hz; bins with
+        ``low <= f < high`` are summed.
+
+    Returns
+    -------
+    pd.DataFrame
+        Band powers ((channel unit)**2) with one column per band, indexed
+        by channel, or by (file, channel) for a dict of PSDs. The square
+        root of a band power is the RMS of the signal in that band.
+
+    Examples
+    --------
+    >>> band_power(psds, {"body": (0.5, 4), "frame": (8, 40), "buzz": (40, 200)})
+    """
+    if isinstance(psd, dict):
+        if not psd:
+            return pd.DataFrame(columns=list(bands))
+        return pd.concat({path: band_power(df, bands) for path, df in psd.items()},
+                         names=["file", "channel"])
+    freqs = psd.index.to_numpy()
+    df_hz = freqs[1] - freqs[0] if len(freqs) > 1 else 0.0
+    values = psd.to_numpy()
+    out = {}
+    for name, (low, high) in bands.items():
+        in_band = (freqs >= low) & (freqs < high)
+        out[name] = values[in_band].sum(axis=0) * df_hz
+    return pd.DataFrame(out, index=pd.Index(psd.columns, name="channel"))
+
+
+# --- Private Methods ---
+
+
+def _window(name: str, n: int) -> np.ndarray:
+    """Periodic window of length n (as used for spectral estimation)."""
+    k = np.arange(n) * (2 * np.pi / n)
+    if name == "hann":
+        return 0.5 - 0.5 * np.cos(k)
+    if name == "hamming":
+        return 0.54 - 0.46 * np.cos(k)
+    if name == "blackman":
+        return 0.42 - 0.5 * np.cos(k) + 0.08 * np.cos(2 * k)
+    return np.ones(n)
+
+
+def _expand_channels(channels: Sequence[str], fw_key: str):
+    """Channel names with CHANNEL_GROUPS names replaced by their members."""
+    groups = CHANNEL_GROUPS.get(fw_key, {})
+    names = []
+    for c in channels:
+        names.extend(groups.get(c, [c]))
+    available = record_dtype(fw_key).names
+    unknown = [c for c in names if c not in available]
+    if unknown:
+        raise ValueError(f"Unknown channels {unknown}; groups: {sorted(groups)}")
+    return list(dict.fromkeys(names))
+
+
+def _sample_rate(elapsed_us: np.ndarray) -> float:
+    """Sample rate in Hz from the median timestamp step."""
+    steps = np.diff(elapsed_us[:100_000])
+    steps = steps[steps > 0]
+    if not len(steps):
+        raise ValueError("Cannot infer the sample rate; pass fs")
+    return 1e6 / float(np.median(steps))
+
+
+def _psd_task(task):
+    """Worker: PSD of one file, or the error message."""
+    path, kwargs = task
+    try:
+        return psd_file(path, **kwargs), None
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"
@@ -0,0 +1,237 @@
+"""
+Vectorized suspension analytics for the fork (a0) and shock (b0) channels.
+
+Travel, velocity, sag, bottom-outs and travel/velocity histograms are
+accumulated chunk by chunk over the memory-mapped records, so a ride is
+analyzed in one pass with bounded memory and no DataFrame.
+
+Exports
+-------
+SUSPENSION_CHANNELS : dict
+    Maps "fork"/"shock" to their raw channel names.
+SuspensionStats
+    Streaming accumulator for one suspension channel.
+analyze_file : function
+    Per-ride summary of a ``.bin`` file.
+summarize_files : function
+    One row of scalar metrics per ride for many files.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+from .firmware_structs import CHANNEL_GAINS
+from .parsing import iter_chunks
+from .signal_utils import StreamingDerivative, hysteresis
+
+SUSPENSION_CHANNELS = {
+    "fork": "a0",
+    "shock": "b0",
+}
+"""Maps suspension element to its raw potentiometer channel."""
+
+
+class SuspensionStats:
+    """Streaming travel/velocity statistics for one suspension channel.
+
+    Parameters
+    ----------
+    channel : str
+        Raw channel name ("a0" or "b0"); its gain comes from CHANNEL_GAINS.
+    max_travel_mm : float, optional
+        Full travel of the element. Required for sag and bottom-out counts.
+    travel_bins : array-like, optional
+        Travel histogram edges in mm (default 1 mm bins up to max travel,
+        or 250 mm).
+    velocity_bins : array-like, optional
+        Velocity histogram edges in mm/s (default 100 mm/s bins over
+        +/-5000 mm/s).
+    bottom_out_fraction : float, optional
+        Fraction of max travel that counts as a bottom-out (default 0.95).
+    release_fraction : float, optional
+        Fraction of max travel the element must return below before the
+        next bottom-out can be counted (default 0.85).
+    span : int, optional
+        Half-width of the velocity difference stencil (default 2).
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        max_travel_mm: Optional[float] = None,
+        travel_bins=None,
+        velocity_bins=None,
+        bottom_out_fraction: float = 0.95,
+        release_fraction: float = 0.85,
+        span: int = 2,
+    ):
+        self.channel = channel
+        self.gain = CHANNEL_GAINS.get(channel, 1.0)
+        self.max_travel_mm = max_travel_mm
+        if travel_bins is None:
+            travel_bins = np.arange(0.0, (max_travel_mm or 250.0) + 1.0, 1.0)
+        if velocity_bins is None:
+            velocity_bins = np.arange(-5000.0, 5001.0, 100.0)
+        self.travel_bins = np.asarray(travel_bins, dtype=np.float64)
+        self.velocity_bins = np.asarray(velocity_bins, dtype=np.float64)
+        self.travel_hist = np.zeros(len(self.travel_bins) - 1, dtype=np.int64)
+        self.velocity_hist = np.zeros(len(self.velocity_bins) - 1, dtype=np.int64)
+        self.bottom_out_fraction = bottom_out_fraction
+        self.release_fraction = release_fraction
+
+        self.n = 0
+        self.travel_sum = 0.0
+        self.travel_max = -np.inf
+        self.travel_min = np.inf
+        self.compression = _SignedVelocityStats()
+        self.rebound = _SignedVelocityStats()
+        self.bottom_outs = 0
+        self._bottomed = False
+        self._derivative = StreamingDerivative(span)
+
+    def update(self, raw, t_us):
+        """Add one chunk of raw ADC counts and their elapsed microseconds."""
+        travel = np.asarray(raw, dtype=np.float64) * self.gain
+        if not len(travel):
+            return
+        self.n += len(travel)
+        self.travel_sum += travel.sum()
+        self.travel_max = max(self.travel_max, travel.max())
+        self.travel_min = min(self.travel_min, travel.min())
+        self.travel_hist += np.histogram(travel, self.travel_bins)[0]
+
+        _, velocity = self._derivative.update(travel, t_us)
+        velocity = velocity[np.isfinite(velocity)]
+        self.velocity_hist += np.histogram(velocity, self.velocity_bins)[0]
+        self.compression.update(velocity[velocity > 0])
+        self.rebound.update(-velocity[velocity < 0])
+
+        if self.max_travel_mm:
+            state = hysteresis(
+                travel,
+                self.bottom_out_fraction * self.max_travel_mm,
+                self.release_fraction * self.max_travel_mm,
+                initial=self._bottomed,
+            )
+            prev = np.concatenate([[self._bottomed], state[:-1]])
+            self.bottom_outs += int(np.count_nonzero(state & ~prev))
+            self._bottomed = bool(state[-1])
+
+    def travel_percentile(self, q: float) -> float:
+        """Travel (mm) below which q percent of samples lie, from the histogram."""
+        total = self.travel_hist.sum()
+        if not total:
+            return float("nan")
+        cdf = np.cumsum(self.travel_hist) / total
+        i = int(np.searchsorted(cdf, q / 100.0))
+        return float(self.travel_bins[min(i + 1, len(self.travel_bins) - 1)])
+
+    def summary(self) -> Dict[str, object]:
+        """Return the statistics accumulated so far."""
+        median = self.travel_percentile(50)
+        return {
+            "travel_mean": self.travel_sum / self.n if self.n else float("nan"),
+            "travel_min": float(self.travel_min) if self.n else float("nan"),
+            "travel_max": float(self.travel_max) if self.n else float("nan"),
+            "travel_p50": median,
+            "travel_p95": self.travel_percentile(95),
+            "sag_pct": 100.0 * median / self.max_travel_mm if self.max_travel_mm else None,
+            "bottom_outs": self.bottom_outs if self.max_travel_mm else None,
+            "compression_velocity_mean": self.compression.mean,
+            "compression_velocity_max": self.compression.max,
+            "rebound_velocity_mean": self.rebound.mean,
+            "rebound_velocity_max": self.rebound.max,
+            "travel_hist": self.travel_hist.copy(),
+            "travel_bins": self.travel_bins,
+            "velocity_hist": self.velocity_hist.copy(),
+            "velocity_bins": self.velocity_bins,
+        }
+
+
+class _SignedVelocityStats:
+    """Count, mean and max of one velocity direction."""
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def update(self, v):
+        if len(v):
+            self.n += len(v)
+            self.total += v.sum()
+            self.max = max(self.max, float(v.max()))
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+
+def analyze_file(
+    full_filename: Union[str, Path],
+    fw_ver: str = "std",
+    fork_travel_mm: Optional[float] = None,
+    shock_travel_mm: Optional[float] = None,
+    chunk_records: int = 1 << 20,
+    **stats_kwargs,
+) -> Dict[str, object]:
+    """Compute the suspension summary of one ride in a single streaming pass.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Raw ``.bin`` recording.
+    fw_ver : str, optional
+        Firmware version string (default "std").
+    fork_travel_mm, shock_travel_mm : float, optional
+        Full travel of fork and shock; enables sag and bottom-out metrics.
+    chunk_records : int, optional
+        Records per chunk (default 2**20).
+    **stats_kwargs
+        Passed to each SuspensionStats (bins, thresholds, span).
+
+    Returns
+    -------
+    dict
+        "file", "duration_s", "n_records", and a "fork" and "shock" dict as
+        returned by ``SuspensionStats.summary``.
+    """
+    stats = {
+        "fork": SuspensionStats(SUSPENSION_CHANNELS["fork"], fork_travel_mm, **stats_kwargs),
+        "shock": SuspensionStats(SUSPENSION_CHANNELS["shock"], shock_travel_mm, **stats_kwargs),
+    }
+    n_records, duration_us = 0, 0
+    for _, elapsed, block in iter_chunks(full_filename, fw_ver, chunk_records):
+        for element in stats.values():
+            element.update(block[element.channel], elapsed)
+        n_records += len(block)
+        duration_us = int(elapsed[-1])
+
+    summary = {
+        "file": Path(full_filename).name,
+        "duration_s": duration_us * 1e-6,
+        "n_records": n_records,
+    }
+    summary.update({name: element.summary() for name, element in stats.items()})
+    return summary
+
+
+def summarize_files(
+    filenames: Sequence[Union[str, Path]], fw_ver: str = "std", **kwargs
+) -> pd.DataFrame:
+    """Return one row of scalar suspension metrics per ride.
+
+    Histograms are left out; use ``analyze_file`` for them. Keyword
+    arguments are passed to ``analyze_file``.
+    """
+    rows = []
+    for full_filename in filenames:
+        summary = analyze_file(full_filename, fw_ver, **kwargs)
+        row = {k: summary[k] for k in ("file", "duration_s", "n_records")}
+        for element in SUSPENSION_CHANNELS:
+            for key, value in summary[element].items():
+                if not isinstance(value, np.ndarray):
+                    row[f"{element}_{key}"] = value
+        rows.append(row)
+    return pd.DataFrame(rows)
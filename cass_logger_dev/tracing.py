@@ -0,0 +1,324 @@
+"""
+Opt-in tracing of the parse pipeline.
+
+The stages of loading a recording (reading or memory-mapping the file,
+building the DataFrame, rollover handling, the column reorder, archive
+decompression, cache lookups, metadata discovery) are wrapped in ``span``
+blocks that record their wall time and byte/record counts. Spans cost a
+global lookup and a no-op context manager while tracing is off. When
+enabled, finished spans are collected by a Tracer, which can summarize
+them per stage or export them in the Chrome trace event format (open the
+JSON file in ``chrome://tracing`` or https://ui.perfetto.dev). With
+``memory=True`` each span also reports its peak of newly allocated bytes
+from ``tracemalloc``; tracemalloc slows allocation-heavy code noticeably
+and tracks the whole process, so peaks of spans running concurrently in
+other threads are attributed to every open span.
+
+Set the ``CASS_TRACE`` environment variable to a file path to trace a
+whole process and write the trace there when it exits.
+
+Exports
+-------
+Tracer
+    Collects finished spans; summary and Chrome-trace export.
+span : function
+    Context manager timing one stage while tracing is enabled.
+traced : function
+    Decorator wrapping every call of a function in a span.
+enable_tracing : function
+    Start collecting spans.
+disable_tracing : function
+    Stop collecting spans and return the Tracer.
+active_tracer : function
+    The enabled Tracer, or None.
+tracing : function
+    Context manager enabling tracing for a block.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+from ._lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+class _NullSpan:
+    """Span returned while tracing is off: every operation is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """A span being timed; ``set`` attaches counts and other arguments."""
+
+    __slots__ = ("tracer", "name", "args", "start", "mem_start", "peak", "parent")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.tracer._enter(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._exit(self)
+        return False
+
+    def set(self, **args):
+        """Attach arguments (e.g. bytes=..., records=...) to the span."""
+        self.args.update(args)
+
+
+class Tracer:
+    """Collector of finished spans.
+
+    Parameters
+    ----------
+    memory : bool, optional
+        Track the peak of newly allocated bytes of every span with
+        ``tracemalloc`` (default False). tracemalloc is started if needed
+        and stopped again by ``disable_tracing``.
+
+    Attributes
+    ----------
+    events : list of dict
+        Finished spans: name, start and dur (microseconds since the tracer
+        was created), thread id and args.
+    """
+
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.events: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter_ns()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    # --- Public Methods ---
+
+    def summary(self) -> pd.DataFrame:
+        """Per-stage totals: calls, total/mean/max ms, bytes, records and MB/s.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per span name, sorted by total time. Nested spans are
+            counted in their own rows and in their parents' times.
+        """
+        rows = {}
+        for event in self.events:
+            row = rows.setdefault(event["name"], {"calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                                  "bytes": 0, "records": 0, "peak_alloc_bytes": 0})
+            ms = event["dur"] / 1e3
+            row["calls"] += 1
+            row["total_ms"] += ms
+            row["max_ms"] = max(row["max_ms"], ms)
+            row["bytes"] += event["args"].get("bytes", 0)
+            row["records"] += event["args"].get("records", 0)
+            row["peak_alloc_bytes"] = max(row["peak_alloc_bytes"],
+                                          event["args"].get("peak_alloc_bytes", 0))
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        if df.empty:
+            return df
+        df.index.name = "span"
+        df.insert(2, "mean_ms", df["total_ms"] / df["calls"])
+        measured = (df["bytes"] > 0) & (df["total_ms"] > 0)
+        df["mb_per_s"] = (df["bytes"] / 1e3 / df["total_ms"]).where(measured)
+        if not self.memory:
+            df = df.drop(columns="peak_alloc_bytes")
+        return df.sort_values("total_ms", ascending=False)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Return the spans as a Chrome trace event dict ("X" events)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": event["name"],
+                "cat": "cass",
+                "ph": "X",
+                "ts": event["start"],
+                "dur": event["dur"],
+                "pid": pid,
+                "tid": event["tid"],
+                "args": event["args"],
+            }
+            for event in self.events
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """Write the Chrome trace JSON to path and return it."""
+        path = Path(path)
+        with open(path, "w") as f:
+            json.dump(self.to_chrome(), f, default=str)
+        return path
+
+    def clear(self):
+        """Drop the collected spans."""
+        with self._lock:
+            self.events = []
+
+    # --- Private Methods ---
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, span: _Span):
+        stack = self._stack()
+        span.parent = stack[-1] if stack else None
+        stack.append(span)
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if span.parent is not None:
+                span.parent.peak = max(span.parent.peak, peak)
+            tracemalloc.reset_peak()
+            span.mem_start = span.peak = current
+        span.start = time.perf_counter_ns()
+
+    def _exit(self, span: _Span):
+        end = time.perf_counter_ns()
+        if self.memory:
+            span.peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+            span.args["peak_alloc_bytes"] = span.peak - span.mem_start
+            if span.parent is not None:
+                span.parent.peak = max(span.parent.peak, span.peak)
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        event = {
+            "name": span.name,
+            "start": (span.start - self._origin) / 1e3,
+            "dur": (end - span.start) / 1e3,
+            "tid": threading.get_ident(),
+            "args": span.args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def span(name: str, **args):
+    """Time a block as one span while tracing is enabled.
+
+    Parameters
+    ----------
+    name : str
+        Stage name, e.g. "parse.fromfile".
+    **args
+        Arguments recorded with the span (e.g. bytes, records, path); more
+        can be attached inside the block with ``.set(...)``.
+
+    Examples
+    --------
+    >>> with span("parse.fromfile", path=str(path)) as s:
+    ...     data = np.fromfile(path, dtype=dt)
+    ...     s.set(bytes=data.nbytes, records=len(data))
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, args)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator timing every call of a function as a span (default name: qualname)."""
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(_tracer, span_name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def enable_tracing(memory: bool = False) -> Tracer:
+    """Start collecting spans in a new Tracer and return it."""
+    global _tracer
+    disable_tracing()
+    _tracer = Tracer(memory=memory)
+    return _tracer
+
+
+def disable_tracing() -> Optional[Tracer]:
+    """Stop collecting spans; return the Tracer that was active, if any."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None and tracer._started_tracemalloc:
+        tracemalloc.stop()
+    return tracer
+
+
+def active_tracer() -> Optional[Tracer]:
+    """Return the enabled Tracer, or None if tracing is off."""
+    return _tracer
+
+
+@contextlib.contextmanager
+def tracing(memory: bool = False, path: Optional[Union[str, Path]] = None):
+    """Enable tracing for a block; optionally save the Chrome trace to path.
+
+    Examples
+    --------
+    >>> with tracing(memory=True) as tracer:
+    ...     df = CassCommands.process_data_file("log_0001.bin")
+    >>> print(tracer.summary())
+    """
+    tracer = enable_tracing(memory=memory)
+    try:
+        yield tracer
+    finally:
+        if _tracer is tracer:
+            disable_tracing()
+        if path is not None:
+            tracer.save(path)
+
+
+def _trace_process(path: str):
+    """Trace the whole process and save to path at exit (CASS_TRACE)."""
+    tracer = enable_tracing()
+    atexit.register(tracer.save, path)
+
+
+if os.environ.get("CASS_TRACE"):
+    _trace_process(os.environ["CASS_TRACE"])
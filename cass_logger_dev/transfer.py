@@ -0,0 +1,306 @@
+"""
+Compressed SD-buffer transfer mode for the serial link.
+
+The serial link limits download speed, and raw recordings compress well
+when each byte is differenced against the same byte of the previous
+record: counters (``tmicros``) and slowly varying ADC channels turn into
+runs of constant bytes. This module defines an optional transfer mode
+built on that observation, and the host side of it:
+
+* Negotiation: the host writes ``k`` on the command port; firmware that
+  supports compressed transfers answers ``<capabilities>x`` on the data
+  port, with CAPABILITY among the space-separated tokens. Firmware without
+  the mode does not answer, and the host keeps using ``t``.
+* Transfer: ``b`` asks for the next SD buffer as one frame instead of the
+  raw ``SD_BUFF_SIZE`` bytes of ``t``. A frame is a FRAME_HEADER (method,
+  delta stride, payload length, CRC-32 of the decoded buffer) followed by
+  the payload. METHOD_DELTA_PACKBITS payloads are the stride-delta of the
+  buffer (bytes minus the byte ``stride`` positions earlier, mod 256, see
+  ``delta_encode``) in column-major order, PackBits run-length encoded;
+  buffers that would not shrink are sent with METHOD_RAW. Each frame
+  decodes on its own, so a buffer can be re-requested after an error.
+
+``encode_buffer`` is the reference encoder for firmware (and emulators)
+to match, so the format can be tested without hardware, and
+``estimate_ratio`` measures how much a recording would compress.
+
+Exports
+-------
+CAPABILITY : str
+    Capability token of the delta + PackBits mode.
+FRAME_HEADER : struct.Struct
+    Frame header layout.
+METHOD_RAW, METHOD_DELTA_PACKBITS : int
+    Frame payload encodings.
+delta_encode, delta_decode : function
+    Byte-wise stride-delta, reordered column by column.
+packbits_encode, packbits_decode : function
+    PackBits run-length coding.
+encode_buffer : function
+    Reference encoder: one SD buffer to one frame.
+decode_frame : function
+    Frame header and payload back to the SD buffer.
+read_frame : function
+    Receive and decode one frame from a serial port.
+parse_capabilities : function
+    Capability tokens of a negotiation reply.
+estimate_ratio : function
+    Compression ratio of a recording under the transfer encoding.
+"""
+
+import struct
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Set, Union
+import numpy as np
+from .firmware_structs import SD_BUFF_SIZE
+
+CAPABILITY = "d1"
+"""Capability token of stride-delta + PackBits frames (format version 1)."""
+
+FRAME_HEADER = struct.Struct("<BHHI")
+"""Frame header: method, delta stride, payload length, CRC-32 of the decoded buffer."""
+
+METHOD_RAW = 0
+"""Payload is the buffer itself."""
+
+METHOD_DELTA_PACKBITS = 1
+"""Payload is the PackBits-coded stride-delta of the buffer."""
+
+
+def delta_encode(raw, stride: int) -> np.ndarray:
+    """Stride-delta of a buffer, in column-major order.
+
+    The buffer is viewed as rows of stride bytes (the last row may be
+    short). Every row after the first is replaced by its difference from
+    the row above (mod 256), and the result is read column by column, so
+    the deltas of each byte position of a record are contiguous: the high
+    bytes of slowly changing integers become long runs.
+    """
+    raw = np.frombuffer(bytes(raw), dtype=np.uint8)
+    out = raw.copy()
+    out[stride:] -= raw[:-stride]
+    return out[_column_order(len(raw), stride)]
+
+
+def delta_decode(delta, stride: int) -> np.ndarray:
+    """Invert ``delta_encode``."""
+    delta = np.frombuffer(bytes(delta), dtype=np.uint8)
+    n = len(delta)
+    rows = -(-n // stride)
+    padded = np.zeros(rows * stride, dtype=np.uint8)
+    padded[_column_order(n, stride)] = delta
+    return np.cumsum(padded.reshape(rows, stride), axis=0, dtype=np.uint8).ravel()[:n]
+
+
+def packbits_encode(data) -> bytes:
+    """PackBits-encode bytes.
+
+    Each packet starts with a header byte h: ``h < 128`` copies the next
+    h + 1 bytes literally; ``h > 128`` repeats the next byte 257 - h times
+    (2 to 128). 128 is never written.
+    """
+    data = np.frombuffer(bytes(data), dtype=np.uint8)
+    if not len(data):
+        return b""
+    # run boundaries: positions where the byte changes
+    starts = np.flatnonzero(np.concatenate([[True], data[1:] != data[:-1]]))
+    lengths = np.diff(np.concatenate([starts, [len(data)]]))
+    out = bytearray()
+    literal = bytearray()
+
+    def flush_literal():
+        for i in range(0, len(literal), 128):
+            piece = literal[i:i + 128]
+            out.append(len(piece) - 1)
+            out.extend(piece)
+        literal.clear()
+
+    raw = data.tobytes()
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        if length < 3:  # a 2-byte run inside literals costs as much as a run packet
+            literal.extend(raw[start:start + length])
+            continue
+        flush_literal()
+        while length >= 2:
+            n = min(length, 128)
+            out.append(257 - n)
+            out.append(raw[start])
+            length -= n
+        if length:
+            literal.append(raw[start])
+    flush_literal()
+    return bytes(out)
+
+
+def packbits_decode(data, size: int) -> bytes:
+    """Decode PackBits data that expands to exactly size bytes.
+
+    Raises
+    ------
+    ValueError
+        If the data is truncated or does not expand to size bytes.
+    """
+    data = bytes(data)
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        h = data[i]
+        if h < 128:
+            end = i + 2 + h
+            if end > n:
+                raise ValueError("Truncated PackBits literal")
+            out += data[i + 1:end]
+            i = end
+        elif h > 128:
+            if i + 1 >= n:
+                raise ValueError("Truncated PackBits run")
+            out += data[i + 1:i + 2] * (257 - h)
+            i += 2
+        else:
+            i += 1
+    if len(out) != size:
+        raise ValueError(f"PackBits data expands to {len(out)} bytes, expected {size}")
+    return bytes(out)
+
+
+def encode_buffer(raw, stride: int) -> bytes:
+    """Reference encoder: one SD buffer to one frame (header + payload).
+
+    Parameters
+    ----------
+    raw : bytes-like
+        The buffer as ``t`` would send it.
+    stride : int
+        Delta distance in bytes; the firmware's record size.
+
+    Returns
+    -------
+    bytes
+        The frame; METHOD_RAW if compression would not shrink the buffer.
+    """
+    raw = bytes(raw)
+    crc = zlib.crc32(raw)
+    payload = packbits_encode(delta_encode(raw, stride))
+    if len(payload) >= len(raw):
+        return FRAME_HEADER.pack(METHOD_RAW, 0, len(raw), crc) + raw
+    return FRAME_HEADER.pack(METHOD_DELTA_PACKBITS, stride, len(payload), crc) + payload
+
+
+def decode_frame(header: bytes, payload: bytes, size: int = SD_BUFF_SIZE) -> bytes:
+    """Return the SD buffer carried by a frame.
+
+    Raises
+    ------
+    ValueError
+        If the method is unknown, the payload does not decode to size
+        bytes, or the CRC does not match.
+    """
+    method, stride, length, crc = FRAME_HEADER.unpack(header)
+    if len(payload) != length:
+        raise ValueError(f"Frame payload is {len(payload)} bytes, header says {length}")
+    if method == METHOD_RAW:
+        buff = bytes(payload)
+    elif method == METHOD_DELTA_PACKBITS:
+        if stride == 0:
+            raise ValueError("Frame has a zero delta stride")
+        buff = delta_decode(packbits_decode(payload, size), stride).tobytes()
+    else:
+        raise ValueError(f"Unknown frame method {method}")
+    if len(buff) != size:
+        raise ValueError(f"Frame decodes to {len(buff)} bytes, expected {size}")
+    if zlib.crc32(buff) != crc:
+        raise ValueError("Frame CRC mismatch")
+    return buff
+
+
+def read_frame(ser, size: int = SD_BUFF_SIZE, idle_timeout: float = 0.1) -> bytes:
+    """Receive one frame from a serial port and return the decoded buffer.
+
+    Raises
+    ------
+    TimeoutError
+        If no byte arrives for idle_timeout seconds mid-frame.
+    ValueError
+        If the frame is corrupt (see ``decode_frame``).
+    """
+    header = _read_exact(ser, FRAME_HEADER.size, idle_timeout)
+    _, _, length, _ = FRAME_HEADER.unpack(header)
+    if length > size + size // 64 + 16:
+        raise ValueError(f"Frame payload length {length} is implausible")
+    return decode_frame(header, _read_exact(ser, length, idle_timeout), size)
+
+
+def parse_capabilities(reply: Union[str, bytes]) -> Set[str]:
+    """Capability tokens of a ``k`` reply (terminator ``x`` stripped)."""
+    if isinstance(reply, bytes):
+        reply = reply.decode("utf-8", "replace")
+    return set(reply.rstrip("x").split())
+
+
+def estimate_ratio(
+    full_filename: Union[str, Path], fw_ver: str = "std", max_buffers: int = 2000
+) -> float:
+    """Raw-to-transferred byte ratio of a recording under the frame encoding.
+
+    Parameters
+    ----------
+    full_filename : str or Path
+        Raw ``.bin`` file.
+    fw_ver : str, optional
+        Firmware version string; its record size is the delta stride
+        (default "std").
+    max_buffers : int, optional
+        Encode at most this many SD buffers, spread over the file
+        (default 2000).
+
+    Returns
+    -------
+    float
+        Expected throughput multiplier of compressed transfers (headers
+        included); 1.0 for files shorter than one buffer.
+    """
+    from .parsing import record_dtype
+
+    stride = record_dtype(fw_ver).itemsize
+    data = np.fromfile(full_filename, dtype=np.uint8)
+    n_buffers = len(data) // SD_BUFF_SIZE
+    if not n_buffers:
+        return 1.0
+    picks = np.unique(np.linspace(0, n_buffers - 1, min(n_buffers, max_buffers)).astype(int))
+    sent = 0
+    for i in picks:
+        sent += len(encode_buffer(data[i * SD_BUFF_SIZE:(i + 1) * SD_BUFF_SIZE], stride))
+    return len(picks) * SD_BUFF_SIZE / sent
+
+
+# --- Private Methods ---
+
+
+@lru_cache(maxsize=16)
+def _column_order(n: int, stride: int) -> np.ndarray:
+    """Indices of n bytes in rows of stride, read column by column."""
+    rows = -(-n // stride)
+    order = np.arange(rows * stride).reshape(rows, stride).T.ravel()
+    order = order[order < n]
+    order.flags.writeable = False
+    return order
+
+
+def _read_exact(ser, n: int, idle_timeout: float) -> bytes:
+    """Read n bytes, failing if the port stays silent for idle_timeout seconds."""
+    buf = bytearray()
+    last = time.monotonic()
+    while len(buf) < n:
+        waiting = int(ser.in_waiting)
+        if waiting:
+            buf += ser.read(min(waiting, n - len(buf)))
+            last = time.monotonic()
+        elif time.monotonic() - last > idle_timeout:
+            raise TimeoutError(f"Serial link idle after {len(buf)} of {n} bytes")
+        else:
+            time.sleep(0.0005)
+    return bytes(buf)
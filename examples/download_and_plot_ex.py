@@ -9,9 +9,9 @@ Workflow
 1. ``download_data`` — connects to a Cass Logger over serial, downloads all
    recorded ``.bin`` files via ``CassCommands.download_all()``, and returns
    the path to the timestamped download directory.
-2. ``plot_internal_imu_data`` — iterates over every ``.bin`` file in that
-   directory, parses each one with ``CassCommands.process_data_file``, and
-   renders a three-panel time-series plot of the internal IMU axes.
+2. ``plot_internal_imu_data`` — renders a three-panel time-series plot of
+   the internal IMU axes for every ``.bin`` file in that directory using
+   ``cass_logger_dev.plotting``, which draws decimated data per file.
 3. ``test_delete`` — lists files on the device, prompts the user for
    confirmation, then deletes all files from the SD card.
 
@@ -36,12 +36,9 @@ Run directly::
 """
 
 import cass_logger_dev.cass_commands as cass_commands
+from cass_logger_dev import plotting
 from pathlib import Path
 from matplotlib import pyplot as plt
-import pandas as pd
-
-FORK_GAIN = 4.884e-02
-SHOCK_GAIN = 2.442e-02
 
 cass_util = cass_commands.CassCommands()
 
@@ -62,37 +59,18 @@ def plot_internal_imu_data(data_dir: str):
 
     NOTE: This is for the existing data in the examples/data dir.
 
-    Reads all .bin files in the given directory and renders a three-panel
-    time-series figure of the gyroscope channels using matplotlib.
+    Renders a three-panel time-series figure of the accelerometer channels
+    for each .bin file in the given directory. Each file is summarized once
+    into a decimation pyramid, so only screen-resolution data is drawn.
 
     Parameters
     ----------
     data_dir : str
         Path to the directory containing .bin data files.
     """
+    plt.style.use("ggplot")
     for file in Path(data_dir).glob("*.bin"):
-        example_data = cass_util.process_data_file(file)
-        plt.style.use("ggplot")
-
-        fig, axs = plt.subplots(nrows=3, ncols=1, sharex=True, figsize=(12, 8))
-        for ax in axs:
-            ax.tick_params(axis="x", labelbottom=True)
-        axs[0].plot(example_data["t"], example_data["gx"])
-        axs[1].plot(example_data["t"], example_data["gy"])
-        axs[2].plot(example_data["t"], example_data["gz"])
-
-        # labeling / formatting
-        axs[0].set_title(f"Internal IMU - X Acceleration {file.name}")
-        axs[1].set_title(f"Internal IMU - Y Acceleration {file.name}")
-        axs[2].set_title(f"Internal IMU - Z Acceleration {file.name}")
-        plt.title("Example data plot")
-        axs[0].set_xlabel("time [s]")
-        axs[0].set_ylabel("accel [m/s^2]")
-        axs[1].set_xlabel("time [s]")
-        axs[1].set_ylabel("accel [m/s^2]")
-        axs[2].set_xlabel("time [s]")
-        axs[2].set_ylabel("accel [m/s^2]")
-
+        fig, axs = plotting.plot_group(file, "imu_accel")
         plt.tight_layout()
         plt.show()
 
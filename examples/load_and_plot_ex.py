@@ -9,8 +9,9 @@ Workflow
 1. ``import_data`` — loads the pre-bundled ``.bin`` file from the
    ``examples/data/`` directory and parses it into a DataFrame using
    ``CassCommands.process_data_file``.
-2. ``plot_pot_data`` — applies the ADC-to-millimetre gain constants and
-   displays a two-panel time-series plot of fork and shock travel.
+2. ``plot_pot_data`` — displays a two-panel time-series plot of fork and
+   shock travel with ``cass_logger_dev.plotting``, which applies the
+   ADC-to-millimetre gains and draws decimated data that refines on zoom.
 
 Data columns used
 -----------------
@@ -24,6 +25,7 @@ FORK_GAIN : float
     Converts raw ``a0`` ADC counts to millimetres of fork travel.
 SHOCK_GAIN : float
     Converts raw ``b0`` ADC counts to millimetres of shock travel.
+    Both are defined in ``cass_logger_dev.firmware_structs``.
 
 Notes
 -----
@@ -42,12 +44,11 @@ Run directly::
 """
 
 import cass_logger_dev.cass_commands as cass_commands
+from cass_logger_dev import plotting
 from pathlib import Path
 from matplotlib import pyplot as plt
-import pandas as pd
 
-FORK_GAIN = 4.884e-02
-SHOCK_GAIN = 2.442e-02
+DATA_FILE = Path(__file__).parent / "data" / "97b9d0e5-345d-422f-95ea-24f48d067590.bin"
 
 
 def import_data():
@@ -63,49 +64,34 @@ def import_data():
         Parsed sensor data with columns including ``t`` (seconds),
         ``a0`` (fork pot ADC counts), and ``b0`` (shock pot ADC counts).
     """
-    cass_util = cass_commands.CassCommands()
-    filepath = str(
-        Path(__file__).parent / "data" / "97b9d0e5-345d-422f-95ea-24f48d067590.bin"
-    )
+    return cass_commands.CassCommands.process_data_file(DATA_FILE)
 
-    return cass_util.process_data_file(filepath)
 
-
-def plot_pot_data(example_data: pd.DataFrame):
+def plot_pot_data(filepath: Path = DATA_FILE):
     """Plot fork and shock suspension travel against time.
 
     NOTE: This is for the existing data in the examples/data dir.
 
-    Applies the ADC-to-millimetre gain constants to the raw potentiometer
-    channels and renders a two-panel time-series figure using matplotlib.
+    Renders a two-panel time-series figure of the potentiometer channels in
+    millimetres. Only screen-resolution data is drawn; zooming in re-reads
+    finer detail from the file's decimation pyramid.
 
     Parameters
     ----------
-    example_data : pd.DataFrame
-        DataFrame returned by ``import_data``. Must contain columns
-        ``t``, ``a0``, and ``b0``.
+    filepath : Path, optional
+        Binary file to plot (default: the bundled example file).
     """
     plt.style.use("ggplot")
 
-    fig, axs = plt.subplots(nrows=2, ncols=1, sharex=True, figsize=(12, 8))
-    for ax in axs:
-        ax.tick_params(axis="x", labelbottom=True)
-    axs[0].plot(example_data["t"], example_data["a0"] * FORK_GAIN)
-    axs[1].plot(example_data["t"], example_data["b0"] * SHOCK_GAIN)
+    fig, axs = plotting.plot_group(filepath, "suspension")
 
     # labeling / formatting
     axs[0].set_title("[Example] Fork Pot")
     axs[1].set_title("[Example] Shock Pot")
-    plt.title("Example data plot")
-    axs[0].set_xlabel("time [s]")
-    axs[0].set_ylabel("Travel [mm]")
-    axs[1].set_xlabel("time [s]")
-    axs[1].set_ylabel("Travel [mm]")
 
     plt.tight_layout()
     plt.show()
 
 
 if __name__ == "__main__":
-    example_data = import_data()
-    plot_pot_data(example_data)
+    plot_pot_data(DATA_FILE)